@@ -0,0 +1,1177 @@
+# arffbench.py, October 2026, throughput benchmarks for arfflib_3_3.py.
+# Each benchmark generates a synthetic relation in a temporary directory,
+# times the previous arfflib approach against the current one on the
+# same data, and reports rows/sec for both plus the speedup.
+# Run with no arguments for the USAGE and the list of benchmarks.
+import sys
+import os
+import time
+import random
+import itertools
+import tempfile
+import csv
+import datetime
+import copy
+import gzip
+import tracemalloc
+import statistics
+import numpy
+import arfflib_3_3 as arfflib
+
+def __timeit__(func):
+    # Return (seconds, result) for one call of func().
+    before = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - before, result)
+
+def __report__(name, rows, oldsecs, newsecs):
+    sys.stdout.write(name + ': ' + str(rows) + ' rows, before '
+        + str(round(oldsecs, 3)) + ' sec (' + str(int(rows / oldsecs))
+        + ' rows/sec), after ' + str(round(newsecs, 3)) + ' sec ('
+        + str(int(rows / newsecs)) + ' rows/sec), speedup '
+        + str(round(oldsecs / newsecs, 2)) + 'x\n')
+    sys.stdout.flush()
+
+def __makeCSV__(fname, rows, cols, seed=223):
+    # Numeric sensor-style columns with 1% blanks, plus one string column.
+    gen = random.Random(seed)
+    with open(fname, 'w', newline='') as outf:
+        wrtr = csv.writer(outf)
+        wrtr.writerow(['s'] + ['x' + str(c) for c in range(1, cols)])
+        for r in range(0, rows):
+            row = ['site' + str(gen.randrange(0, 50))]
+            for c in range(1, cols):
+                row.append('' if gen.random() < 0.01
+                    else str(round(gen.uniform(-100.0, 100.0), 4)))
+            wrtr.writerow(row)
+
+def __legacyReadCSV__(fname):
+    # readCSV as of arfflib_3_3 September 2022, the "before" baseline.
+    inf = open(fname, 'r')
+    rdr = csv.reader(inf, delimiter=',', quotechar='"', dialect='excel')
+    table = []
+    row = list(rdr.__next__())
+    while row != None:
+        if len(row) > 0:
+            table.append(row)
+        try:
+            row = list(rdr.__next__())
+        except StopIteration:
+            row = None
+    inf.close()
+    colToType = dict([(c, float) for c in range(0, len(table[0]))])
+    arfflib.__convertCSVrows__(table[1:], colToType, False)
+    return (table[1:], colToType)
+
+def benchReadCSV(tmpdir, rows, cols):
+    '''
+    readCSV, with type inference and conversion a cell at a time before,
+    a column at a time after.
+    '''
+    fname = os.path.join(tmpdir, 'bench.csv')
+    __makeCSV__(fname, rows, cols)
+    oldsecs, old = __timeit__(lambda : __legacyReadCSV__(fname))
+    newsecs, new = __timeit__(lambda : arfflib.readCSV(fname))
+    if old[0] != new[1] or old[1] != new[5]:
+        raise ValueError('readCSV results differ from the baseline')
+    __report__('readCSV', rows, oldsecs, newsecs)
+
+def __legacyGetDataset__(af, amap):
+    # __getDataset__ as of arfflib_3_3 September 2022, the "before" baseline.
+    # Start helper function __mergeInstanceStrings__.
+    def __mergeInstanceStrings__(instlist):
+        # We have split along ','; fix cases here ',' is in a quoted string.
+        # WHEN A STRING CONTAINS A "," MERGE WITH ITS PARTNER
+        result = []
+        ix = 0
+        while ix < len(instlist):
+            field = instlist[ix]
+            if (field.startswith("'") or field.startswith('"')):
+                terminator = field[0]
+                fld = field
+                if fld.endswith(terminator):
+                    result.append(fld)
+                    ix += 1
+                else:
+                    ix += 1
+                    while ix < len(instlist):
+                        f = instlist[ix]
+                        # Re-insert the commas as part of the quoted string.
+                        if (f.endswith(terminator)):
+                            fld = fld + ',' + f
+                            ix += 1
+                            break
+                        else:
+                            fld = fld + ',' + f
+                            ix += 1
+                    result.append(fld)
+            else:
+                result.append(field)
+                ix += 1
+        return result
+    # End helper function __mergeInstanceStrings__.
+    result = []
+    while True:
+        line = af.readline()
+        if not line:
+            break
+        sline = line.strip()
+        if sline[0:1] == '%':       # Comment line
+            continue
+        instance = sline.split(',')
+        # WHEN A STRING CONTAINS A "," MERGE WITH ITS PARTNER
+        instance = __mergeInstanceStrings__(instance)
+        for a in amap.keys():
+            pos, t = amap[a]
+            # print("DEBUG dataset", a, pos, t, instance[pos], instance)
+            if pos >= len(instance):
+                sys.stderr.write("ERROR, attribute " + str(a)
+                    + "maps to position, type " + str(pos) + "," + str(t)
+                    + ", instance has length " + str(len(instance))
+                    + ":\n\t" + str(instance) + "\n")
+                sys.stderr.flush()
+            if instance[pos] == '?':
+                instance[pos] = None
+            elif t == 'numeric':
+#               sys.stderr.write("DEBUG instance[pos]: "
+#                   + str(instance[pos]) + '\n')
+                vf = float(instance[pos])
+                vi = int(vf)
+                v = vi if (vi == vf and not '.' in instance[pos]) else vf
+                instance[pos] = v
+            elif t == 'string' and instance[pos].startswith("'"):
+                instance[pos] = instance[pos][1:-1]
+            elif isinstance(t, tuple) and len(t) == 3 and t[0] == 'date':
+                # No need to strip anything.
+                instance[pos] = (instance[pos],
+                    datetime.datetime.strptime(instance[pos], t[2]))
+            elif isinstance(t, tuple) and len(t) == 3 and t[0] == 'nominal':
+                if instance[pos].startswith("'"):
+                    instance[pos] = instance[pos][1:-1]
+                # instance[pos] = (instance[pos], instance[pos])
+                # pass        # store same as before 9/20/2020, but not twice
+                # if instance[pos].startswith("'"):
+                    # instance[pos] = instance[pos][1:-1] # data now stored like a string
+        result.append(instance)
+        # print("DEBUG instance", instance)
+    return result
+
+def __makeARFF__(fname, rows, cols, seed=223):
+    # Numeric columns with 1% unknowns, plus a nominal and a quoted string.
+    gen = random.Random(seed)
+    with open(fname, 'w') as outf:
+        outf.write('@relation bench\n@attribute site {north,south,east,west}\n'
+            + "@attribute note string\n")
+        for c in range(2, cols):
+            outf.write('@attribute x' + str(c) + ' numeric\n')
+        outf.write('@data\n')
+        for r in range(0, rows):
+            row = [gen.choice(['north', 'south', 'east', 'west']),
+                "'note " + str(gen.randrange(0, 1000)) + ", checked'"]
+            for c in range(2, cols):
+                row.append('?' if gen.random() < 0.01
+                    else str(round(gen.uniform(-100.0, 100.0), 4)))
+            outf.write(','.join(row) + '\n')
+
+def benchReadARFF(tmpdir, rows, cols):
+    '''
+    readARFF, with split-and-merge parsing and per-cell type dispatch
+    before, block tokenizing and per-attribute column converters after.
+    '''
+    fname = os.path.join(tmpdir, 'bench.arff')
+    __makeARFF__(fname, rows, cols)
+    def legacy():
+        with open(fname, 'r') as af:
+            amap = arfflib.__getAttrIndices__(af)
+            return __legacyGetDataset__(af, amap)
+    oldsecs, old = __timeit__(legacy)
+    newsecs, new = __timeit__(lambda : arfflib.readARFF(fname))
+    if old != new[1]:
+        raise ValueError('readARFF results differ from the baseline')
+    __report__('readARFF', rows, oldsecs, newsecs)
+
+def benchParallel(tmpdir, rows, cols):
+    '''
+    Scaling of readARFFparallel and readCSVparallel over 1..N worker
+    processes, N = os.cpu_count() (at least 2), against serial readARFF
+    and readCSV on the same file.
+    '''
+    most = max(2, os.cpu_count() or 1)
+    for name, make, serial, parallel in (
+            ('readARFFparallel', __makeARFF__, arfflib.readARFF,
+                lambda f, w : arfflib.readARFFparallel(f, workers=w)),
+            ('readCSVparallel', __makeCSV__, arfflib.readCSV,
+                lambda f, w : arfflib.readCSVparallel(f, workers=w))):
+        fname = os.path.join(tmpdir, 'bench_' + name)
+        make(fname, rows, cols)
+        oldsecs, old = __timeit__(lambda : serial(fname))
+        for workers in range(1, most+1):
+            newsecs, new = __timeit__(lambda : parallel(fname, workers))
+            if old[1] != new[1]:
+                raise ValueError(name + ' results differ from serial')
+            __report__(name + ' ' + str(workers) + ' workers', rows,
+                oldsecs, newsecs)
+
+def benchCache(tmpdir, rows, cols):
+    '''
+    readARFF and readCSV parsing text before, loading the .npz sidecar
+    written by the first cached read after.
+    '''
+    for name, make, reader in (
+            ('readARFF cache', __makeARFF__,
+                lambda f, c : arfflib.readARFF(f, cache=c)),
+            ('readCSV cache', __makeCSV__,
+                lambda f, c : arfflib.readCSV(f, cache=c))):
+        fname = os.path.join(tmpdir, 'bench_cache')
+        make(fname, rows, cols)
+        arfflib.removeARFFcache(fname)
+        oldsecs, old = __timeit__(lambda : reader(fname, False))
+        reader(fname, True)
+        newsecs, new = __timeit__(lambda : reader(fname, True))
+        if old != new:
+            raise ValueError(name + ' results differ from parsing')
+        __report__(name, rows, oldsecs, newsecs)
+
+def benchMemmap(tmpdir, rows, cols):
+    '''
+    wekaCorrelationCoefficent of two columns of a wide CSV relation,
+    from the 2D lists of readCSV before, from numpy.memmap columns of
+    readCSV(memoryMapped=True) after, once its sidecar exists.
+    '''
+    fname = os.path.join(tmpdir, 'bench_memmap.csv')
+    __makeCSV__(fname, rows, cols)
+    def before():
+        relation = arfflib.readCSV(fname)
+        pairs = [(row[1], row[2]) for row in relation[1]
+            if row[1] is not None and row[2] is not None]
+        return arfflib.wekaCorrelationCoefficent([p[0] for p in pairs],
+            [p[1] for p in pairs])
+    def after():
+        columns = arfflib.readCSV(fname, memoryMapped=True)[1].columns
+        return arfflib.wekaCorrelationCoefficent(columns[1], columns[2])
+    arfflib.removeARFFcache(fname)
+    oldsecs, old = __timeit__(before)
+    after()
+    newsecs, new = __timeit__(after)
+    if abs(old - new) > 1e-9:
+        raise ValueError('memmap correlation differs from the baseline')
+    __report__('memmap', rows, oldsecs, newsecs)
+
+def __dataLines__(fname):
+    # The lines after @data, skipping the header's generation timestamp.
+    opener = gzip.open if fname.endswith('.gz') else open
+    with opener(fname, 'rt') as inf:
+        lines = inf.read().split('\n')
+    return lines[lines.index('@data'):]
+
+def benchWriteARFF(tmpdir, rows, cols):
+    '''
+    writeARFF of a numeric relation with 1% unknowns, a cell at a time
+    with a write per cell before, a column at a time per block after;
+    then .arff.gz output with the default gzip level 9 before, and
+    compresslevel 6 with os.cpu_count() compression threads after.
+    Every column mixes ints and floats, and the ColumnarDataset of the
+    relation must round-trip to the same rows and the same ARFF data,
+    as must one of a column of ints beyond int64.
+    '''
+    gen = random.Random(223)
+    attrmap = dict([('x' + str(c), (c, 'numeric')) for c in range(0, cols)])
+    dataset = [[None if gen.random() < 0.01
+        else (gen.randrange(-1000, 1000) if gen.random() < 0.1
+            else round(gen.uniform(-100.0, 100.0), 4))
+                for c in range(0, cols)] for r in range(0, rows)]
+    def legacy(fname, fout):
+        newmap = arfflib.__writeARFFheader__(fout, 'bench', attrmap)
+        arfflib.__writeARFFrows__(fout, newmap, dataset)
+        fout.close()
+    oldname = os.path.join(tmpdir, 'bench_old.arff')
+    newname = os.path.join(tmpdir, 'bench_new.arff')
+    oldsecs, old = __timeit__(lambda : legacy(oldname, open(oldname, 'w')))
+    newsecs, new = __timeit__(lambda : arfflib.writeARFF(newname, 'bench',
+        attrmap, dataset, clobber=True))
+    if __dataLines__(oldname) != __dataLines__(newname):
+        raise ValueError('writeARFF output differs from the baseline')
+    __report__('writeARFF', rows, oldsecs, newsecs)
+    columnar = arfflib.toColumnarARFF(attrmap, dataset)
+    if columnar.tolist() != dataset or list(map(type,
+            itertools.chain.from_iterable(columnar.tolist()))) != list(map(
+                type, itertools.chain.from_iterable(dataset))):
+        raise ValueError('ColumnarDataset rows differ from the 2D list')
+    arfflib.writeARFF(newname, 'bench', attrmap, columnar, clobber=True)
+    if __dataLines__(oldname) != __dataLines__(newname):
+        raise ValueError('Columnar writeARFF output differs from the 2D list')
+    bigmap = {'big' : (0, 'numeric'), 'mixed' : (1, 'numeric')}
+    bigs = [[None if r % 7 == 0 else int(gen.uniform(-1e20, 1e20)),
+        None if r % 5 == 0 else (2 ** 70 if r % 2 else 0.5 * r)]
+            for r in range(0, 100)]
+    arfflib.writeARFF(newname, 'bench', bigmap, bigs, clobber=True)
+    bigs = arfflib.readARFF(newname)[1]
+    if arfflib.readARFF(newname, columnar=True)[1].tolist() != bigs \
+            or arfflib.toColumnarARFF(bigmap, bigs).tolist() != bigs:
+        raise ValueError('ColumnarDataset of ints beyond int64 differs')
+    quoted = ['"', "'", 'a"b', "it's", 'say "hi"', 'it\'s "x"', '"hi',
+        'C:\\my dir\\', 'x,"y', '\\', '"q"', "'q'"]
+    strmap = {'s' : (0, 'string'), 'n' : (1, 'numeric')}
+    strings = [[quoted[r % len(quoted)], r] for r in range(0, 2 * len(quoted))]
+    arfflib.writeARFF(newname, 'bench', strmap, strings, clobber=True)
+    if arfflib.readARFF(newname)[1] != strings:
+        raise ValueError('writeARFF quoting does not round-trip readARFF')
+    threads = os.cpu_count() or 1
+    oldsecs, old = __timeit__(lambda : legacy(oldname + '.gz',
+        gzip.open(oldname + '.gz', 'wt')))
+    newsecs, new = __timeit__(lambda : arfflib.writeARFF(newname + '.gz',
+        'bench', attrmap, dataset, clobber=True, compresslevel=6,
+        compressThreads=threads))
+    if __dataLines__(oldname + '.gz') != __dataLines__(newname + '.gz'):
+        raise ValueError('writeARFF .gz output differs from the baseline')
+    __report__('writeARFF .gz ' + str(threads) + ' threads', rows,
+        oldsecs, newsecs)
+
+def __legacyProject__(attrmap, dataset, keepList):
+    # projectARFF's copying as of arfflib_3_3 September 2022, keeping the
+    # sorted attribute offsets keepList, the "before" baseline.
+    newdataset = [[] for ii in range(0, len(dataset))]
+    for instix in range(0, len(dataset)):
+        for atrbix in keepList:
+            newdataset[instix].append(dataset[instix][atrbix])
+    newmap = copy.deepcopy(attrmap)
+    for ky in attrmap.keys():
+        if attrmap[ky][0] in keepList:
+            newmap[ky] = (keepList.index(attrmap[ky][0]), attrmap[ky][1])
+        else:
+            del newmap[ky]
+    return (newmap, newdataset)
+
+def benchProject(tmpdir, rows, cols):
+    '''
+    projectARFF keeping 10 of cols attributes of a numeric relation,
+    copying per cell before, a lazy ProjectedDataset (view=True) after;
+    then the same projections written by writeARFF, which reads the
+    view's original rows without materializing it, and the default
+    projection to a new 2D list.
+    '''
+    gen = random.Random(223)
+    attrmap = dict([('x' + str(c), (c, 'numeric')) for c in range(0, cols)])
+    dataset = [[gen.randrange(0, 1000) for c in range(0, cols)]
+        for r in range(0, rows)]
+    keepList = list(range(0, cols, max(1, cols // 10)))[0:10]
+    oldsecs, old = __timeit__(lambda : __legacyProject__(attrmap, dataset,
+        keepList))
+    newsecs, new = __timeit__(lambda : arfflib.projectARFF(attrmap, dataset,
+        keepList, True, view=True))
+    __report__('projectARFF view', rows, oldsecs, newsecs)
+    copysecs, copied = __timeit__(lambda : arfflib.projectARFF(attrmap,
+        dataset, keepList, True))
+    if type(copied[1]) is not list or copied != old:
+        raise ValueError('projectARFF copy differs from the baseline')
+    __report__('projectARFF', rows, oldsecs, copysecs)
+    oldname = os.path.join(tmpdir, 'bench_project_old.arff')
+    newname = os.path.join(tmpdir, 'bench_project_new.arff')
+    writesecs, unused = __timeit__(lambda : arfflib.writeARFF(oldname,
+        'bench', old[0], old[1], clobber=True))
+    newwritesecs, unused = __timeit__(lambda : arfflib.writeARFF(newname,
+        'bench', new[0], new[1], clobber=True))
+    if old[0] != new[0] or __dataLines__(oldname) != __dataLines__(newname):
+        raise ValueError('projectARFF results differ from the baseline')
+    __report__('projectARFF + writeARFF', rows, oldsecs + writesecs,
+        newsecs + newwritesecs)
+
+def __transformChain__(attrmap, dataset):
+    # Five transforms in a row, each leaving its input unmutated.
+    attrmap, dataset = arfflib.deriveARFF(attrmap, dataset,
+        [('total', 'numeric', lambda inst : sum([v for v in inst[1:]
+            if v is not None]))])
+    dataset = arfflib.imputeARFF(attrmap, dataset, [k for k in attrmap.keys()
+        if attrmap[k][1] == 'numeric'], 'mean')
+    attrmap, dataset = arfflib.Normalize(attrmap, dataset)
+    attrmap, dataset = arfflib.discretizeARFF(attrmap, dataset, 'total', 5,
+        'nominal', False)
+    return (attrmap, arfflib.sortARFF(attrmap, dataset, ['x1']))
+
+def benchTransforms(tmpdir, rows, cols):
+    '''
+    A chain of deriveARFF, imputeARFF, Normalize, discretizeARFF and
+    sortARFF on a numeric relation with 1% unknowns plus a string column,
+    each copying the dataset with copy.deepcopy before, copying only the
+    row lists after. Also reports each one's peak traced memory.
+    '''
+    gen = random.Random(223)
+    attrmap = dict([('x' + str(c), (c, 'numeric')) for c in range(1, cols)])
+    attrmap['site'] = (0, 'string')
+    dataset = [['site' + str(gen.randrange(0, 50))] + [None
+        if gen.random() < 0.01 else round(gen.uniform(-100.0, 100.0), 4)
+            for c in range(1, cols)] for r in range(0, rows)]
+    copyRows = arfflib.__copyRows__
+    peaks = []
+    for copier in (copy.deepcopy, copyRows):
+        arfflib.__copyRows__ = copier
+        try:
+            tracemalloc.start()
+            __transformChain__(attrmap, dataset)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            peaks.append(__timeit__(lambda : __transformChain__(attrmap,
+                dataset)))
+        finally:
+            arfflib.__copyRows__ = copyRows
+    if peaks[1][1] != peaks[3][1]:
+        raise ValueError('transform results differ from the baseline')
+    __report__('transforms', rows, peaks[1][0], peaks[3][0])
+    sys.stdout.write('transforms: peak traced memory before '
+        + str(round(peaks[0] / 1e6, 1)) + ' MB, after '
+        + str(round(peaks[2] / 1e6, 1)) + ' MB\n')
+
+def __legacySort__(attrmap, dataset, akeys):
+    # sortARFF as of arfflib_3_3 September 2022, the "before" baseline.
+    ndata = copy.deepcopy(dataset)
+    def keyextract(inst):
+        keys = []
+        for i in akeys:
+            keys.append(inst[i])
+        return keys
+    ndata.sort(key=keyextract)
+    return ndata
+
+def benchSort(tmpdir, rows, cols):
+    '''
+    sortARFF on a nominal and a numeric key, dropping the rows with unknowns
+    that the old sortARFF could not order, with a per-row key list before, typed numpy keys and numpy.lexsort after; then
+    sortARFFfile's external merge sort of the same relation in 10 runs.
+    A key holding ints beyond float64 must still sort as the baseline.
+    '''
+    fname = os.path.join(tmpdir, 'bench_sort.arff')
+    __makeARFF__(fname, rows, cols)
+    attrmap, dataset = arfflib.readARFF(fname)
+    dataset = [row for row in dataset if not None in row]
+    oldsecs, old = __timeit__(lambda : __legacySort__(attrmap, dataset,
+        [0, 2]))
+    newsecs, new = __timeit__(lambda : arfflib.sortARFF(attrmap, dataset,
+        ['site', 'x2']))
+    if old != new:
+        raise ValueError('sortARFF results differ from the baseline')
+    __report__('sortARFF', len(dataset), oldsecs, newsecs)
+    hugemap = {'huge' : (0, 'numeric'), 'x' : (1, 'numeric')}
+    huge = [[int(row[2]) * 10 ** 400 if r % 2 else row[2], r]
+        for r, row in enumerate(dataset[:1000])]
+    if arfflib.sortARFF(hugemap, huge, ['huge', 'x']) \
+            != __legacySort__(hugemap, huge, [0, 1]):
+        raise ValueError('sortARFF on ints beyond float64 differs from the '
+            + 'baseline')
+    outname = os.path.join(tmpdir, 'bench_sorted.arff')
+    extsecs, unused = __timeit__(lambda : arfflib.sortARFFfile(fname,
+        outname, 'bench', ['site', 'x2'], batchSize=max(1, rows // 10),
+            tmpdir=tmpdir, clobber=True))
+    if arfflib.readARFF(outname)[1] != arfflib.sortARFF(attrmap,
+            arfflib.readARFF(fname)[1], ['site', 'x2']):
+        raise ValueError('sortARFFfile result differs from sortARFF')
+    sys.stdout.write('sortARFFfile: ' + str(rows) + ' rows, '
+        + str(round(extsecs, 3)) + ' sec (' + str(int(rows / extsecs))
+        + ' rows/sec)\n')
+
+def __legacyImpute__(dataset, akeys, replacement):
+    # imputeARFF's named replacements as of arfflib_3_3 September 2022,
+    # the "before" baseline.
+    ndata = copy.deepcopy(dataset)
+    columns = [[] for i in range(0, len(akeys))]
+    for inst in ndata:
+        for attrix in range(0, len(akeys)):
+            if inst[akeys[attrix]] != None:
+                columns[attrix].append(inst[akeys[attrix]])
+    subvals = [None for i in range(0, len(columns))]
+    for attrix in range(0, len(columns)):
+        if replacement == 'mean':
+            subvals[attrix] = statistics.mean(columns[attrix])
+        elif replacement == 'median':
+            subvals[attrix] = arfflib.stringNumMedian(columns[attrix])
+        else:
+            modeset = arfflib.multimode(columns[attrix])
+            subvals[attrix] = modeset[int(len(modeset)/2)]
+    for inst in ndata:
+        for rix in range(0, len(akeys)):
+            if inst[akeys[rix]] == None:
+                inst[akeys[rix]] = subvals[rix]
+    return ndata
+
+def benchImpute(tmpdir, rows, cols):
+    '''
+    imputeARFF of every numeric attribute of a relation with 1% unknowns,
+    with per-attribute value lists and the statistics module before,
+    one numpy sort per attribute after; then the same grouped by the
+    nominal attribute, and forward fill, which had no equivalent. The
+    median and mode of ints beyond float64 must match the baseline.
+    '''
+    fname = os.path.join(tmpdir, 'bench_impute.arff')
+    __makeARFF__(fname, rows, cols)
+    attrmap, dataset = arfflib.readARFF(fname)
+    akeys = list(range(2, cols))
+    for replacement in ('mean', 'median', 'mode'):
+        oldsecs, old = __timeit__(lambda : __legacyImpute__(dataset, akeys,
+            replacement))
+        newsecs, new = __timeit__(lambda : arfflib.imputeARFF(attrmap,
+            dataset, akeys, replacement))
+        for orow, nrow in zip(old, new):
+            for ov, nv in zip(orow, nrow):
+                if ov != nv and not abs(ov - nv) <= 1e-9 * abs(ov):
+                    raise ValueError('imputeARFF results differ from the '
+                        + 'baseline')
+        __report__('imputeARFF ' + replacement, rows, oldsecs, newsecs)
+    for replacement in ('mean', 'ffill'):
+        secs, unused = __timeit__(lambda : arfflib.imputeARFF(attrmap, dataset,
+            akeys, replacement, groupBy=['site']))
+        sys.stdout.write('imputeARFF ' + replacement + " groupBy=['site']: "
+            + str(rows) + ' rows, ' + str(round(secs, 3)) + ' sec ('
+            + str(int(rows / secs)) + ' rows/sec)\n')
+    gen = random.Random(223)
+    hugemap = {'huge' : (0, 'numeric')}
+    huge = [[None if r % 4 == 0 else gen.randrange(1, 5) * 10 ** 400]
+        for r in range(0, 39)]
+    for replacement in ('median', 'mode'):
+        if arfflib.imputeARFF(hugemap, huge, [0], replacement) \
+                != __legacyImpute__(huge, [0], replacement):
+            raise ValueError('imputeARFF of ints beyond float64 differs from '
+                + 'the baseline')
+
+def __legacyNormalize__(attrmap, dataset):
+    # Normalize of every numeric attribute as of arfflib_3_3 September 2022,
+    # the "before" baseline.
+    ndata = copy.deepcopy(dataset)
+    for aname in attrmap.keys():
+        if attrmap[aname][1] != 'numeric':
+            continue
+        aindex = attrmap[aname][0]
+        values = [inst[aindex] for inst in ndata]
+        min = None
+        max = None
+        vix = 0
+        while vix < len(values):
+            v = values[vix]
+            if v != None and not (isinstance(v,float) and numpy.isnan(v)):
+                if min == None or v < min:
+                    min = v
+                if max == None or v > max:
+                     max = v
+            vix += 1
+        if min == None:
+            continue
+        numrange = float(max) - float(min)
+        for inst in ndata:
+            if inst[aindex] != None:
+                inst[aindex] = round((inst[aindex] - float(min)) / numrange, 6) \
+                    if numrange > 0.0 else 0.0
+    return ndata
+
+def benchNormalize(tmpdir, rows, cols):
+    '''
+    Normalize of every numeric attribute of a relation with 1% unknowns,
+    with a per-value min/max loop and per-cell rescaling before, one
+    vectorized scan of all attributes and column-wise scaling after; then
+    the 'zscore' and 'robust' modes, and reusing fitted parameters.
+    '''
+    fname = os.path.join(tmpdir, 'bench_normalize.arff')
+    __makeARFF__(fname, rows, cols)
+    attrmap, dataset = arfflib.readARFF(fname)
+    oldsecs, old = __timeit__(lambda : __legacyNormalize__(attrmap, dataset))
+    newsecs, new = __timeit__(lambda : arfflib.Normalize(attrmap, dataset))
+    for orow, nrow in zip(old, new[1]):
+        for ov, nv in zip(orow, nrow):
+            if ov != nv and not abs(ov - nv) <= 1.5e-6:
+                raise ValueError('Normalize results differ from the baseline')
+    __report__('Normalize', rows, oldsecs, newsecs)
+    for mode in ('zscore', 'robust'):
+        secs, unused = __timeit__(lambda : arfflib.Normalize(attrmap, dataset,
+            mode=mode))
+        sys.stdout.write('Normalize ' + mode + ': ' + str(rows) + ' rows, '
+            + str(round(secs, 3)) + ' sec (' + str(int(rows / secs))
+            + ' rows/sec)\n')
+    params = arfflib.normalizeParameters(attrmap, dataset[0:rows//2])
+    secs, unused = __timeit__(lambda : arfflib.Normalize(attrmap,
+        dataset[rows//2:], parameters=params))
+    sys.stdout.write('Normalize with fitted parameters: ' + str(rows - rows//2)
+        + ' rows, ' + str(round(secs, 3)) + ' sec ('
+        + str(int((rows - rows//2) / secs)) + ' rows/sec)\n')
+
+def benchFitted(tmpdir, rows, cols):
+    '''
+    StringToNominal, Normalize and discretizeARFF over 10 batches of a
+    relation, as for 10 daily files, refitting on every batch before,
+    fitting StringToNominalTransform, NormalizeTransform and
+    DiscretizeTransform once and only transforming each batch after,
+    which also gives every batch the same attribute declarations; then
+    the same transforms saved and loaded by saveTransforms and
+    loadTransforms.
+    '''
+    fname = os.path.join(tmpdir, 'bench_fitted.arff')
+    __makeARFF__(fname, rows, cols)
+    attrmap, dataset = arfflib.readARFF(fname)
+    attrmap['site'] = (0, 'string')
+    step = max(1, rows // 10)
+    batches = [dataset[ix:ix+step] for ix in range(0, rows, step)]
+    def refitting():
+        result = []
+        for batch in batches:
+            amap, data = arfflib.StringToNominal(attrmap, batch)
+            amap, data = arfflib.Normalize(amap, data)
+            result.append(arfflib.discretizeARFF(amap, data, 'x2', 10,
+                'nominal', True))
+        return result
+    def fitted():
+        transforms = [arfflib.StringToNominalTransform(),
+            arfflib.NormalizeTransform(),
+            arfflib.DiscretizeTransform('x2', 10, 'nominal', True)]
+        amap, data = (attrmap, batches[0])
+        for transform in transforms:
+            amap, data = transform.fitTransform(amap, data)
+        result = [(amap, data)]
+        for batch in batches[1:]:
+            amap, data = (attrmap, batch)
+            for transform in transforms:
+                amap, data = transform.transform(amap, data)
+            result.append((amap, data))
+        return (transforms, result)
+    oldsecs, old = __timeit__(refitting)
+    newsecs, (transforms, new) = __timeit__(fitted)
+    if len(set([repr(amap) for amap, data in new])) != 1:
+        raise ValueError('fitted transforms gave differing attributes')
+    __report__('fitted transforms', rows, oldsecs, newsecs)
+    sys.stdout.write('fitted transforms: distinct attribute maps over '
+        + str(len(batches)) + ' batches before '
+        + str(len(set([repr(amap) for amap, data in old]))) + ', after 1\n')
+    tname = os.path.join(tmpdir, 'bench_fitted.txt')
+    arfflib.saveTransforms(tname, transforms, clobber=True)
+    amap, data = (attrmap, batches[-1])
+    for transform in arfflib.loadTransforms(tname):
+        amap, data = transform.transform(amap, data)
+    if (amap, data) != new[-1]:
+        raise ValueError('loaded transforms differ from the saved ones')
+
+def __legacyDiscretize__(attrmap, dataset, attrname, bins, attrtype,
+        useEqualFrequency):
+    # discretizeARFF as of arfflib_3_3 September 2022, with a row copy in
+    # place of copy.deepcopy, the "before" baseline.
+    attrix = attrmap[attrname][0]
+    nattrmap = copy.deepcopy(attrmap)
+    values = sorted([dataset[ix][attrix] for ix in range(0, len(dataset))])
+    bounds = []
+    if useEqualFrequency:
+        binsize = round(len(values) / bins)
+        bstart = 0
+        bend = min(bstart + binsize, len(values)-1)
+        while bstart < len(values)-1:
+            while bend < (len(values)-1) and values[bend+1] == values[bend]:
+                bend += 1
+            bounds.append((values[bstart], values[bend]))
+            bstart = bend 
+            bend = min(bstart + binsize, len(values)-1)
+        fixbounds = []
+        for bix in range(0, len(bounds)-1):
+            lower, upper = bounds[bix]
+            if not (lower == upper and bounds[bix+1][0] == upper):
+                fixbounds.append(bounds[bix])
+        finallower, finalupper = bounds[-1]
+        if not (finallower == finalupper and finallower == upper):
+            fixbounds.append(bounds[-1]) # append the top
+        bounds = fixbounds
+    else:
+        binlen = (values[-1] - values[0]) / bins
+        binfrom = values[0]
+        while binfrom <= values[-1]:
+            binto = binfrom + binlen
+            bounds.append((binfrom, binto))
+            binfrom += binlen
+        if len(bounds) > bins:
+            bounds[bins-1] = (bounds[bins-1][0], bounds[-1][1])
+            bounds = bounds[0:bins]
+    sbounds = [str(bpair) for bpair in bounds]
+    ndataset = arfflib.__copyRows__(dataset)
+    for inst in ndataset:
+        v = inst[attrix]
+        if v != None:
+            vo = None
+            for i in range(0, len(bounds)):
+                if v >= bounds[i][0] and v < bounds[i][1]:
+                    vo = sbounds[i]
+                    break
+            if vo == None:
+                vo = sbounds[-1]
+            inst[attrix] = vo
+    if attrtype == 'string':
+        nattrmap[attrname] = (attrix, 'string')
+    else:
+        atype = "{'" + sbounds[0] + "'"
+        for nix in range(1, len(sbounds)):
+            atype = atype + ",'" + sbounds[nix] + "'"
+        atype = atype + '}'
+        nattrmap[attrname] = (attrix, ('nominal', atype, sbounds))
+    return (nattrmap, ndataset)
+
+def benchDiscretize(tmpdir, rows, cols):
+    '''
+    discretizeARFF of a numeric attribute into 100 bins, equal-width and
+    equal-frequency, with a Python sort and a per-row scan of the bins
+    before, one numpy sort and numpy.searchsorted after; then 1000 bins
+    of a ColumnarDataset of 50 * rows values.
+    '''
+    gen = random.Random(223)
+    attrmap = {'site' : (0, 'string'), 'x' : (1, 'numeric')}
+    dataset = [['site' + str(gen.randrange(0, 50)),
+        round(gen.gauss(0.0, 100.0), 2)] for r in range(0, rows)]
+    for useEqualFrequency in (False, True):
+        oldsecs, old = __timeit__(lambda : __legacyDiscretize__(attrmap,
+            dataset, 'x', 100, 'nominal', useEqualFrequency))
+        newsecs, new = __timeit__(lambda : arfflib.discretizeARFF(attrmap,
+            dataset, 'x', 100, 'nominal', useEqualFrequency))
+        if old != new:
+            raise ValueError('discretizeARFF results differ from the baseline')
+        __report__('discretizeARFF ' + ('equal-frequency' if useEqualFrequency
+            else 'equal-width'), rows, oldsecs, newsecs)
+    count = 50 * rows
+    column = arfflib.ARFFColumn('numeric', numpy.random.default_rng(
+        223).normal(0.0, 100.0, count), numpy.zeros(count, dtype=bool))
+    columnar = arfflib.ColumnarDataset([column])
+    for useEqualFrequency, quantileEdges in ((False, False), (True, False),
+            (True, True)):
+        secs, unused = __timeit__(lambda : arfflib.discretizeARFF(
+            {'x' : (0, 'numeric')}, columnar, 'x', 1000, 'nominal',
+                useEqualFrequency, quantileEdges))
+        sys.stdout.write('discretizeARFF columnar 1000 bins '
+            + ('quantileEdges' if quantileEdges else ('equal-frequency'
+                if useEqualFrequency else 'equal-width')) + ': '
+            + str(count) + ' values, ' + str(round(secs, 3)) + ' sec\n')
+
+def __legacyStringToNominal__(attrmap, dataset):
+    # StringToNominal of every string attribute as of arfflib_3_3 September
+    # 2022, with a row copy in place of copy.deepcopy, the "before" baseline.
+    nattrmap = copy.deepcopy(attrmap)
+    ndata = arfflib.__copyRows__(dataset)
+    for aname in attrmap.keys():
+        if attrmap[aname][1] != 'string':
+            continue
+        aindex = attrmap[aname][0]
+        values = []
+        for inst in ndata:
+            values.append(inst[aindex])
+        values = set(values)
+        setstring = "{"
+        liststring = []
+        prefix = ''
+        for v in values:
+            setstring += prefix + arfflib.quoteStringIfNeeded(v)
+            liststring.append(v)
+            prefix = ','
+        setstring += "}"
+        nattrmap[aname] = (aindex, ('nominal', setstring, liststring))
+    return (nattrmap, ndata)
+
+def benchNominal(tmpdir, rows, cols):
+    '''
+    StringToNominal of a high-cardinality string attribute, with a set and
+    a declaration built by string concatenation before, hashing passes
+    sharing one string per symbol after; also reports the distinct string
+    objects the converted column holds, and the traced memory a relation
+    read by readARFF retains after converting it in place of the original.
+    '''
+    fname = os.path.join(tmpdir, 'bench_nominal.arff')
+    gen = random.Random(223)
+    with open(fname, 'w') as outf:
+        outf.write('@relation bench\n@attribute id string\n'
+            + '@attribute x numeric\n@data\n')
+        for r in range(0, rows):
+            outf.write('id' + str(gen.randrange(0, rows // 4 + 1)) + ','
+                + str(round(gen.uniform(-100.0, 100.0), 4)) + '\n')
+    attrmap, dataset = arfflib.readARFF(fname)
+    oldsecs, old = __timeit__(lambda : __legacyStringToNominal__(attrmap,
+        dataset))
+    newsecs, new = __timeit__(lambda : arfflib.StringToNominal(attrmap,
+        dataset))
+    if sorted(old[0]['id'][1][2]) != new[0]['id'][1][2] or old[1] != new[1]:
+        raise ValueError('StringToNominal results differ from the baseline')
+    __report__('StringToNominal', rows, oldsecs, newsecs)
+    objects = [len(set(map(id, [inst[0] for inst in result[1]])))
+        for result in (old, new)]
+    old = new = dataset = None
+    retained = []
+    for converter in (__legacyStringToNominal__, arfflib.StringToNominal):
+        tracemalloc.start()
+        relation = converter(*arfflib.readARFF(fname))
+        retained.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        relation = None
+    sys.stdout.write('StringToNominal: distinct string objects in the column '
+        + 'before ' + str(objects[0]) + ', after ' + str(objects[1])
+        + '; retained traced memory before '
+        + str(round(retained[0] / 1e6, 1)) + ' MB, after '
+        + str(round(retained[1] / 1e6, 1)) + ' MB\n')
+
+def benchDerive(tmpdir, rows, cols):
+    '''
+    deriveARFF of a ratio, a clipped square and a band of numeric
+    attributes with unknowns imputed to 0, with per-instance FUNCs before,
+    and with the same expressions compiled to whole-column numpy
+    evaluation after, on a 2D list and on a ColumnarDataset. On numeric
+    attributes that mix ints and floats, expressions must give ints
+    exactly where FUNCs do.
+    '''
+    fname = os.path.join(tmpdir, 'bench_derive.arff')
+    __makeARFF__(fname, rows, max(cols, 5))
+    attrmap, dataset = arfflib.readARFF(fname)
+    x2, x3, x4 = [attrmap[name][0] for name in ('x2', 'x3', 'x4')]
+    known = lambda inst, offset : 0 if inst[offset] is None else inst[offset]
+    funcs = [
+        ('ratio', 'numeric', lambda inst : known(inst, x2) / known(inst, x3)
+            if known(inst, x3) != 0 else 0),
+        ('square', 'numeric', lambda inst : min(known(inst, x2)
+            * known(inst, x2), 5000)),
+        ('band', 'string', lambda inst : 'high' if inst[x4] is not None
+            and inst[x4] > 50 else ('low' if inst[x4] is not None
+                and inst[x4] < -50 else 'mid')),
+    ]
+    imputed = lambda name : '(0 if isunknown(' + name + ') else ' + name + ')'
+    expressions = [
+        ('ratio', 'numeric', imputed('x2') + ' / ' + imputed('x3') + ' if '
+            + imputed('x3') + ' != 0 else 0'),
+        ('square', 'numeric', 'min(' + imputed('x2') + ' * ' + imputed('x2')
+            + ', 5000)'),
+        ('band', 'string', "'high' if not isunknown(x4) and x4 > 50 else "
+            + "('low' if not isunknown(x4) and x4 < -50 else 'mid')"),
+    ]
+    oldsecs, old = __timeit__(lambda : arfflib.deriveARFF(attrmap, dataset,
+        funcs))
+    newsecs, new = __timeit__(lambda : arfflib.deriveARFF(attrmap, dataset,
+        expressions))
+    if old != new:
+        raise ValueError('deriveARFF expression results differ from FUNCs')
+    __report__('deriveARFF expressions', rows, oldsecs, newsecs)
+    attrmap, columnar = arfflib.readARFF(fname, columnar=True)
+    colsecs, colnew = __timeit__(lambda : arfflib.deriveARFF(attrmap,
+        columnar, expressions))
+    if colnew[1].tolist() != old[1]:
+        raise ValueError('Columnar deriveARFF expression results differ')
+    __report__('deriveARFF expressions, ColumnarDataset', rows, oldsecs,
+        colsecs)
+    gen = random.Random(223)
+    mixmap = {'a' : (0, 'numeric'), 'b' : (1, 'numeric')}
+    mixed = [[gen.choice([gen.randrange(-9, 10), gen.uniform(-9.0, 9.0)])
+        for c in range(0, 2)] for r in range(0, 1000)]
+    funcs = [('sum', 'numeric', lambda inst : inst[0] + inst[1]),
+        ('quotient', 'numeric', lambda inst : inst[0] // inst[1]
+            if inst[1] != 0 else 0),
+        ('bigger', 'string', lambda inst : max(inst[0], 1))]
+    expressions = [('sum', 'numeric', 'a + b'),
+        ('quotient', 'numeric', 'a // b if b != 0 else 0'),
+        ('bigger', 'string', 'max(a, 1)')]
+    old = arfflib.deriveARFF(mixmap, mixed, funcs)[1]
+    typed = lambda rows : [(type(v), v) for v in itertools.chain(*rows)]
+    for data in (mixed, arfflib.toColumnarARFF(mixmap, mixed)):
+        new = arfflib.deriveARFF(mixmap, data, expressions)[1]
+        if typed(old) != typed(new if isinstance(new, list)
+                else new.tolist()):
+            raise ValueError('deriveARFF expressions lose the ints of FUNCs')
+
+def __legacyJoin__(attrmap, dataset, rattrmap, rdataset):
+    # Sort both relations on their unique key and concatenate them by
+    # position with joinARFF, the "before" baseline, valid only when the
+    # keys of both relations are the same set.
+    left = arfflib.sortARFF(attrmap, dataset, ['key'])
+    right = arfflib.sortARFF(rattrmap, rdataset, ['key'])
+    return arfflib.joinARFF(attrmap, left, [('count', 'numeric'),
+        ('species', 'string')], [inst[1:] for inst in right])
+
+def benchJoin(tmpdir, rows, cols):
+    '''
+    Join of two relations on a unique numeric key, by sorting both and
+    concatenating them by position with joinARFF before, and with
+    keyJoinARFF's hash join after, on 2D lists and on ColumnarDatasets;
+    also reports keyJoinARFFfiles merge joining the two files. Joins
+    with an empty side must match on 2D lists and ColumnarDatasets.
+    '''
+    gen = random.Random(223)
+    attrmap = {'key' : (0, 'numeric'), 'site' : (1, 'string'),
+        'x' : (2, 'numeric')}
+    rattrmap = {'key' : (0, 'numeric'), 'count' : (1, 'numeric'),
+        'species' : (2, 'string')}
+    keys = list(range(0, rows))
+    gen.shuffle(keys)
+    dataset = [[k, 'site' + str(k % 97), round(gen.uniform(-100.0, 100.0),
+        4)] for k in keys]
+    gen.shuffle(keys)
+    rdataset = [[k, gen.randrange(0, 50), 'sp' + str(k % 13)] for k in keys]
+    oldsecs, old = __timeit__(lambda : __legacyJoin__(attrmap, dataset,
+        rattrmap, rdataset))
+    newsecs, new = __timeit__(lambda : arfflib.keyJoinARFF(attrmap, dataset,
+        rattrmap, rdataset, ['key']))
+    if old[0] != new[0] or sorted(old[1]) != sorted(new[1]):
+        raise ValueError('keyJoinARFF results differ from the baseline')
+    __report__('keyJoinARFF hash join', rows, oldsecs, newsecs)
+    left = arfflib.toColumnarARFF(attrmap, dataset)
+    right = arfflib.toColumnarARFF(rattrmap, rdataset)
+    colsecs, colnew = __timeit__(lambda : arfflib.keyJoinARFF(attrmap, left,
+        rattrmap, right, ['key']))
+    if sorted(colnew[1].tolist()) != sorted(old[1]):
+        raise ValueError('Columnar keyJoinARFF results differ')
+    __report__('keyJoinARFF, ColumnarDataset', rows, oldsecs, colsecs)
+    for lrows, rrows in ((dataset[:0], rdataset[:100]),
+            (dataset[:100], rdataset[:0]), (dataset[:0], rdataset[:0])):
+        for how in ('inner', 'left', 'outer'):
+            for method in ('hash', 'merge'):
+                expected = arfflib.keyJoinARFF(attrmap, lrows, rattrmap,
+                    rrows, ['key'], how=how, method=method)[1]
+                joined = arfflib.keyJoinARFF(attrmap,
+                    arfflib.toColumnarARFF(attrmap, lrows), rattrmap,
+                    arfflib.toColumnarARFF(rattrmap, rrows), ['key'],
+                    how=how, method=method)[1]
+                if joined.tolist() != expected:
+                    raise ValueError('Columnar keyJoinARFF of an empty side '
+                        + 'differs')
+    lname = os.path.join(tmpdir, 'bench_join_left.arff')
+    rname = os.path.join(tmpdir, 'bench_join_right.arff')
+    oname = os.path.join(tmpdir, 'bench_join_out.arff')
+    arfflib.writeARFF(lname, 'left', attrmap, dataset, clobber=True)
+    arfflib.writeARFF(rname, 'right', rattrmap, rdataset, clobber=True)
+    filesecs, written = __timeit__(lambda : arfflib.keyJoinARFFfiles(lname,
+        rname, oname, 'joined', ['key'], batchSize=max(1, rows // 8),
+            tmpdir=tmpdir, clobber=True))
+    sys.stdout.write('keyJoinARFFfiles: ' + str(written) + ' instances in '
+        + str(round(filesecs, 3)) + ' sec, reading batches of '
+        + str(max(1, rows // 8)) + '\n')
+
+def __legacyGroupby__(attrmap, dataset):
+    # Sort on the group attributes, then walk the runs of equal keys with
+    # the statistics module, as the course scripts do, the "before"
+    # baseline.
+    site, x2, x3 = [attrmap[name][0] for name in ('site', 'x2', 'x3')]
+    ordered = sorted(dataset, key=lambda inst : (inst[site] is None,
+        inst[site] or ''))
+    result = []
+    for key, group in itertools.groupby(ordered, key=lambda inst :
+            inst[site]):
+        group = list(group)
+        temps = [inst[x2] for inst in group if inst[x2] is not None]
+        winds = [inst[x3] for inst in group if inst[x3] is not None]
+        result.append([key, len(group), statistics.mean(temps),
+            arfflib.stats.pstdev(temps), max(temps), statistics.median(winds)])
+    return result
+
+def benchGroupby(tmpdir, rows, cols):
+    '''
+    Count, mean, pstdev and max of one attribute and median of another
+    per value of a nominal attribute, by sorting and the statistics
+    module before, and with groupbyARFF after, on a 2D list and on a
+    ColumnarDataset; also reports groupbyARFFfile on the file itself.
+    '''
+    fname = os.path.join(tmpdir, 'bench_groupby.arff')
+    __makeARFF__(fname, rows, max(cols, 4))
+    attrmap, dataset = arfflib.readARFF(fname)
+    aggregates = [('n', 'count', None), ('avgX2', 'mean', 'x2'),
+        ('sdX2', 'pstdev', 'x2'), ('maxX2', 'max', 'x2'),
+        ('medX3', 'median', 'x3')]
+    oldsecs, old = __timeit__(lambda : __legacyGroupby__(attrmap, dataset))
+    newsecs, new = __timeit__(lambda : arfflib.groupbyARFF(attrmap, dataset,
+        ['site'], aggregates))
+    for orow, nrow in zip(old, new[1]):
+        if len(old) != len(new[1]) or orow[0:2] != nrow[0:2] \
+                or orow[4:] != nrow[4:] or not numpy.allclose(orow[2:4],
+                    nrow[2:4]):
+            raise ValueError('groupbyARFF results differ from the baseline')
+    __report__('groupbyARFF', rows, oldsecs, newsecs)
+    attrmap, columnar = arfflib.readARFF(fname, columnar=True)
+    colsecs, colnew = __timeit__(lambda : arfflib.groupbyARFF(attrmap,
+        columnar, ['site'], aggregates))
+    __report__('groupbyARFF, ColumnarDataset', rows, oldsecs, colsecs)
+    filesecs, filenew = __timeit__(lambda : arfflib.groupbyARFFfile(fname,
+        ['site'], aggregates))
+    sys.stdout.write('groupbyARFFfile: ' + str(rows) + ' rows in '
+        + str(round(filesecs, 3)) + ' sec, including parsing\n')
+    gen = random.Random(223)
+    mixmap = {'g' : (0, 'string'), 'v' : (1, 'numeric')}
+    mixed = [[gen.choice(['a', 'b', 'c']), gen.choice([4, 4.0, 2.5, 1, None])]
+        for r in range(0, 1000)]
+    expected = [[g, ','.join(map(str, arfflib.multimode([inst[1]
+        for inst in mixed if inst[0] == g and inst[1] is not None])))]
+            for g in ('a', 'b', 'c')]
+    for data in (mixed, arfflib.toColumnarARFF(mixmap, mixed)):
+        for exactMode in (True, False):
+            modes = arfflib.groupbyARFF(mixmap, data, ['g'],
+                [('m', 'multimode', 'v')], exactMode)[1]
+            if list(modes) != expected:
+                raise ValueError('groupbyARFF multimode differs from '
+                    + 'multimode')
+
+def __legacyConfusion__(labels, actual, predicted):
+    # Index the labels and count each pair into a 2D list in a Python loop,
+    # as callers of kappa did, the "before" baseline.
+    index = dict([(labels[ix], ix) for ix in range(0, len(labels))])
+    matrix = [[0 for label in labels] for label in labels]
+    for a, p in zip(actual, predicted):
+        matrix[index[a]][index[p]] += 1
+    return (matrix, arfflib.kappa(matrix))
+
+def benchKappa(tmpdir, rows, cols):
+    '''
+    Confusion matrix and kappa of actual and predicted class labels, from
+    a Python loop over the pairs before, and with ConfusionMatrix's
+    integer encoding and bincount after, on lists of label strings and
+    on nominal ARFFColumns in streamed batches.
+    '''
+    gen = random.Random(223)
+    labels = ['class' + str(c) for c in range(0, max(cols, 2))]
+    actual = [gen.choice(labels) for r in range(0, rows)]
+    predicted = [a if gen.random() < 0.7 else gen.choice(labels)
+        for a in actual]
+    oldsecs, old = __timeit__(lambda : __legacyConfusion__(labels, actual,
+        predicted))
+    def __matrix__():
+        matrix = arfflib.ConfusionMatrix(labels)
+        matrix.update(actual, predicted)
+        return (matrix.tolist(), matrix.kappa())
+    newsecs, new = __timeit__(__matrix__)
+    if old != new:
+        raise ValueError('ConfusionMatrix results differ from the baseline')
+    __report__('ConfusionMatrix', rows, oldsecs, newsecs)
+    nominal = ('nominal', '{' + ','.join(labels) + '}', labels)
+    attrmap = {'actual' : (0, nominal), 'predicted' : (1, nominal)}
+    columnar = arfflib.toColumnarARFF(attrmap, [list(pair)
+        for pair in zip(actual, predicted)])
+    def __batches__():
+        matrix = arfflib.ConfusionMatrix(labels)
+        for start in range(0, rows, 100000):
+            batch = columnar[start:start+100000]
+            matrix.update(batch.columns[0], batch.columns[1])
+        return (matrix.tolist(), matrix.kappa())
+    colsecs, colnew = __timeit__(__batches__)
+    if old != colnew:
+        raise ValueError('Columnar ConfusionMatrix results differ')
+    __report__('ConfusionMatrix, ColumnarDataset batches', rows, oldsecs,
+        colsecs)
+
+def __legacyCorrelations__(attrmap, dataset, names):
+    # One wekaCorrelationCoefficent call on Python lists per pair of
+    # attributes, after deleting the pair's unknowns, the "before" baseline.
+    result = [[None for name in names] for name in names]
+    for i in range(0, len(names)):
+        for j in range(0, len(names)):
+            ix = attrmap[names[i]][0]
+            jx = attrmap[names[j]][0]
+            pairs = [(inst[ix], inst[jx]) for inst in dataset
+                if inst[ix] is not None and inst[jx] is not None]
+            result[i][j] = arfflib.wekaCorrelationCoefficent(
+                [p[0] for p in pairs], [p[1] for p in pairs])
+    return result
+
+def benchCorrelation(tmpdir, rows, cols):
+    '''
+    wekaCorrelationCoefficent of every pair of numeric attributes, with
+    pairwise deletion of unknowns, from one call per pair before, and
+    from correlationMatrixARFF's matrix products after, on a 2D list and
+    on a ColumnarDataset; also reports correlationMatrixARFFfile.
+    '''
+    fname = os.path.join(tmpdir, 'bench_correlation.arff')
+    __makeARFF__(fname, rows, max(cols, 4))
+    attrmap, dataset = arfflib.readARFF(fname)
+    names = sorted([name for name in attrmap.keys()
+        if attrmap[name][1] == 'numeric'], key=lambda n : attrmap[n][0])
+    oldsecs, old = __timeit__(lambda : __legacyCorrelations__(attrmap,
+        dataset, names))
+    newsecs, new = __timeit__(lambda : arfflib.correlationMatrixARFF(attrmap,
+        dataset, names))
+    if not numpy.allclose(old, new.coefficients(), rtol=0, atol=1e-9):
+        raise ValueError('correlationMatrixARFF differs from the baseline')
+    __report__('correlationMatrixARFF, ' + str(len(names)) + ' attributes',
+        rows, oldsecs, newsecs)
+    attrmap, columnar = arfflib.readARFF(fname, columnar=True)
+    colsecs, colnew = __timeit__(lambda : arfflib.correlationMatrixARFF(
+        attrmap, columnar, names))
+    __report__('correlationMatrixARFF, ColumnarDataset', rows, oldsecs,
+        colsecs)
+    filesecs, filenew = __timeit__(lambda : arfflib.correlationMatrixARFFfile(
+        fname, names))
+    if not numpy.allclose(old, filenew.coefficients(), rtol=0, atol=1e-9):
+        raise ValueError('correlationMatrixARFFfile differs from the baseline')
+    sys.stdout.write('correlationMatrixARFFfile: ' + str(rows) + ' rows in '
+        + str(round(filesecs, 3)) + ' sec, including parsing\n')
+
+def __legacyStats__(fname):
+    # Whole-column statistics module calls after readARFF, as getstats
+    # in CSC223f23CSVassn1.py does, the "before" baseline.
+    attrmap, dataset = arfflib.readARFF(fname)
+    result = {}
+    for name in attrmap.keys():
+        if attrmap[name][1] == 'numeric':
+            column = [inst[attrmap[name][0]] for inst in dataset
+                if inst[attrmap[name][0]] is not None]
+            result[name] = (statistics.mean(column), statistics.median(column),
+                arfflib.stats.pstdev(column))
+    return result
+
+def benchStats(tmpdir, rows, cols):
+    '''
+    Mean, median and pstdev of every numeric attribute of an ARFF file,
+    with readARFF and the statistics module before, and with
+    streamStatsARFF's constant-memory sketches after; also reports each
+    one's peak traced memory and the sketch medians' worst rank error.
+    '''
+    fname = os.path.join(tmpdir, 'bench_stats.arff')
+    __makeARFF__(fname, rows, cols)
+    results = []
+    for func in (lambda : __legacyStats__(fname),
+            lambda : arfflib.streamStatsARFF(fname, seed=223)):
+        tracemalloc.start()
+        func()
+        results.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        results.append(__timeit__(func))
+    oldpeak, (oldsecs, old), newpeak, (newsecs, new) = results
+    attrmap, dataset = arfflib.readARFF(fname)
+    worst = 0.0
+    for name in old.keys():
+        summary = new[name].summary()
+        if abs(summary['mean'] - old[name][0]) > 1e-9 * abs(old[name][2])  \
+                or abs(summary['pstdev'] - old[name][2]) > 1e-9 * old[name][2]:
+            raise ValueError('streamStatsARFF moments differ from the baseline')
+        column = [inst[attrmap[name][0]] for inst in dataset
+            if inst[attrmap[name][0]] is not None]
+        below = len([v for v in column if v <= summary['median']])
+        worst = max(worst, abs(below / len(column) - 0.5))
+    __report__('streamStatsARFF', rows, oldsecs, newsecs)
+    sys.stdout.write('streamStatsARFF: peak traced memory before '
+        + str(round(oldpeak / 1e6, 1)) + ' MB, after '
+        + str(round(newpeak / 1e6, 1)) + ' MB, worst median rank error '
+        + str(round(worst, 4)) + '\n')
+
+__benchmarks__ = {
+    'cache'     :   benchCache,
+    'correlation':  benchCorrelation,
+    'derive'    :   benchDerive,
+    'discretize':   benchDiscretize,
+    'fitted'    :   benchFitted,
+    'groupby'   :   benchGroupby,
+    'impute'    :   benchImpute,
+    'join'      :   benchJoin,
+    'kappa'     :   benchKappa,
+    'memmap'    :   benchMemmap,
+    'nominal'   :   benchNominal,
+    'normalize' :   benchNormalize,
+    'parallel'  :   benchParallel,
+    'project'   :   benchProject,
+    'readARFF'  :   benchReadARFF,
+    'readCSV'   :   benchReadCSV,
+    'sort'      :   benchSort,
+    'stats'     :   benchStats,
+    'transforms':   benchTransforms,
+    'writeARFF' :   benchWriteARFF,
+}
+
+__USAGE__ = 'USAGE: python arffbench.py BENCHMARK [ROWS [COLUMNS]]\n'       \
+    + '\twhere BENCHMARK is one of ' + ', '.join(sorted(__benchmarks__)) \
+    + ' or all\n'
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or len(sys.argv) > 4 or not (
+            sys.argv[1] in __benchmarks__ or sys.argv[1] == 'all'):
+        sys.stderr.write(__USAGE__)
+        sys.exit(1)
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    cols = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    names = sorted(__benchmarks__) if sys.argv[1] == 'all' else [sys.argv[1]]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in names:
+            __benchmarks__[name](tmpdir, rows, cols)
+    sys.exit(0)
@@ -1,4 +1,90 @@
 '''
+Extensions to arfflib_3_3.py in October 2026:
+    A. Added opt-in columnar datasets: a ColumnarDataset holds one read-only
+       ARFFColumn numpy array per attribute plus an unknown (None) mask.
+       readARFF and readCSV return one when columnar=True, toColumnarARFF
+       and fromColumnarARFF convert to and from the 2D list form, and
+       writeARFF, projectARFF, sortARFF, imputeARFF and Normalize accept
+       either form, returning the same form they were given.
+    B. Added iterARFF to stream an ARFF file's instances in bounded batches
+       (including .arff.gz) and writeARFFbatches to write such batches.
+    C. readCSV infers and converts types a column at a time, sampling each
+       column before converting it with one bulk float() pass.
+    D. readARFF tokenizes blocks of data lines once, quoted lines with the
+       csv module's C tokenizer, then converts each attribute's fields a
+       column at a time with converters chosen up front, and it reads
+       sparse {index value, ...} instances. Both ' and " quoted values
+       (including dates) are stored without their quotes, and the
+       backslash escapes of backslashes and quotes that writeARFF puts
+       inside quotes are undone.
+    E. Added readARFFparallel and readCSVparallel, which split a large
+       file's data into byte ranges on record boundaries and parse them in
+       a process pool, and readARFFfiles to read and merge many files
+       concurrently.
+    F. readARFF and readCSV take a cache parameter (or environment variable
+       ARFFLIB_CACHE=1) to save each parsed relation in a binary .npz
+       sidecar keyed by path, size and mtime, and reuse it on later reads.
+       Their memoryMapped parameter maps the sidecar's column arrays as
+       numpy.memmap views, and ColumnarDataset.tolist can convert only
+       the columns needed; Normalize and wekaCorrelationCoefficent read
+       such columns directly.
+    G. writeARFF formats a block of rows a column at a time with a
+       formatter chosen per column, writes through a 1 MB buffer, and
+       takes a gzip compresslevel and threaded compressThreads option.
+    H. projectARFF of a 2D list copies the kept cells with C-level
+       itemgetter calls, or with view=True returns a lazy ProjectedDataset
+       view that materializes on first row access, and tests ('useless',)
+       columns with C-level set building instead of a per-cell loop.
+    I. Transforms copy 2D list datasets row by row instead of with
+       copy.deepcopy, sharing the immutable attribute-values, and
+       deriveARFF, discretizeARFF and ARFFtoCSV accept a ColumnarDataset,
+       sharing its unchanged columns.
+    J. sortARFF sorts a 2D list with typed numpy keys built once per key
+       attribute and a stable numpy.lexsort, placing unknown values per its
+       unknowns parameter, and sortARFFfile external-merge-sorts ARFF files
+       too large for memory.
+    K. imputeARFF computes named replacements for 2D lists with numpy, one
+       sort per attribute, as for ColumnarDatasets, imputes per group of
+       its new groupBy attributes, and adds 'ffill' and 'bfill'.
+    L. Added mergeable constant-memory statistics: StreamingMoments,
+       QuantileSketch (KLL), HeavyHitters (Misra-Gries, or exact) and
+       ColumnStats combining them, and streamStatsARFF to summarize an
+       ARFF file's attributes in byte ranges, optionally in parallel.
+    M. Normalize scans all selected attributes in one vectorized pass and
+       scales a column at a time, adds 'zscore' and 'robust' modes, and
+       reuses normalizeParameters' (center, scale) per attribute, e.g.,
+       from a training set on a test set.
+    N. Added fitted transforms StringToNominalTransform, NormalizeTransform
+       and DiscretizeTransform, whose learned vocabularies, scaling and bin
+       bounds apply to new datasets or iterARFF batches without refitting,
+       and saveTransforms and loadTransforms to store them.
+    O. discretizeARFF bins all rows at once with numpy.searchsorted on its
+       bin bounds, finds equal-frequency bounds with one numpy sort and a
+       binary search per bin (or takes quantileEdges at evenly spaced
+       ranks), and stores one shared label per bin, or bin codes in a
+       ColumnarDataset.
+    P. StringToNominal declares its symbols in sorted order and makes each
+       2D list value the one shared string of its symbol in one hashing
+       pass. ARFFtoCSV no longer truncates 2D list nominal values to their
+       first character.
+    Q. deriveARFF accepts expression strings and ColumnExpressions, which
+       are compiled once and evaluated with numpy over whole columns.
+    R. keyJoinARFF joins two relations on key attributes (inner, left or
+       outer) with a hash table or a sort-merge, and keyJoinARFFfiles
+       merge joins ARFF files too large for memory.
+    S. groupbyARFF aggregates count, sum, mean, min, max, pstdev, median
+       and multimode per group of instances, GroupAggregator does so over
+       batches with mergeable partial aggregates, and groupbyARFFfile over
+       ARFF files too large for memory, in parallel processes.
+    T. kappa sums its confusion matrix with numpy, and ConfusionMatrix
+       builds one from actual and predicted labels with integer codes and
+       numpy.bincount, by batches and mergeable, with accuracy and
+       per-class precision and recall; see also confusionMatrixARFF.
+    U. CorrelationMatrix and correlationMatrixARFF compute the
+       wekaCorrelationCoefficent of every pair of numeric attributes at
+       once with numpy, deleting unknowns pairwise, by batches and
+       mergeable, and correlationMatrixARFFfile for large files.
+       wekaCorrelationCoefficent compares the lengths of both lists.
 Upgrade to arfflib_3_3.py in September 2022:
     A. Avoid divide-by-0 in wekaCorrelationCoefficent.
     B. Support read .arff.gz and .csv.gz files in readARFF() and readCSV
@@ -70,8 +156,20 @@ import types
 import random
 import csv
 import gzip
+import ast
+import zipfile
+import gc
+import io
+import multiprocessing
+import concurrent.futures
+import collections
+import itertools
+import operator
+import heapq
+import tempfile
+import shutil
+import locale
 import statistics as stats
-from statistics import mean, median
 
 # __attr_re__ = re.compile(r'^\s*@attribute\s+(\S+)\s+(\S+)')
 # __date_re__ parenthesizes name and date-format
@@ -166,86 +264,602 @@ def __getAttrIndices__(af):
         line = af.readline()
     return result
 
-def __getDataset__(af, amap):
-    # Start helper function __mergeInstanceStrings__.
-    def __mergeInstanceStrings__(instlist):
-        # We have split along ','; fix cases here ',' is in a quoted string.
-        # WHEN A STRING CONTAINS A "," MERGE WITH ITS PARTNER
+# __quotedfield_re__ matches a whole '- or "-quoted data field (group 1),
+# ignoring spaces around it, that starts at the line start or after a ','.
+__quotedfield_re__ = re.compile(
+    r"""(?:^|(?<=,))\s*('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")\s*(?=,|$)""")
+# __sparse_re__ matches one "index value" pair of a sparse {...} instance.
+__sparse_re__ = re.compile(
+    r"""\s*(\d+)\s+('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|[^,]*?)\s*(?:,|$)""")
+# __escape_re__ matches a backslash-escaped backslash or quote inside a
+# quoted data field, as quoteStringIfNeeded writes them.
+__escape_re__ = re.compile(r'''\\([\\'"])''')
+__DATA_BLOCK__ = 4096   # data lines tokenized & converted together
+
+def __unquote__(field):
+    # Strip one level of matching ' or " quotes from a data field.
+    if len(field) > 1 and field[0] in '\'"' and field[-1] == field[0]:
+        return field[1:-1]
+    return field
+
+def __unescapeQuoted__(field):
+    # Strip the quotes of a quoted data field and its escapes of \\, \' & \".
+    return __escape_re__.sub(r'\1', field[1:-1])
+
+def __splitARFFline__(sline):
+    # Tokenize one stripped ARFF data line into its list of field strings,
+    # keeping commas that are inside quoted fields, which are unquoted
+    # and unescaped. The regex scan finds only quoted fields; str.split
+    # does the rest.
+    fields = []
+    pos = 0
+    for m in __quotedfield_re__.finditer(sline):
+        if m.start() > pos:     # unquoted fields, and the ',' before m
+            fields.extend(sline[pos:m.start()-1].split(','))
+        fields.append(__unescapeQuoted__(m.group(1)))
+        pos = m.end() + 1       # skip the ',' after m
+    if pos <= len(sline):
+        fields.extend(sline[pos:].split(','))
+    return fields
+
+def __splitQuotedLines__(slines, quotechar):
+    # Tokenize stripped data lines that quote with quotechar using the
+    # csv module's C tokenizer in one pass, falling back to
+    # __splitARFFline__ when an unterminated quote spans lines.
+    rows = list(csv.reader(slines, delimiter=',', quotechar=quotechar,
+        skipinitialspace=True, strict=False))
+    if len(rows) != len(slines):
+        rows = [__splitARFFline__(sline) for sline in slines]
+    return rows
+
+def __indicesOf__(cells, value):
+    # Return the list of indices of value in list cells, using C-level
+    # list.index() scans rather than a Python loop over every cell.
+    result = []
+    try:
+        ix = cells.index(value)
+        while True:
+            result.append(ix)
+            ix = cells.index(value, ix+1)
+    except ValueError:
+        pass
+    return result
+
+def __numericField__(field):
+    # Numeric data field, an int when it is integral without a '.'.
+    vf = float(field)
+    if '.' in field or not vf.is_integer():
+        return vf
+    return int(vf)
+
+def __numericColumn__(cells):
+    # Convert a list of numeric field strings with '?' unknowns a column at
+    # a time, an int where a value is integral without a '.'. A C-level scan
+    # of the joined text picks map(int) or map(float) for uniform columns.
+    unknowns = __indicesOf__(cells, '?')
+    for ix in unknowns:
+        cells[ix] = '0'
+    joined = ''.join(cells)
+    result = None
+    try:
+        if not ('.' in joined or 'e' in joined or 'E' in joined
+                or 'n' in joined or 'N' in joined or '_' in joined):
+            result = list(map(int, cells))
+        elif joined.count('.') == len(cells) - len(unknowns):
+            result = list(map(float, cells))
+    except ValueError:
+        result = None
+    if result is None:
+        result = list(map(__numericField__, cells))
+    for ix in unknowns:
+        result[ix] = None
+    return result
+
+def __stringColumn__(cells):
+    # Convert a list of (already unquoted) string or nominal field strings.
+    for ix in __indicesOf__(cells, '?'):
+        cells[ix] = None
+    return cells
+
+def __dateColumnConverter__(pformat):
+    # Return the column converter for date fields with strptime format
+    # pformat. Parsed dates are cached because dates repeat in most
+    # relations. A Weka format quoted in its @attribute line is unquoted.
+    pformat = __unquote__(pformat)
+    cache = {}
+    def __dateColumn__(cells):
         result = []
-        ix = 0
-        while ix < len(instlist):
-            field = instlist[ix]
-            if (field.startswith("'") or field.startswith('"')):
-                terminator = field[0]
-                fld = field
-                if fld.endswith(terminator):
-                    result.append(fld)
-                    ix += 1
-                else:
-                    ix += 1
-                    while ix < len(instlist):
-                        f = instlist[ix]
-                        # Re-insert the commas as part of the quoted string.
-                        if (f.endswith(terminator)):
-                            fld = fld + ',' + f
-                            ix += 1
-                            break
-                        else:
-                            fld = fld + ',' + f
-                            ix += 1
-                    result.append(fld)
-            else:
-                result.append(field)
-                ix += 1
+        for field in cells:
+            if field == '?':
+                result.append(None)
+                continue
+            value = cache.get(field)
+            if value is None:
+                value = (field, datetime.datetime.strptime(field, pformat))
+                if len(cache) < 65536:
+                    cache[field] = value
+            result.append(value)
         return result
-    # End helper function __mergeInstanceStrings__.
+    return __dateColumn__
+
+def __columnConverters__(amap):
+    # Return the list of per-position column converter functions for the
+    # attribute map, resolved once before reading any data. Each takes a
+    # list of field strings and returns the list of data values.
+    offsetTOnameType = remapAttributes(amap)
+    converters = []
+    for ix in range(0, len(offsetTOnameType)):
+        t = offsetTOnameType[ix][1]
+        if t == 'numeric':
+            converters.append(__numericColumn__)
+        elif isinstance(t, tuple) and len(t) == 3 and t[0] == 'date':
+            converters.append(__dateColumnConverter__(t[2]))
+        else:
+            converters.append(__stringColumn__)
+    return converters
+
+def __sparseDefaults__(amap):
+    # Return the instance of omitted values of a sparse {...} instance:
+    # 0 for numeric, the first symbol for nominal, '' for string, else None.
+    offsetTOnameType = remapAttributes(amap)
+    defaults = []
+    for ix in range(0, len(offsetTOnameType)):
+        t = offsetTOnameType[ix][1]
+        if t == 'numeric':
+            defaults.append(0)
+        elif t == 'string':
+            defaults.append('')
+        elif isinstance(t, tuple) and len(t) == 3 and t[0] == 'nominal':
+            defaults.append(__unquoteNominal__(t[2][0]) if t[2] else None)
+        else:
+            defaults.append(None)
+    return defaults
+
+def __parseDataBlock__(slines, amap, converters):
+    # Tokenize & convert a block of stripped, non-comment data lines into
+    # instances. Dense lines are converted a column at a time.
+    nattrs = len(converters)
+    fieldrows = [None for sline in slines]
+    singles = []
+    doubles = []
+    sparse = []
+    for ix in range(0, len(slines)):
+        sline = slines[ix]
+        if sline[0] == '{':
+            sparse.append(ix)
+        elif "'" in sline:
+            if '"' in sline or '\\' in sline:
+                fieldrows[ix] = __splitARFFline__(sline)
+            else:
+                singles.append(ix)
+        elif '"' in sline:
+            if '\\' in sline:
+                fieldrows[ix] = __splitARFFline__(sline)
+            else:
+                doubles.append(ix)
+        else:
+            fieldrows[ix] = sline.split(',')
+    for indices, quotechar in ((singles, "'"), (doubles, '"')):
+        if indices:
+            rows = __splitQuotedLines__([slines[ix] for ix in indices],
+                quotechar)
+            for ix, row in zip(indices, rows):
+                fieldrows[ix] = row
+    dense = [row for row in fieldrows if row is not None]
+    for row in dense:
+        if len(row) < nattrs:
+            sys.stderr.write("ERROR, instance has length "
+                + str(len(row)) + ", expected " + str(nattrs)
+                + " attributes:\n\t" + str(row) + "\n")
+            sys.stderr.flush()
+            raise ValueError("ARFF instance has too few attributes: "
+                + ','.join(row))
     result = []
-    line = af.readline()
-    while line:
-        sline = line.strip()
-        if sline[0:1] == '%':       # Comment line
-            line = af.readline()
+    if dense and nattrs > 0:
+        columns = list(zip(*dense))[0:nattrs]
+        columns = [conv(list(col)) for conv, col in zip(converters, columns)]
+        result = list(map(list, zip(*columns)))
+        for ix in range(0, len(dense)):
+            if len(dense[ix]) > nattrs:
+                result[ix].extend(dense[ix][nattrs:])
+    elif dense:
+        result = [[] for row in dense]
+    if not sparse:
+        return result
+    defaults = __sparseDefaults__(amap)
+    merged = []
+    denseix = 0
+    for ix in range(0, len(slines)):
+        if fieldrows[ix] is not None:
+            merged.append(result[denseix])
+            denseix += 1
             continue
-        instance = sline.split(',')
-        # WHEN A STRING CONTAINS A "," MERGE WITH ITS PARTNER
-        instance = __mergeInstanceStrings__(instance)
-        for a in amap.keys():
-            pos, t = amap[a]
-            # print("DEBUG dataset", a, pos, t, instance[pos], instance)
-            if pos >= len(instance):
-                sys.stderr.write("ERROR, attribute " + str(a)
-                    + "maps to position, type " + str(pos) + "," + str(t)
-                    + ", instance has length " + str(len(instance))
-                    + ":\n\t" + str(instance) + "\n")
-                sys.stderr.flush()
-            if instance[pos] == '?':
-                instance[pos] = None
-            elif t == 'numeric':
-#               sys.stderr.write("DEBUG instance[pos]: "
-#                   + str(instance[pos]) + '\n')
-                vf = float(instance[pos])
-                vi = int(vf)
-                v = vi if (vi == vf and not '.' in instance[pos]) else vf
-                instance[pos] = v
-            elif t == 'string' and instance[pos].startswith("'"):
-                instance[pos] = instance[pos][1:-1]
-            elif isinstance(t, tuple) and len(t) == 3 and t[0] == 'date':
-                # No need to strip anything.
-                instance[pos] = (instance[pos],
-                    datetime.datetime.strptime(instance[pos], t[2]))
-            elif isinstance(t, tuple) and len(t) == 3 and t[0] == 'nominal':
-                if instance[pos].startswith("'"):
-                    instance[pos] = instance[pos][1:-1]
-                # instance[pos] = (instance[pos], instance[pos])
-                # pass        # store same as before 9/20/2020, but not twice
-                # if instance[pos].startswith("'"):
-                    # instance[pos] = instance[pos][1:-1] # data now stored like a string
-        result.append(instance)
-        # print("DEBUG instance", instance)
-        line = af.readline()
+        sline = slines[ix]
+        instance = list(defaults)
+        for m in __sparse_re__.finditer(sline[1:sline.rfind('}')]):
+            pos = int(m.group(1))
+            field = m.group(2)
+            if len(field) > 1 and field[0] in '\'"' and field[-1] == field[0]:
+                field = __unescapeQuoted__(field)
+            instance[pos] = converters[pos]([field])[0]
+        merged.append(instance)
+    return merged
+
+def __getDataset__(af, amap, maxInstances=None):
+    # Reads up to maxInstances data lines (all of them when None) from the
+    # current position of af, so callers may also read in batches.
+    # Blocks of lines are tokenized once (see __parseDataBlock__) and
+    # their fields converted by per-attribute converters chosen up front.
+    # Sparse instances "{index value, ...}" are expanded to full instances.
+    converters = __columnConverters__(amap)
+    result = []
+    isCollecting = gc.isenabled()
+    gc.disable()    # avoid rescanning the growing result; see readCSV
+    try:
+        isReading = True
+        while isReading and (maxInstances is None
+                or len(result) < maxInstances):
+            want = __DATA_BLOCK__ if maxInstances is None \
+                else min(__DATA_BLOCK__, maxInstances - len(result))
+            slines = []
+            while len(slines) < want:
+                line = af.readline()
+                if not line:
+                    isReading = False
+                    break
+                sline = line.strip()
+                if sline[0:1] == '%' or sline == '':   # Comment or blank
+                    continue
+                slines.append(sline)
+            if slines:
+                result.extend(__parseDataBlock__(slines, amap, converters))
+    finally:
+        if isCollecting:
+            gc.enable()
     return result
 
-def readARFF(fname):
+def __columnKind__(atype):
+    # Map an attrmap type entry to an ARFFColumn kind. Only 'numeric' types
+    # are converted to numbers by __getDataset__, so any other atomic type
+    # tag (e.g., 'real' or 'integer') holds strings, same as 'string'.
+    if isinstance(atype, tuple) and atype[0] in ('nominal', 'date'):
+        return atype[0]
+    elif atype == 'numeric':
+        return 'numeric'
+    return 'string'
+
+__COLUMNAR_BLOCK__ = 65536      # rows per block when iterating or writing
+
+class ARFFColumn(object):
+    '''
+    ARFFColumn holds the attribute-values of one attribute of a
+    ColumnarDataset. kind is 'numeric', 'nominal', 'string' or 'date'.
+    values is a read-only numpy array: int64 or float64 for 'numeric'
+    (int64 only when every known value is an int), int32 codes into the
+    categories tuple of strings for 'nominal' and 'string', and
+    datetime64[us] for 'date'. mask is a read-only numpy bool array that
+    is True where the attribute-value is unknown (None); unknown codes are -1.
+    dateformat is the Python strptime format of a 'date' attribute, used
+    to regenerate the STRING_VALUE of its (STRING_VALUE, datetime) row form.
+    intmask is None, or for a float64 'numeric' column that mixes ints and
+    floats, a read-only numpy bool array that is True where a known value
+    was an int, so the row form and writeARFF give back 1 and not 1.0.
+    An ARFFColumn is never mutated after construction, so ColumnarDatasets
+    may share columns instead of copying them.
+    '''
+    def __init__(self, kind, values, mask, categories=None, dateformat=None,
+            intmask=None):
+        self.kind = kind
+        self.values = values
+        self.mask = mask
+        self.categories = categories
+        self.dateformat = dateformat
+        if intmask is not None and (values.dtype.kind != 'f'
+                or not intmask.any()):
+            intmask = None
+        self.intmask = intmask
+        if values.flags.writeable:
+            values.flags.writeable = False
+        if mask.flags.writeable:
+            mask.flags.writeable = False
+        if intmask is not None and intmask.flags.writeable:
+            intmask.flags.writeable = False
+    def __len__(self):
+        return len(self.values)
+    def take(self, indices):
+        '''
+        Return a new ARFFColumn holding the rows selected by indices,
+        which is a slice, an int index array or a bool array.
+        '''
+        return ARFFColumn(self.kind, self.values[indices], self.mask[indices],
+            self.categories, self.dateformat,
+            None if self.intmask is None else self.intmask[indices])
+    def get(self, ix, isUsingNan=False):
+        '''
+        Return row ix's attribute-value in the 2D list form of readARFF.
+        isUsingNan True returns numpy.nan for an unknown numeric value.
+        '''
+        if self.mask[ix]:
+            return numpy.nan if (isUsingNan and self.kind == 'numeric') \
+                else None
+        if self.kind == 'numeric':
+            if self.intmask is not None and self.intmask[ix]:
+                return int(self.values[ix])
+            return self.values[ix].item()
+        elif self.kind == 'date':
+            dt = self.values[ix].astype(object)
+            return (dt.strftime(self.dateformat), dt)
+        return self.categories[self.values[ix]]
+    def tolist(self, isUsingNan=False):
+        '''
+        Return this column's attribute-values as a list in the 2D list
+        form of readARFF. isUsingNan True uses numpy.nan for unknown numerics.
+        '''
+        if self.kind == 'numeric':
+            result = self.__numbers__()
+            if self.mask.any():
+                unknown = numpy.nan if isUsingNan else None
+                for ix in numpy.flatnonzero(self.mask).tolist():
+                    result[ix] = unknown
+            return result
+        elif self.kind == 'date':
+            fmt = self.dateformat
+            return [None if dt is None else (dt.strftime(fmt), dt)
+                for dt in self.values.astype(object).tolist()]
+        # The extra trailing None is what the unknown code -1 selects.
+        lookup = numpy.array(self.categories + (None,), dtype=object)
+        return lookup[self.values].tolist()
+    def __numbers__(self):
+        # The 'numeric' values as a list of Python ints and floats, with
+        # the ints of intmask restored; unknown positions are arbitrary.
+        result = self.values.tolist()
+        if self.intmask is not None:
+            for ix in numpy.flatnonzero(self.intmask).tolist():
+                result[ix] = int(result[ix])
+        return result
+    def sortKey(self):
+        '''
+        Return a numeric numpy array whose ascending order is the order
+        of this column's known values; unknown positions are arbitrary.
+        '''
+        if self.kind == 'numeric':
+            return self.values
+        elif self.kind == 'date':
+            return self.values.view(numpy.int64)
+        ranks = numpy.empty(len(self.categories) + 1, dtype=numpy.int32)
+        ranks[numpy.argsort(numpy.array(self.categories, dtype=object),
+            kind='stable')] = numpy.arange(len(self.categories))
+        ranks[-1] = -1
+        return ranks[self.values]
+
+def __knownInts__(column):
+    # Return the numpy bool array that is True where 'numeric' ARFFColumn
+    # column holds a known int, for carrying ints into a float64 column.
+    if column.values.dtype.kind == 'i':
+        return ~column.mask
+    elif column.intmask is not None:
+        return column.intmask.copy()
+    return numpy.zeros(len(column), dtype=bool)
+
+def __unquoteNominal__(symbol):
+    # Nominal data values lose their single quotes in __getDataset__.
+    return symbol[1:-1] if symbol.startswith("'") else symbol
+
+def __columnFromValues__(atype, values):
+    # Build an ARFFColumn of atype from a list of 2D-list-form values.
+    kind = __columnKind__(atype)
+    count = len(values)
+    if kind == 'numeric':
+        isint = True
+        for v in values:
+            if v is not None and not isinstance(v, (int, numpy.integer)):
+                isint = False
+                break
+        if isint:
+            # Ints beyond int64 go to float64 with intmask instead, exactly
+            # for readARFF values, which are ints of parsed floats.
+            mask = numpy.fromiter((v is None for v in values), dtype=bool,
+                count=count)
+            try:
+                vals = numpy.fromiter((0 if v is None else v for v in values),
+                    dtype=numpy.int64, count=count)
+            except OverflowError:
+                isint = False
+            intmask = None
+        if not isint:
+            vals = numpy.fromiter(
+                (numpy.nan if v is None else v for v in values),
+                dtype=numpy.float64, count=count)
+            mask = numpy.isnan(vals)
+            intmask = numpy.fromiter((isinstance(v, (int, numpy.integer))
+                for v in values), dtype=bool, count=count)
+        return ARFFColumn(kind, vals, mask, intmask=intmask)
+    elif kind == 'date':
+        mask = numpy.fromiter((v is None for v in values), dtype=bool,
+            count=count)
+        vals = numpy.array([numpy.datetime64('NaT') if v is None else v[1]
+            for v in values], dtype='datetime64[us]')
+        return ARFFColumn(kind, vals, mask, dateformat=__unquote__(atype[2]))
+    catindex = {}
+    if kind == 'nominal':
+        for symbol in atype[2]:
+            catindex.setdefault(__unquoteNominal__(symbol), len(catindex))
+    codes = numpy.fromiter(
+        (-1 if v is None else catindex.setdefault(v, len(catindex))
+            for v in values), dtype=numpy.int32, count=count)
+    return __encodedColumn__(kind, codes, list(catindex.keys()))
+
+def __encodedColumn__(kind, codes, categories):
+    # Build a 'nominal' or 'string' ARFFColumn from codes into categories.
+    # 'string' categories are kept sorted; 'nominal' keep declaration order.
+    mask = codes < 0
+    if kind == 'string' and categories:
+        order = sorted(range(0, len(categories)), key=categories.__getitem__)
+        if order != list(range(0, len(categories))):
+            remap = numpy.empty(len(categories) + 1, dtype=numpy.int32)
+            remap[numpy.array(order, dtype=numpy.int64)] = numpy.arange(
+                len(categories), dtype=numpy.int32)
+            remap[-1] = -1
+            codes = remap[codes]
+            categories = [categories[ix] for ix in order]
+    return ARFFColumn(kind, codes, mask, tuple(categories))
+
+def __concatColumns__(columns):
+    # Concatenate same-kind ARFFColumns, merging category tables.
+    first = columns[0]
+    mask = numpy.concatenate([c.mask for c in columns])
+    if first.kind in ('numeric', 'date'):
+        vals = numpy.concatenate([c.values for c in columns])
+        intmask = None
+        if first.kind == 'numeric' and vals.dtype.kind == 'f':
+            intmask = numpy.concatenate([__knownInts__(c) for c in columns])
+        return ARFFColumn(first.kind, vals, mask, None, first.dateformat,
+            intmask)
+    catindex = {}
+    for c in columns:
+        for symbol in c.categories:
+            catindex.setdefault(symbol, len(catindex))
+    parts = []
+    for c in columns:
+        remap = numpy.array([catindex[symbol] for symbol in c.categories]
+            + [-1], dtype=numpy.int32)
+        parts.append(remap[c.values])
+    return __encodedColumn__(first.kind, numpy.concatenate(parts),
+        list(catindex.keys()))
+
+class ColumnarDataset(object):
+    '''
+    ColumnarDataset is the columnar alternative to the 2D list dataset
+    of readARFF: columns is a list of ARFFColumn indexed on attribute offset,
+    so dataset.columns[offset] corresponds to dataset[row][offset].
+    It supports len(), iteration over rows and dataset[row] indexing
+    (each row is a newly built list in the 2D list form), and slicing
+    into a new ColumnarDataset, so read-only code written for the 2D list
+    form works unchanged. isUsingNan is as for readCSV, for numeric
+    unknowns in row form. Columns are shared, never copied, between
+    ColumnarDatasets derived from one another.
+    '''
+    def __init__(self, columns, nrows=None, isUsingNan=False):
+        self.columns = list(columns)
+        if nrows is None:
+            nrows = len(self.columns[0]) if self.columns else 0
+        self.nrows = nrows
+        self.isUsingNan = isUsingNan
+    def __len__(self):
+        return self.nrows
+    def __getitem__(self, ix):
+        if isinstance(ix, slice):
+            return self.take(ix)
+        if ix < 0:
+            ix += self.nrows
+        if ix < 0 or ix >= self.nrows:
+            raise IndexError("ColumnarDataset row index out of range: "
+                + str(ix))
+        return [c.get(ix, self.isUsingNan) for c in self.columns]
+    def __iter__(self):
+        for start in range(0, self.nrows, __COLUMNAR_BLOCK__):
+            block = self.take(slice(start, start + __COLUMNAR_BLOCK__))
+            for row in block.tolist():
+                yield row
+    def take(self, indices):
+        '''
+        Return a new ColumnarDataset of the rows selected by indices,
+        a slice, int index array, or bool array.
+        '''
+        columns = [c.take(indices) for c in self.columns]
+        nrows = len(columns[0]) if columns \
+            else len(numpy.arange(self.nrows)[indices])
+        return ColumnarDataset(columns, nrows, self.isUsingNan)
+    def withColumns(self, offsetToColumn):
+        '''
+        Return a new ColumnarDataset sharing this one's columns except for
+        those replaced (or appended) per the offset -> ARFFColumn dict.
+        '''
+        columns = list(self.columns)
+        for offset in sorted(offsetToColumn.keys()):
+            if offset == len(columns):
+                columns.append(offsetToColumn[offset])
+            else:
+                columns[offset] = offsetToColumn[offset]
+        return ColumnarDataset(columns, self.nrows, self.isUsingNan)
+    def extend(self, other):
+        '''
+        Mutate this ColumnarDataset by appending the rows of ColumnarDataset
+        other, which must have the same attributes. Returns None.
+        '''
+        if len(other.columns) != len(self.columns):
+            raise ValueError("ColumnarDataset.extend with differing columns")
+        self.columns = [__concatColumns__([mine, theirs])
+            for mine, theirs in zip(self.columns, other.columns)]
+        self.nrows += other.nrows
+    def tolist(self, offsets=None):
+        '''
+        Return a new 2D list dataset indexed on [row][offset] holding the
+        same data in the form returned by readARFF. When offsets is a
+        sequence of column offsets, only those columns are converted and
+        every other attribute-value is None, which touches only the
+        needed pages of memory-mapped columns.
+        '''
+        if not self.columns:
+            return [[] for ix in range(0, self.nrows)]
+        if offsets is None:
+            return list(map(list, zip(*[c.tolist(self.isUsingNan)
+                for c in self.columns])))
+        nones = [None] * self.nrows
+        return list(map(list, zip(*[self.columns[ix].tolist(self.isUsingNan)
+            if ix in offsets else nones
+                for ix in range(0, len(self.columns))])))
+
+def toColumnarARFF(attrmap, dataset, isUsingNan=False):
+    '''
+    Return a ColumnarDataset holding the same data as the 2D list dataset,
+    where attrmap is the map from attrname -> (offset, type) returned by
+    __getAttrIndices__ as in readARFF & writeARFF. Numeric values that are
+    None or numpy.nan become unknown. isUsingNan is as for readCSV.
+    A dataset that is already a ColumnarDataset is returned as-is.
+    '''
+    if isinstance(dataset, ColumnarDataset):
+        return dataset
+    offsetTOnameType = remapAttributes(attrmap)
+    columns = []
+    for ix in range(0, len(offsetTOnameType)):
+        values = dataset.column(ix) if isinstance(dataset, ProjectedDataset) \
+            else [inst[ix] for inst in dataset]
+        columns.append(__columnFromValues__(offsetTOnameType[ix][1], values))
+    return ColumnarDataset(columns, len(dataset), isUsingNan)
+
+def fromColumnarARFF(attrmap, dataset):
+    '''
+    Return (attrmap, 2D-list-dataset) for a ColumnarDataset dataset,
+    inverse of toColumnarARFF. A list dataset is returned as-is.
+    '''
+    if isinstance(dataset, ColumnarDataset):
+        return (attrmap, dataset.tolist())
+    return (attrmap, dataset)
+
+def __readColumnar__(af, amap):
+    # Parse the @data section in bounded batches into a ColumnarDataset,
+    # so only one batch at a time is held in the 2D list form.
+    chunks = []
+    while True:
+        batch = __getDataset__(af, amap, __COLUMNAR_BLOCK__)
+        if not batch:
+            break
+        chunks.append(toColumnarARFF(amap, batch))
+    return __concatDatasets__(amap, chunks)
+
+def __concatDatasets__(amap, chunks):
+    # Concatenate ColumnarDataset chunks of the attributes in amap.
+    if not chunks:
+        return toColumnarARFF(amap, [])
+    elif len(chunks) == 1:
+        return chunks[0]
+    columns = [__concatColumns__([ch.columns[ix] for ch in chunks])
+        for ix in range(0, len(chunks[0].columns))]
+    return ColumnarDataset(columns, sum([len(ch) for ch in chunks]),
+        chunks[0].isUsingNan)
+
+def readARFF(fname, columnar=False, cache=None, memoryMapped=False):
     '''
     Reads ARFF file named fname and returns (attrmap, dataset), where
     attrmap is the map from attrname -> (offset, type) returned by
@@ -263,17 +877,81 @@ def readARFF(fname):
     (STRING_VALUE, Python datetime.datetime object).
     Updated 9/25/2022 if fname ends with '.gz' open using
     gzip.open().
+    Parameter columnar True returns dataset as a ColumnarDataset instead
+    of a 2D list; see ColumnarDataset and toColumnarARFF.
+    Parameter cache True reuses the parsed relation from binary sidecar
+    file fname + '.cache.npz' when it matches fname's current path, size
+    and modification time, else parses fname and (re)writes the sidecar.
+    cache False never touches a sidecar. The default None enables the
+    cache only when environment variable ARFFLIB_CACHE is 1.
+    See removeARFFcache.
+    Parameter memoryMapped True implies columnar and cache True, and
+    returns a ColumnarDataset whose column arrays are read-only
+    numpy.memmap views of the sidecar, so only the pages of columns
+    actually used are read, and processes share them in the page cache.
     '''
+    if memoryMapped:
+        columnar = True
+        cache = True
+    isCaching = __cacheEnabled__(cache)
+    if isCaching:
+        key = __cacheKey__(fname, 'arff')
+        cached = __loadCache__(fname, key, False, columnar, memoryMapped)
+        if cached is not None:
+            return (cached[0], cached[3])
     if fname.endswith('.gz'):
         af = gzip.open(fname, mode='rt')
     else:
         af = open(fname, 'r')
     amap = __getAttrIndices__(af)
-    dataset = __getDataset__(af, amap)
+    if columnar:
+        dataset = __readColumnar__(af, amap)
+    else:
+        dataset = __getDataset__(af, amap)
     af.close()
+    if isCaching:
+        offsetTOnameType = remapAttributes(amap)
+        __saveCache__(fname, key, amap, None,
+            [offsetTOnameType[ix][1] for ix in range(0, len(amap))], dataset)
+        if memoryMapped:
+            cached = __loadCache__(fname, key, False, columnar, memoryMapped)
+            if cached is not None:
+                return (cached[0], cached[3])
     return((amap, dataset))
 
-def readCSV(fname, isUsingNan=False):
+def iterARFF(fname, batchSize=10000, columnar=False):
+    '''
+    Streaming alternative to readARFF for ARFF files too large to hold
+    in memory. iterARFF reads only the header of ARFF file fname and
+    returns (attrmap, batches), where attrmap is as returned by readARFF
+    and batches is a generator that parses the @data section on demand,
+    yielding datasets of at most batchSize instances each in file order.
+    Each batch is a 2D list as in readARFF's dataset, or a ColumnarDataset
+    when columnar is True. A '.gz' fname is decompressed as a stream.
+    The file is closed when batches is exhausted or closed.
+    See writeARFFbatches for writing batches with bounded memory.
+    '''
+    if batchSize < 1:
+        raise ValueError("iterARFF requires batchSize >= 1: "
+            + str(batchSize))
+    if fname.endswith('.gz'):
+        af = gzip.open(fname, mode='rt')
+    else:
+        af = open(fname, 'r')
+    amap = __getAttrIndices__(af)
+    def __batches__():
+        try:
+            while True:
+                batch = __getDataset__(af, amap, batchSize)
+                if not batch:
+                    break
+                yield toColumnarARFF(amap, batch) if columnar else batch
+        finally:
+            af.close()
+    return (amap, __batches__())
+
+def readCSV(fname, isUsingNan=False, columnar=False, cache=None,
+        memoryMapped=False):
     '''
     Reads CSV file named fname and attempts to infer numeric columns from
     values, where fname names a CSV file with a single header row of strings
@@ -294,51 +972,183 @@ def readCSV(fname, isUsingNan=False):
     See readARFF and ARFFtoCSV documentation comments.
     Updated 9/25/2022 if fname ends with '.gz' open using
     gzip.open().
+    Parameter columnar True returns dataset as a ColumnarDataset instead
+    of a 2D list; see ColumnarDataset and toColumnarARFF.
+    Parameters cache and memoryMapped are as for readARFF.
     '''
+    if memoryMapped:
+        columnar = True
+        cache = True
+    if __cacheEnabled__(cache):
+        key = __cacheKey__(fname, 'csv')
+        cached = __loadCache__(fname, key, isUsingNan, columnar, memoryMapped)
+        if cached is None:
+            relation = readCSV(fname, isUsingNan, columnar, False)
+            colToType = relation[5]
+            __saveCache__(fname, key, relation[0], relation[2],
+                ['numeric' if colToType[col] == float else 'string'
+                    for col in range(0, len(relation[2]))], relation[1])
+            if not memoryMapped:
+                return relation
+            cached = __loadCache__(fname, key, isUsingNan, columnar,
+                memoryMapped)
+            if cached is None:
+                return relation
+        amap, header, kinds, dataset = cached
+        colToType = dict([(col, float if kinds[col] == 'numeric' else str)
+            for col in range(0, len(header))])
+        relation = __csvRelation__(header, [], None, colToType,
+            isUsingNan, False)
+        return (relation[0], dataset) + relation[2:]
+    # Reading & converting allocates millions of lists and strings; suspend
+    # the cyclic garbage collector, which would otherwise rescan them all.
+    isCollecting = gc.isenabled()
+    gc.disable()
+    try:
+        return __readCSV__(fname, isUsingNan, columnar)
+    finally:
+        if isCollecting:
+            gc.enable()
+
+def __readCSV__(fname, isUsingNan, columnar):
+    # readCSV with the garbage collector suspended.
     if fname.endswith('.gz'):
         inf = gzip.open(fname, mode='rt')
     else:
         inf = open(fname, 'r')
+    table = __readCSVtable__(inf)
+    inf.close()
+    colToType = {}
+    for index in range(0,len(table[0])):
+        colToType[index] = float                # assume float until disproved
+    rows = table[1:]                            # skip header row
+    if (len(table[0]) > 0 and len(rows) > 0
+            and all([len(row) == len(table[0]) for row in rows])):
+        columns = __convertCSVcolumns__(rows, colToType, isUsingNan)
+        rows = None
+    else:
+        # Ragged rows, convert a cell at a time.
+        columns = None
+        __convertCSVrows__(rows, colToType, isUsingNan)
+    return __csvRelation__(table[0], rows, columns, colToType, isUsingNan,
+        columnar)
+
+def __readCSVtable__(inf, where=''):
+    # Return the list of non-empty rows read by csv.reader from open inf.
     rdr = csv.reader(inf, delimiter=',', quotechar='"', dialect='excel')
     table = []
-    row = list(rdr.__next__())
-    linenum = 1
-    while row != None:
+    isReading = True
+    while isReading:
     # Unterminated quote " in an incoming data file was causing
     # "for row in rdr:" to terminate prematurely with a cryptic error
-    # message. Processing each row using __next__() to get better insight.
-    # for row in rdr:
-        if len(row) > 0:
-            # Empty final row appeared when reading .csv with no such entry.
-            table.append(row)
-        linenum += 1
+    # message. Resume "for row in rdr:" after reporting each error with
+    # the reader's own line_num, instead of a try per __next__() row.
         try:
-            row = list(rdr.__next__())
-        except StopIteration:
-            row = None
-            break
-        except Exception as errmsg:
+            for row in rdr:
+                if len(row) > 0:
+                    # Empty final row appeared when reading .csv with no such entry.
+                    table.append(row)
+            isReading = False
+        except csv.Error as errmsg:
             sys.stderr.write("WARNING readCSV read error at line "
-                + str(linenum) + ": " + str(errmsg) + '\n')
-            row = []
-            # continue
-    inf.close()
+                + str(rdr.line_num) + where + ": " + str(errmsg) + '\n')
+    return table
+
+def __csvRelation__(header, rows, columns, colToType, isUsingNan, columnar):
+    # Build readCSV's 6-tuple from the header row and either converted
+    # rows, or converted columns (when rows is None), and colToType.
     nameToCol = {}
     colToName = {}
-    colToType = {}
-    for index in range(0,len(table[0])):
-        nameToCol[table[0][index]] = index
-        colToName[index] = table[0][index]
-        colToType[index] = float                # assume float until disproved
-    for row in table[1:]:                       # skip header row
+    for index in range(0,len(header)):
+        nameToCol[header[index]] = index
+        colToName[index] = header[index]
+    attrmap = {}
+    for col in sorted(colToName.keys()):
+        nm = colToName[col]
+        if colToType[col] == float:
+            arfftype = 'numeric'
+        else:
+            arfftype = 'string'
+        attrmap[nm] = (col, arfftype)
+    if columnar and columns is not None:
+        dataset = ColumnarDataset([__columnFromValues__(
+            attrmap[colToName[col]][1], columns[col])
+                for col in range(0, len(columns))], len(columns[0]),
+            isUsingNan)
+    elif columnar:
+        dataset = toColumnarARFF(attrmap, rows, isUsingNan)
+    elif columns is not None:
+        dataset = list(map(list, zip(*columns)))
+    else:
+        dataset = rows
+    return (attrmap, dataset, header, nameToCol, colToName, colToType)
+
+__CSV_SAMPLE__ = 1000   # leading cells per column tried before bulk float()
+
+def __csvColumnToFloats__(strcol, unknown, sampleSize=__CSV_SAMPLE__):
+    # Return the sequence of CSV strings strcol as a list of floats, with
+    # blank cells as unknown, or None if any cell is not numeric.
+    # A sample of leading cells exits early for most string columns.
+    # float() ignores surrounding whitespace the same as strip() does.
+    for strv in strcol[0:sampleSize]:
+        if strv.strip() != '':
+            try:
+                float(strv)
+            except ValueError:
+                return None
+    cells = strcol
+    blanks = []
+    if '' in strcol:
+        # Locate blank cells with list.index() scans, parse them as 'nan'.
+        cells = list(strcol)
+        try:
+            ix = cells.index('')
+            while True:
+                blanks.append(ix)
+                cells[ix] = 'nan'
+                ix = cells.index('', ix+1)
+        except ValueError:
+            pass
+    try:
+        floats = list(map(float, cells))
+    except ValueError:
+        # Whitespace-only cell, or a non-numeric cell after the sample.
+        try:
+            return [float(strv) if strv.strip() != '' else unknown
+                for strv in strcol]
+        except ValueError:
+            return None
+    for ix in blanks:
+        floats[ix] = unknown
+    return floats
+
+def __convertCSVcolumns__(rows, colToType, isUsingNan, forcedStrings=()):
+    # readCSV type inference & conversion for rectangular rows of strings,
+    # a column at a time. Returns the list of columns, each a list of
+    # floats or a tuple of strings, and updates colToType for strings.
+    # Columns numbered in forcedStrings are kept as strings.
+    unknown = numpy.nan if isUsingNan else None
+    columns = list(zip(*rows))
+    for colix in range(0, len(columns)):
+        floats = None if colix in forcedStrings \
+            else __csvColumnToFloats__(columns[colix], unknown)
+        if floats is None:
+            colToType[colix] = str
+        else:
+            columns[colix] = floats
+    return columns
+
+def __convertCSVrows__(rows, colToType, isUsingNan):
+    # readCSV type inference & conversion a cell at a time, mutating rows.
+    for row in rows:
         for colix in range(0, len(row)):
             strv = row[colix].strip()
             if strv != '':                      # treat as nan
                 try:
-                    value = float(strv)
+                    float(strv)
                 except ValueError:
                     colToType[colix] = str
-    for row in table[1:]:                       # skip header row
+    for row in rows:
         for colix in range(0, len(row)):
             if colToType[colix] == float:
                 strv = row[colix].strip()
@@ -346,15 +1156,410 @@ def readCSV(fname, isUsingNan=False):
                     row[colix] = float(strv)
                 else:
                     row[colix] = numpy.nan if isUsingNan else None
-    attrmap = {}
-    for col in sorted(colToName.keys()):
-        nm = colToName[col]
-        if colToType[col] == float:
-            arfftype = 'numeric'
+
+# A relation cache is a sidecar file fname + __CACHE_SUFFIX__ next to the
+# text file fname, an uncompressed numpy .npz archive (no pickles) holding
+# the parsed relation's attributes and one ARFFColumn's arrays per column.
+# It is keyed by fname's absolute path, size and modification time, so
+# any change to fname (or to __CACHE_VERSION__) invalidates it.
+__CACHE_SUFFIX__ = '.cache.npz'
+__CACHE_VERSION__ = '2'
+
+def __cacheEnabled__(cache):
+    # cache None defers to environment variable ARFFLIB_CACHE, '1' for on.
+    if cache is None:
+        return os.environ.get('ARFFLIB_CACHE', '') == '1'
+    return cache
+
+def __cacheKey__(fname, flavor):
+    # Identify the text file fname as it is now, flavor 'arff' or 'csv'.
+    st = os.stat(fname)
+    return [__CACHE_VERSION__, flavor, os.path.abspath(fname),
+        str(st.st_size), str(st.st_mtime_ns)]
+
+def __saveCache__(fname, key, amap, header, atypes, dataset):
+    # Write the sidecar of fname for dataset, a ColumnarDataset or a 2D list
+    # with one value per atypes entry (the column types) in every row.
+    # In addition to the columns and their int masks, the sidecar records
+    # the text of each date of a 2D list, so it loads exactly as parsed.
+    # header is the CSV header, else None.
+    # Failure to write is a WARNING, not an error.
+    arrays = {'key' : numpy.array(key), 'attrmap' : numpy.array([repr(amap)]),
+        'nrows' : numpy.array(len(dataset))}
+    if header is not None:
+        arrays['header'] = numpy.array(header, dtype=str)
+    if isinstance(dataset, ColumnarDataset):
+        columns = dataset.columns
+    else:
+        if any([len(row) != len(atypes) for row in dataset]):
+            return
+        lists = [list(col) for col in zip(*dataset)] if dataset \
+            else [[] for atype in atypes]
+        columns = []
+        for ix in range(0, len(atypes)):
+            columns.append(__columnFromValues__(atypes[ix], lists[ix]))
+            if columns[ix].kind == 'date':
+                text = __columnFromValues__('string',
+                    [None if v is None else v[0] for v in lists[ix]])
+                arrays['s' + str(ix)] = text.values
+                arrays['t' + str(ix)] = numpy.array(text.categories, dtype=str)
+    for ix in range(0, len(columns)):
+        col = columns[ix]
+        arrays['k' + str(ix)] = numpy.array(col.kind)
+        arrays['v' + str(ix)] = col.values
+        arrays['m' + str(ix)] = col.mask
+        if col.categories is not None:
+            arrays['c' + str(ix)] = numpy.array(col.categories, dtype=str)
+        if col.intmask is not None:
+            arrays['i' + str(ix)] = col.intmask
+    path = fname + __CACHE_SUFFIX__
+    tmppath = path + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(tmppath, 'wb') as outf:
+            numpy.savez(outf, **arrays)
+        os.replace(tmppath, path)
+    except OSError as errmsg:
+        sys.stderr.write("WARNING cannot write cache " + path + ": "
+            + str(errmsg) + '\n')
+        try:
+            os.remove(tmppath)
+        except OSError:
+            pass
+
+def __npzMemmap__(path, archive, name):
+    # Return a read-only numpy.memmap of array name stored uncompressed in
+    # the .npz file path, given its open zipfile.ZipFile archive, or None
+    # when the member is compressed. The array's bytes are located from
+    # the member's local zip header followed by its .npy header.
+    info = archive.getinfo(name + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    with open(path, 'rb') as f:
+        f.seek(info.header_offset)
+        local = f.read(30)
+        f.seek(info.header_offset + 30 + int.from_bytes(local[26:28], 'little')
+            + int.from_bytes(local[28:30], 'little'))
+        version = numpy.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, isFortran, dtype = numpy.lib.format.read_array_header_1_0(f)
         else:
-            arfftype = 'string'
-        attrmap[nm] = (col, arfftype)
-    return (attrmap, table[1:], table[0], nameToCol, colToName, colToType)
+            shape, isFortran, dtype = numpy.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if dtype.hasobject:
+        return None
+    if 0 in shape:
+        return numpy.zeros(shape, dtype=dtype)
+    return numpy.memmap(path, dtype=dtype, mode='r', offset=offset,
+        shape=shape, order='F' if isFortran else 'C')
+
+def __loadCache__(fname, key, isUsingNan, columnar, memoryMapped=False):
+    # Return (amap, header, kinds, dataset) from a sidecar of fname matching
+    # key, or None when there is no such valid sidecar. header is None for
+    # ARFF, and kinds lists the ARFFColumn kind of each column.
+    # memoryMapped True (with columnar True) maps the column arrays from
+    # the sidecar instead of reading them.
+    path = fname + __CACHE_SUFFIX__
+    if not os.path.exists(path):
+        return None
+    archive = None
+    try:
+        if memoryMapped:
+            archive = zipfile.ZipFile(path)
+        with numpy.load(path, allow_pickle=False) as arch:
+            if arch['key'].tolist() != key:
+                return None
+            amap = ast.literal_eval(str(arch['attrmap'][0]))
+            header = arch['header'].tolist() if 'header' in arch.files \
+                else None
+            nrows = int(arch['nrows'])
+            columns = []
+            lists = []
+            ix = 0
+            while ('k' + str(ix)) in arch.files:
+                n = str(ix)
+                kind = str(arch['k' + n])
+                categories = tuple(arch['c' + n].tolist()) \
+                    if ('c' + n) in arch.files else None
+                dateformat = None
+                if kind == 'date':
+                    dateformat = __unquote__(remapAttributes(amap)[ix][1][2])
+                values = mask = None
+                if archive is not None:
+                    values = __npzMemmap__(path, archive, 'v' + n)
+                    mask = __npzMemmap__(path, archive, 'm' + n)
+                if values is None or mask is None:
+                    values = arch['v' + n]
+                    mask = arch['m' + n]
+                intmask = arch['i' + n] if ('i' + n) in arch.files else None
+                col = ARFFColumn(kind, values, mask, categories, dateformat,
+                    intmask)
+                columns.append(col)
+                if not columnar:
+                    values = col.tolist(isUsingNan)
+                    if ('s' + n) in arch.files:
+                        text = ARFFColumn('string', arch['s' + n],
+                            arch['s' + n] < 0, tuple(arch['t' + n].tolist()))
+                        values = [None if v is None else (t, v[1])
+                            for t, v in zip(text.tolist(), values)]
+                    lists.append(values)
+                ix += 1
+    except (OSError, ValueError, KeyError, SyntaxError,
+            zipfile.BadZipFile) as errmsg:
+        sys.stderr.write("WARNING ignoring unreadable cache " + path + ": "
+            + str(errmsg) + '\n')
+        return None
+    finally:
+        if archive is not None:
+            archive.close()
+    if columnar:
+        dataset = ColumnarDataset(columns, nrows, isUsingNan)
+    elif lists:
+        dataset = list(map(list, zip(*lists)))
+    else:
+        dataset = [[] for rx in range(0, nrows)]
+    return (amap, header, [col.kind for col in columns], dataset)
+
+def removeARFFcache(fname):
+    '''
+    Remove the cache sidecar file of ARFF or CSV file fname written by
+    readARFF or readCSV with cache enabled, if there is one. Returns True
+    if a sidecar was removed. Stale sidecars are ignored and rewritten
+    automatically, so this is only needed to reclaim disk space.
+    '''
+    try:
+        os.remove(fname + __CACHE_SUFFIX__)
+        return True
+    except FileNotFoundError:
+        return False
+
+# Parallel ingest splits an uncompressed file's data section into byte
+# ranges that start on record boundaries and parses them in a process pool.
+__PARALLEL_RANGE_MIN__ = 1 << 20    # bytes; smaller files are read serially
+__PARALLEL_SCAN__ = 1 << 20         # bytes per read while counting quotes
+
+def __recordBoundaries__(fname, start, end, parts, quotechar=None):
+    # Return the increasing list of byte offsets [start, ..., end] cutting
+    # fname[start:end] into at most parts ranges, each cut at the start of
+    # a line. When quotechar is not None a cut is only made where an even
+    # number of quotechar bytes precede it since start, so no cut lands
+    # inside a quoted field spanning lines. "" escapes keep the parity.
+    quote = quotechar.encode() if quotechar is not None else None
+    cuts = [start]
+    with open(fname, 'rb') as f:
+        pos = start                 # bytes before pos have been counted
+        parity = 0
+        for k in range(1, parts):
+            target = start + ((end - start) * k) // parts
+            if target <= pos:
+                continue
+            f.seek(pos)
+            while quote is not None and pos < target:
+                chunk = f.read(min(__PARALLEL_SCAN__, target - pos))
+                parity ^= chunk.count(quote) & 1
+                pos += len(chunk)
+            f.seek(target)
+            pos = target
+            while pos < end:
+                line = f.readline()
+                if not line:
+                    pos = end
+                    break
+                pos += len(line)
+                if quote is not None:
+                    parity ^= line.count(quote) & 1
+                if parity == 0:
+                    break
+            if pos >= end:
+                break
+            cuts.append(pos)
+    cuts.append(end)
+    return cuts
+
+def __firstRecordEnd__(fname, quotechar):
+    # Return the byte offset just past the first record (header) of fname,
+    # the first line end preceded by an even number of quotechar bytes.
+    quote = quotechar.encode()
+    parity = 0
+    with open(fname, 'rb') as f:
+        for line in f:
+            parity ^= line.count(quote) & 1
+            if parity == 0:
+                return f.tell()
+        return f.tell()
+
+def __rangeText__(fname, start, end, newline=None):
+    # Return a text stream over bytes fname[start:end], decoded as open()
+    # would decode fname itself.
+    with open(fname, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return io.TextIOWrapper(io.BytesIO(data), newline=newline)
+
+def __readARFFrange__(task):
+    # Pool worker: parse the data instances in one byte range of an ARFF
+    # file, returning a 2D list or ColumnarDataset per readARFF.
+    fname, amap, start, end, columnar = task
+    af = __rangeText__(fname, start, end)
+    if columnar:
+        return __readColumnar__(af, amap)
+    return __getDataset__(af, amap)
+
+def __poolWorkers__(workers, tasks):
+    # Return the process count for running tasks given a workers request.
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("PARALLEL READ REQUIRES workers >= 1: "
+            + str(workers))
+    return min(workers, tasks)
+
+def __parallelMap__(func, tasks, workers):
+    # Return [func(t) for t in tasks] in order, run in a process pool of
+    # workers processes, or in this process when workers is 1.
+    if workers <= 1 or len(tasks) <= 1:
+        return [func(t) for t in tasks]
+    with multiprocessing.Pool(workers) as pool:
+        return pool.map(func, tasks, chunksize=1)
+
+def readARFFparallel(fname, workers=None, columnar=False):
+    '''
+    Parallel alternative to readARFF with the same parameters and return
+    value, for large uncompressed ARFF files on multicore machines.
+    The @data section is split into byte ranges at line boundaries (each
+    ARFF instance is one line, so quoted fields never span ranges), which
+    are parsed by up to workers processes (default os.cpu_count()) and
+    reassembled in file order. Each worker's instances are pickled back
+    to this process, which is much cheaper for columnar=True.
+    A '.gz' file, or one too small to split, is read serially by readARFF.
+    '''
+    if fname.endswith('.gz'):
+        return readARFF(fname, columnar)
+    with open(fname, 'r') as af:
+        amap = __getAttrIndices__(af)
+        start = af.tell()
+    end = os.path.getsize(fname)
+    workers = __poolWorkers__(workers,
+        max(1, (end - start) // __PARALLEL_RANGE_MIN__))
+    if workers <= 1:
+        return readARFF(fname, columnar)
+    cuts = __recordBoundaries__(fname, start, end, workers)
+    chunks = __parallelMap__(__readARFFrange__,
+        [(fname, amap, cuts[ix], cuts[ix+1], columnar)
+            for ix in range(0, len(cuts)-1)], workers)
+    if columnar:
+        return (amap, __concatDatasets__(amap, chunks))
+    dataset = []
+    for chunk in chunks:
+        dataset.extend(chunk)
+    return (amap, dataset)
+
+def __readCSVrange__(task):
+    # Pool worker: read & convert the rows in one byte range of a CSV
+    # file. Returns (columns, colToType) per __convertCSVcolumns__, or None
+    # when any row's length differs from ncols.
+    fname, start, end, ncols, isUsingNan, forcedStrings = task
+    inf = __rangeText__(fname, start, end)
+    rows = __readCSVtable__(inf, ' of bytes ' + str(start) + '..'
+        + str(end) + ' of ' + fname)
+    if any([len(row) != ncols for row in rows]):
+        return None
+    colToType = dict([(c, float) for c in range(0, ncols)])
+    if not rows:
+        return ([[] for c in range(0, ncols)], colToType)
+    columns = __convertCSVcolumns__(rows, colToType, isUsingNan,
+        forcedStrings)
+    return (columns, colToType)
+
+def readCSVparallel(fname, isUsingNan=False, columnar=False, workers=None):
+    '''
+    Parallel alternative to readCSV with the same parameters and return
+    value, for large uncompressed CSV files on multicore machines.
+    The rows after the header are split into byte ranges at record
+    boundaries, never inside a "-quoted field spanning lines, which are
+    read & converted by up to workers processes (default os.cpu_count())
+    and reassembled in file order. A column is numeric only when it is
+    numeric in every range; ranges that disagree are re-read as strings.
+    A '.gz' file, one too small to split, or one with rows whose length
+    differs from the header's is read serially by readCSV.
+    '''
+    if fname.endswith('.gz'):
+        return readCSV(fname, isUsingNan, columnar)
+    end = os.path.getsize(fname)
+    start = __firstRecordEnd__(fname, '"')
+    workers = __poolWorkers__(workers,
+        max(1, (end - start) // __PARALLEL_RANGE_MIN__))
+    if workers <= 1:
+        return readCSV(fname, isUsingNan, columnar)
+    header = __readCSVtable__(__rangeText__(fname, 0, start))
+    if len(header) != 1 or len(header[0]) == 0:
+        return readCSV(fname, isUsingNan, columnar)
+    header = header[0]
+    ncols = len(header)
+    cuts = __recordBoundaries__(fname, start, end, workers, '"')
+    tasks = [(fname, cuts[ix], cuts[ix+1], ncols, isUsingNan, ())
+        for ix in range(0, len(cuts)-1)]
+    isCollecting = gc.isenabled()
+    gc.disable()
+    try:
+        results = __parallelMap__(__readCSVrange__, tasks, workers)
+        if any([r is None for r in results]):
+            return readCSV(fname, isUsingNan, columnar)     # ragged rows
+        strcols = tuple(sorted(set([c for r in results
+            for c in range(0, ncols) if r[1][c] == str])))
+        redo = [ix for ix in range(0, len(results))
+            if any([results[ix][1][c] == float for c in strcols])]
+        if redo:
+            again = __parallelMap__(__readCSVrange__,
+                [tasks[ix][0:5] + (strcols,) for ix in redo], workers)
+            for ix, result in zip(redo, again):
+                results[ix] = result
+        colToType = dict([(c, str if c in strcols else float)
+            for c in range(0, ncols)])
+        columns = [[] for c in range(0, ncols)]
+        for r in results:
+            for c in range(0, ncols):
+                columns[c].extend(r[0][c])
+        if len(columns[0]) == 0:
+            return readCSV(fname, isUsingNan, columnar)
+        for c in strcols:
+            columns[c] = tuple(columns[c])
+        return __csvRelation__(header, None, columns, colToType, isUsingNan,
+            columnar)
+    finally:
+        if isCollecting:
+            gc.enable()
+
+def __readARFFfile__(task):
+    # Pool worker: readARFF one whole file.
+    fname, columnar = task
+    return readARFF(fname, columnar)
+
+def readARFFfiles(fnames, workers=None, columnar=False):
+    '''
+    Read the ARFF files named in the list fnames concurrently, in up to
+    workers processes (default os.cpu_count()), and return one relation
+    (attrmap, dataset) holding all their instances in fnames order, as
+    if each file were merged in turn by mergeARFFinto. All the files
+    must have == attribute declarations, else ValueError. Parameter
+    columnar is as for readARFF.
+    '''
+    if not fnames:
+        raise ValueError("readARFFfiles REQUIRES AT LEAST ONE FILE NAME")
+    relations = __parallelMap__(__readARFFfile__,
+        [(fname, columnar) for fname in fnames],
+        __poolWorkers__(workers, len(fnames)))
+    amap = relations[0][0]
+    for ix in range(1, len(relations)):
+        if relations[ix][0] != amap:
+            raise ValueError(
+                "readARFFfiles applied against differing attribute types: "
+                + fnames[0] + ", " + fnames[ix])
+    if columnar:
+        return (amap, __concatDatasets__(amap, [r[1] for r in relations]))
+    dataset = relations[0][1]
+    for ix in range(1, len(relations)):
+        dataset.extend(relations[ix][1])
+    return (amap, dataset)
 
 def CSVhdr2ARFFhdr(CSVheaderRow, nameToCol, colToName, colToType):
     '''
@@ -447,22 +1652,103 @@ def quoteStringIfNeeded(string):
     Just returns the input argument if it is not a string.
     '''
     # Fix strings attributes that need to be wrapped in quotes.
+    # Inside the quotes, a backslash is escaped as \\, and so is a ' when
+    # the string holds both kinds of quote, so readARFF reads it back.
+    # A string that starts and ends with quotes is quoted again, since
+    # readARFF strips one level of either kind of quote.
     # print("DEBUG string 1 ",string)
     if (type(string) == str and (
             (" " in string) or ("," in string) or ("'" in string)
                 or ('"' in string) or ('\t' in string) or ('\f' in string))):
         # print("DEBUG string 2 ",string)
-        if ((string.startswith("'") and string.endswith("'"))
-                or (string.startswith('"') and string.endswith('"'))):
-            pass # It already is delimited.
-        elif "'" in string:
-            string = '"' + string + '"'
+        if "'" in string and not '"' in string:
+            string = '"' + string.replace('\\', '\\\\') + '"'
         else:
-            string = "'" + string + "'"
+            string = "'" + string.replace('\\', '\\\\').replace("'", "\\'") \
+                + "'"
     return string
 
+def __formatARFFValue__(datum):
+    # Format one 2D-list-form attribute-value as writeARFF writes it.
+    sdatum = str(datum).strip()
+    if sdatum == '' or sdatum == 'nan' or sdatum == 'None':
+        datum = '?'
+    if (isinstance(datum,tuple) and len(datum) == 2):
+        datum = datum[0]    # date, use the string form
+    elif ((isinstance(datum, float) or isinstance(datum, int))
+            and (numpy.isnan(datum) or (str(datum).strip() == 'nan'))):
+        datum = None
+    return quoteStringIfNeeded(str(datum) if (not datum is None) else '?')
+
+class __FormattedValues__(dict):
+    # dict from attribute-value to its __formatARFFValue__ string, which
+    # formats each distinct (hashable) attribute-value only once.
+    def __missing__(self, datum):
+        formatted = __formatARFFValue__(datum)
+        self[datum] = formatted
+        return formatted
+
+__NUMERIC_CELL_TYPES__ = frozenset([int, float, type(None)])
+__TEXT_CELL_TYPES__ = frozenset([str, tuple, type(None)])
+
+def __formatARFFColumn__(values):
+    # Return the list of ARFF data strings for a sequence of 2D-list-form
+    # attribute-values, the same strings as __formatARFFValue__ returns.
+    # The types present pick the formatter once for the whole column:
+    # ints, floats & unknowns by map(str), strings, dates & unknowns by
+    # formatting each distinct value once, and anything else per cell.
+    types = set(map(type, values))
+    if types <= __NUMERIC_CELL_TYPES__:
+        strs = list(map(str, values))
+        for unknown in ('None', 'nan'):
+            for ix in __indicesOf__(strs, unknown):
+                strs[ix] = '?'
+        return strs
+    if types <= __TEXT_CELL_TYPES__:
+        try:
+            return list(map(__FormattedValues__().__getitem__, values))
+        except TypeError:
+            pass                # tuple with unhashable contents
+    return list(map(__formatARFFValue__, values))
+
+def __numericRowsText__(block):
+    # Return the ARFF data text of a block of list rows holding only ints,
+    # floats and unknowns, or None for any other block. The C-level repr
+    # of each row list formats every number the same as str(); then the
+    # brackets, the ', ' separators, and 'None' & 'nan' are edited out.
+    if set(map(type, block)) != set([list]) or not set(map(type,
+            itertools.chain.from_iterable(block))) <= __NUMERIC_CELL_TYPES__:
+        return None
+    text = '\n'.join(map(repr, block))
+    return text.replace(', ', ',').replace('[', '').replace(']', '').replace(
+        'None', '?').replace('nan', '?') + '\n'
+
+def __columnARFFStrings__(column):
+    # Return the list of ARFF data strings for an ARFFColumn. Each distinct
+    # nominal or string category is formatted only once.
+    if column.kind in ('nominal', 'string'):
+        lookup = numpy.array([__formatARFFValue__(c)
+            for c in column.categories] + ['?'], dtype=object)
+        return lookup[column.values].tolist()
+    elif column.kind == 'numeric':
+        strs = list(map(str, column.__numbers__()))
+        for ix in numpy.flatnonzero(column.mask).tolist():
+            strs[ix] = '?'
+        return strs
+    return [__formatARFFValue__(v) for v in column.tolist()]
+
+def __writeColumnarData__(fout, dataset):
+    # Write the @data rows of a ColumnarDataset a block of rows at a time.
+    for start in range(0, len(dataset), __COLUMNAR_BLOCK__):
+        block = dataset.take(slice(start, start + __COLUMNAR_BLOCK__))
+        strcolumns = [__columnARFFStrings__(c) for c in block.columns]
+        if strcolumns:
+            fout.write('\n'.join(map(','.join, zip(*strcolumns))) + '\n')
+        else:
+            fout.write('\n' * len(block))
+
 def writeARFF(fname, relationstring, attrmap, dataset, isDebugMode=False,
-        clobber=False):
+        clobber=False, compresslevel=9, compressThreads=1):
     '''
     Writes ARFF file named fname with data in attrmap and dataset, where
     attrmap is the map from attrname -> (offset, type) returned by
@@ -473,16 +1759,100 @@ def writeARFF(fname, relationstring, attrmap, dataset, isDebugMode=False,
     without warning, added 11/24/2019. New param relationstring added
     after fname on 4/18/2022.
     Updated 9/25/2022 if fname ends with '.gz' open using
-    gzip.open().
+    gzip.open(). dataset may also be a ColumnarDataset.
+    For a '.gz' fname, compresslevel is the gzip level from 1 (fastest)
+    to 9 (smallest, the default), and compressThreads > 1 compresses
+    blocks of output in that many threads, writing a multi-member gzip
+    file that gzip.open() and gunzip read as one stream.
+    '''
+    fout = __openARFFout__(fname, clobber, compresslevel, compressThreads)
+    newmap = __writeARFFheader__(fout, relationstring, attrmap)
+    __writeARFFdata__(fout, newmap, dataset, isDebugMode)
+    fout.close()
+
+def writeARFFbatches(fname, relationstring, attrmap, batches,
+        isDebugMode=False, clobber=False, compresslevel=9, compressThreads=1):
+    '''
+    Writes ARFF file named fname like writeARFF, except that batches is
+    an iterable of datasets (2D lists or ColumnarDatasets) all having the
+    attributes in attrmap, written in order as they are produced, so the
+    whole relation is never in memory, for example the batches from
+    iterARFF after per-batch deriveARFF. Returns the number of instances
+    written. compresslevel and compressThreads are as for writeARFF.
     '''
+    fout = __openARFFout__(fname, clobber, compresslevel, compressThreads)
+    written = 0
+    try:
+        newmap = __writeARFFheader__(fout, relationstring, attrmap)
+        for batch in batches:
+            __writeARFFdata__(fout, newmap, batch, isDebugMode)
+            written += len(batch)
+    finally:
+        fout.close()
+    return written
+
+__WRITE_BUFFER__ = 1 << 20      # bytes of output buffering
+__GZIP_MEMBER__ = 1 << 22       # characters per parallel gzip member
+
+class __ParallelGzipFile__(object):
+    # Write-only text file object that gzips blocks of at least
+    # __GZIP_MEMBER__ characters in a pool of threads (zlib releases the
+    # GIL) and writes them in order as the members of one gzip file.
+    def __init__(self, fname, compresslevel, threads):
+        self.fout = open(fname, 'wb')
+        self.compresslevel = compresslevel
+        self.threads = threads
+        self.pool = concurrent.futures.ThreadPoolExecutor(threads)
+        self.pending = collections.deque()
+        self.parts = []
+        self.size = 0
+        self.members = 0
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= __GZIP_MEMBER__:
+            self.__submit__()
+        return len(text)
+    def __submit__(self):
+        data = ''.join(self.parts).encode(locale.getpreferredencoding(False))
+        self.parts = []
+        self.size = 0
+        self.pending.append(self.pool.submit(gzip.compress, data,
+            self.compresslevel))
+        self.members += 1
+        while len(self.pending) > 2 * self.threads:
+            self.fout.write(self.pending.popleft().result())
+    def close(self):
+        if self.fout.closed:
+            return
+        try:
+            if self.parts or self.members == 0:
+                self.__submit__()
+            while self.pending:
+                self.fout.write(self.pending.popleft().result())
+        finally:
+            self.pool.shutdown()
+            self.fout.close()
+
+def __openARFFout__(fname, clobber, compresslevel=9, compressThreads=1):
+    # Open output ARFF fname for writeARFF, refusing to clobber by default.
     if os.path.lexists(fname) and not clobber:
         msg = 'ERROR, Please remove output file: ' + fname + '\n'
         sys.stderr.write(msg + '\n')
         raise RuntimeError(msg)
     if fname.endswith('.gz'):
-        fout = gzip.open(fname, mode='wt')
+        if compressThreads > 1:
+            fout = __ParallelGzipFile__(fname, compresslevel, compressThreads)
+        else:
+            fout = io.TextIOWrapper(io.BufferedWriter(gzip.GzipFile(fname,
+                mode='wb', compresslevel=compresslevel), __WRITE_BUFFER__))
     else:
-        fout = open(fname, 'w')
+        fout = open(fname, 'w', buffering=__WRITE_BUFFER__)
+    return fout
+
+def __writeARFFheader__(fout, relationstring, attrmap):
+    # Write the @relation, @attribute and @data lines to fout.
+    # Returns remapAttributes(attrmap) for use by __writeARFFdata__.
     # REPLACED WITH PARAM IN 3_2 relationstring = sys.argv[0]
     # REPLACED WITH PARAM IN 3_2 for arg in sys.argv[1:]:
         # relationstring = relationstring + " " + arg
@@ -508,6 +1878,44 @@ def writeARFF(fname, relationstring, attrmap, dataset, isDebugMode=False,
                         and newmap[k][1][0] == 'nominal')
                 else newmap[k][1]) + '\n')
     fout.write('@data\n')
+    return newmap
+
+def __writeARFFdata__(fout, newmap, dataset, isDebugMode=False):
+    # Write the instances of dataset to fout, where newmap is
+    # remapAttributes(attrmap) as returned by __writeARFFheader__.
+    # Blocks of rows with one value per attribute are formatted in bulk,
+    # all-numeric blocks as whole rows (see __numericRowsText__), others a
+    # column at a time (see __formatARFFColumn__), and written at once.
+    if isinstance(dataset, ColumnarDataset):
+        __writeColumnarData__(fout, dataset)
+        return
+    if isDebugMode or len(newmap) == 0:
+        __writeARFFrows__(fout, newmap, dataset, isDebugMode)
+        return
+    if isinstance(dataset, ProjectedDataset):
+        blocks = dataset.rowBlocks(__COLUMNAR_BLOCK__)
+    else:
+        blocks = (dataset[start:start + __COLUMNAR_BLOCK__]
+            for start in range(0, len(dataset), __COLUMNAR_BLOCK__))
+    isCollecting = gc.isenabled()
+    gc.disable()    # avoid rescanning the rows built per block; see readCSV
+    try:
+        for block in blocks:
+            if set(map(len, block)) != set([len(newmap)]):
+                __writeARFFrows__(fout, newmap, block, isDebugMode)
+                continue
+            text = __numericRowsText__(block)
+            if text is not None:
+                fout.write(text)
+                continue
+            strcolumns = [__formatARFFColumn__(col) for col in zip(*block)]
+            fout.write('\n'.join(map(','.join, zip(*strcolumns))) + '\n')
+    finally:
+        if isCollecting:
+            gc.enable()
+
+def __writeARFFrows__(fout, newmap, dataset, isDebugMode=False):
+    # Write the instances of dataset to fout a cell at a time.
     for rix in range(0, len(dataset)):  # Iterate over rows in relation.
         row = dataset[rix]
         datum = row[0]
@@ -547,7 +1955,6 @@ def writeARFF(fname, relationstring, attrmap, dataset, isDebugMode=False,
                     sys.stderr.write("DEBUG PYTHON DATETIME FIELD "
                         + newmap[colix][0] + ": " + str(dt) + '\n')
         fout.write('\n')
-    fout.close()
 
 def mergeARFFinto(relation1, relation2):
     '''
@@ -559,10 +1966,14 @@ def mergeARFFinto(relation1, relation2):
     overhead of repeated copying of relations when merging many
     relations. An application can use copy.deepcopy() on the
     original relation1 if it wishes to save an original copy.
+    A ColumnarDataset relation1[1] is extended in place.
     '''
     if relation1[0] != relation2[0]:
         raise ValueError(
             "mergeARFFinto applied against differing attribute types")
+    if isinstance(relation1[1], ColumnarDataset):
+        relation1[1].extend(toColumnarARFF(relation2[0], relation2[1]))
+        return None
     for element in relation2[1]:
         relation1[1].append(element)
     return None
@@ -577,8 +1988,135 @@ def remapAttributes(attrmap):
         newmap[attrmap[attrname][0]] = (attrname, attrmap[attrname][1])
     return newmap
 
+class ProjectedDataset(object):
+    '''
+    ProjectedDataset is the lazy 2D list dataset that projectARFF(...,
+    view=True) returns for a 2D list dataset: a view of the original rows
+    through the list offsets of the attribute offsets kept, so projecting
+    costs O(attributes) instead of O(instances x attributes). It stands
+    in for the 2D list it represents, but it is not a list, so code that
+    tests isinstance(dataset, list) or serializes it (e.g., with json)
+    needs materialize(). The first access to its rows (indexing,
+    iteration, mutation or any other list method) materializes that 2D
+    list once, after which every operation goes to it. len(), column(),
+    rowBlocks(), writeARFF, toColumnarARFF and projectARFF of a
+    ProjectedDataset read the original rows without materializing.
+    Like any view, an unmaterialized ProjectedDataset sees later mutation
+    of the original rows; call materialize() first to decouple it.
+    '''
+    def __init__(self, base, offsets):
+        self.base = base
+        self.offsets = list(offsets)
+        self.rows = None
+    def __projectRows__(self, rows):
+        # Return new projected row lists for a sequence of original rows.
+        offsets = self.offsets
+        if len(offsets) == 0:
+            return [[] for row in rows]
+        elif len(offsets) == 1:
+            ix = offsets[0]
+            return [[row[ix]] for row in rows]
+        return list(map(list, map(operator.itemgetter(*offsets), rows)))
+    def materialize(self):
+        '''
+        Return the projected 2D list, building it on the first call.
+        '''
+        if self.rows is None:
+            isCollecting = gc.isenabled()
+            gc.disable()    # avoid rescanning the new rows; see readCSV
+            try:
+                self.rows = self.__projectRows__(self.base)
+            finally:
+                if isCollecting:
+                    gc.enable()
+            self.base = None
+        return self.rows
+    def column(self, offset):
+        '''
+        Return a new list of the attribute-values at projected offset.
+        '''
+        if self.rows is not None:
+            return [row[offset] for row in self.rows]
+        return list(map(operator.itemgetter(self.offsets[offset]), self.base))
+    def rowBlocks(self, blockSize):
+        '''
+        Generate the projected rows as lists of at most blockSize rows.
+        '''
+        if self.rows is not None:
+            for start in range(0, len(self.rows), blockSize):
+                yield self.rows[start:start + blockSize]
+        else:
+            for start in range(0, len(self.base), blockSize):
+                yield self.__projectRows__(self.base[start:start + blockSize])
+    def project(self, offsets):
+        '''
+        Return a ProjectedDataset of the projected offsets of this one.
+        '''
+        if self.rows is not None:
+            return ProjectedDataset(self.rows, offsets)
+        return ProjectedDataset(self.base, [self.offsets[ix]
+            for ix in offsets])
+    def __len__(self):
+        return len(self.rows) if self.rows is not None else len(self.base)
+    def __getattr__(self, name):
+        # Other list methods (append, sort, ...) use the materialized list.
+        if name.startswith('__') or name in ('base', 'offsets', 'rows'):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+    def __getitem__(self, ix):
+        return self.materialize()[ix]
+    def __setitem__(self, ix, value):
+        self.materialize()[ix] = value
+    def __delitem__(self, ix):
+        del self.materialize()[ix]
+    def __iter__(self):
+        return iter(self.materialize())
+    def __reversed__(self):
+        return reversed(self.materialize())
+    def __contains__(self, row):
+        return row in self.materialize()
+    def __eq__(self, other):
+        if isinstance(other, ProjectedDataset):
+            other = other.materialize()
+        return self.materialize() == other
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    __hash__ = None
+    def __add__(self, other):
+        return self.materialize() + list(other)
+    def __radd__(self, other):
+        return list(other) + self.materialize()
+    def __iadd__(self, other):
+        self.materialize().extend(other)
+        return self
+    def __repr__(self):
+        return repr(self.materialize())
+    def __copy__(self):
+        return list(self.materialize())
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.materialize(), memo)
+
+def __uselessColumn__(dataset, aix):
+    # projectARFF's ('useless',) test of 2D list dataset column aix: true
+    # when every value after the first is None or == the first. The set of
+    # distinct values is built by C-level map(), after a sample of leading
+    # rows that rejects most useful columns early.
+    if isinstance(dataset, ProjectedDataset) and dataset.rows is None:
+        return __uselessColumn__(dataset.base, dataset.offsets[aix])
+    if len(dataset) == 0:
+        return True
+    firstval = dataset[0][aix]
+    getter = operator.itemgetter(aix)
+    for rows in (itertools.islice(dataset, 1, __CSV_SAMPLE__),
+            itertools.islice(dataset, 1, None)):
+        for value in set(map(getter, rows)):
+            if value != firstval and value != None:
+                return False
+    return True
+
 __projectionTypes__ = set(['numeric', 'string', 'nominal', 'date'])
-def projectARFF(attrmap, dataset, attributesToProject, isKeepingAttributes):
+def projectARFF(attrmap, dataset, attributesToProject, isKeepingAttributes,
+        view=False):
     '''
     Return new ARFF data that is a projection of a copy of attrmap, dataset,
     where attrmap is the map from attrname -> (offset, type) returned by
@@ -593,6 +2131,10 @@ def projectARFF(attrmap, dataset, attributesToProject, isKeepingAttributes):
     where ('useless',) matches all single-value columns in the data.
     The return value is a new (attrmap, dataset) pair as in readARFF's
     return value. added 09/13/2020
+    A ColumnarDataset dataset projects to a ColumnarDataset that shares
+    its kept columns. A 2D list dataset projects to a new 2D list, or
+    when view is True, to a lazy ProjectedDataset view of its rows that
+    sees changes to them until its first row access; see ProjectedDataset.
     '''
     # print("DEBUG ENTER PJ len(dataset)", len(dataset), "attributesToProject", attributesToProject) ; sys.stdout.flush()
     # sys.stderr.write("DEBUG ENTER PJ len(dataset) " + str(len(dataset)) + " attributesToProject " + str(attributesToProject) + '\n'); sys.stderr.flush()
@@ -630,14 +2172,15 @@ def projectARFF(attrmap, dataset, attributesToProject, isKeepingAttributes):
                 for aix in range(0, len(attrmap)):
                     if aix in keepIndices:
                         continue
-                    firstval = dataset[0][aix]
-                    isuseless = True
-                    for instix in range(1, len(dataset)):
-                        if (dataset[instix][aix] != firstval and
-                                dataset[instix][aix] != None):
-                            isuseless = False
-                            break
-                    if isuseless:
+                    if isinstance(dataset, ColumnarDataset):
+                        column = dataset.columns[aix]
+                        known = column.values[~column.mask]
+                        isuseless = (known.size == 0
+                            or bool((known == known[0]).all()))
+                        if isuseless:
+                            keepIndices.add(aix)
+                        continue
+                    if __uselessColumn__(dataset, aix):
                         keepIndices.add(aix)
             wildcardsSeen.add(typequery)
         else:
@@ -658,27 +2201,42 @@ def projectARFF(attrmap, dataset, attributesToProject, isKeepingAttributes):
         tmp = keepIndices
         keepIndices = loseIndices
         loseIndices = tmp
-    newdataset = [[] for ii in range(0, len(dataset))]
-    for instix in range(0, len(dataset)):
-        for atrbix in keepList:
-            # sys.stderr.write('DEBUG PA ' + str(instix) + ' from ' + str(len(dataset)) + ' attrix ' + str(atrbix) + '\n'); sys.stderr.flush();
-            newdataset[instix].append(dataset[instix][atrbix])
+    if isinstance(dataset, ColumnarDataset):
+        # Projected columns are shared, not copied.
+        newdataset = ColumnarDataset([dataset.columns[atrbix]
+            for atrbix in keepList], len(dataset), dataset.isUsingNan)
+    elif isinstance(dataset, ProjectedDataset):
+        newdataset = dataset.project(keepList)
+    else:
+        newdataset = ProjectedDataset(dataset, keepList)
+    if not view and isinstance(newdataset, ProjectedDataset):
+        newdataset = newdataset.materialize()
     # data are updated, now update the type map indices
-    newmap = copy.deepcopy(attrmap)
+    newindex = dict([(keepList[newix], newix)
+        for newix in range(0, len(keepList))])
+    newmap = {}
     for ky in attrmap.keys():
         kyix = attrmap[ky][0]   # The index of this attribute
-        if kyix in loseIndices:
-            del newmap[ky]
-        else:
-            newkeyix = kyix
-            for atrbix in loseList:
-                if kyix > atrbix:
-                    newkeyix -= 1
-                else:
-                    break   # atrbix keeps going up; kyix is smaller
-            newmap[ky] = (newkeyix, attrmap[ky][1])
+        if not kyix in loseIndices:
+            newmap[ky] = (newindex[kyix], attrmap[ky][1])
     return (newmap, newdataset)
 
+def __copyRows__(dataset):
+    # Return a copy of 2D list dataset for a transform to mutate, in place
+    # of copy.deepcopy(dataset). Attribute-values are immutable (numbers,
+    # strings, None and (string, datetime) date tuples), so copying each
+    # row list with a C-level row[:] suffices to leave dataset unmutated,
+    # while sharing every attribute-value object instead of copying it.
+    if isinstance(dataset, ProjectedDataset) and dataset.rows is None:
+        return ProjectedDataset(dataset.base, dataset.offsets).materialize()
+    isCollecting = gc.isenabled()
+    gc.disable()    # avoid rescanning the new rows; see readCSV
+    try:
+        return list(map(operator.itemgetter(slice(None)), dataset))
+    finally:
+        if isCollecting:
+            gc.enable()
+
 def joinARFF(attrmap, dataset, nameTypePairs, rowsOfNewColumns):
     '''
     Return new ARFF data that is a join of a copy of attrmap, dataset,
@@ -734,6 +2292,738 @@ def joinARFF(attrmap, dataset, nameTypePairs, rowsOfNewColumns):
         ninstances.append(dataset[ixx] + rowsOfNewColumns[ixx])
     return (nattrmap, ninstances)
 
+__JOIN_HOWS__ = ('inner', 'left', 'outer')
+__JOIN_METHODS__ = ('hash', 'merge')
+
+def __joinKeyOffsets__(leftattrmap, rightattrmap, leftKeys, rightKeys,
+        how, where):
+    # Validate a key join's arguments, returning the (lkeys, rkeys) key
+    # attribute offsets of the left and right relations.
+    if not how in __JOIN_HOWS__:
+        raise ValueError("INVALID how ARGUMENT: " + str(how) + " in "
+            + where + ", must be one of " + str(__JOIN_HOWS__))
+    if rightKeys is None:
+        rightKeys = leftKeys
+    lkeys = __attributeOffsets__(leftattrmap, leftKeys, where)
+    rkeys = __attributeOffsets__(rightattrmap, rightKeys, where)
+    if len(lkeys) == 0 or len(lkeys) != len(rkeys):
+        raise ValueError("leftKeys and rightKeys must name the same number"
+            + " (at least 1) of key attributes in " + where)
+    lremp = remapAttributes(leftattrmap)
+    rremp = remapAttributes(rightattrmap)
+    for lo, ro in zip(lkeys, rkeys):
+        lkind = __columnKind__(lremp[lo][1])
+        rkind = __columnKind__(rremp[ro][1])
+        if (lkind == 'nominal' or lkind == 'string') != (rkind == 'nominal'
+                or rkind == 'string') or (lkind == 'date') != (rkind == 'date'):
+            raise ValueError("INCOMPATIBLE KEY ATTRIBUTES " + lremp[lo][0]
+                + " (" + lkind + ") and " + rremp[ro][0] + " (" + rkind
+                + ") in " + where)
+    return (lkeys, rkeys)
+
+def __joinedAttributes__(leftattrmap, rightattrmap, lkeys, rkeys, how,
+        suffix):
+    # Return (newattrmap, rkeep): a key join's attrmap, with the left
+    # attributes at their offsets followed by the right relation's non-key
+    # attributes in offset order, which are listed in rkeep. A right name
+    # already taken gets suffix, then suffix and 2, 3, ..., until unique.
+    # An outer join's nominal key declares the right key's extra symbols,
+    # or becomes a string attribute when the right key is a string.
+    newattrmap = copy.deepcopy(leftattrmap)
+    lremp = remapAttributes(leftattrmap)
+    rremp = remapAttributes(rightattrmap)
+    if how == 'outer':
+        for lo, ro in zip(lkeys, rkeys):
+            lname, ltype = lremp[lo]
+            rtype = rremp[ro][1]
+            if __columnKind__(ltype) != 'nominal':
+                continue
+            if __columnKind__(rtype) == 'string':
+                newattrmap[lname] = (lo, 'string')
+                continue
+            known = set([__unquoteNominal__(s) for s in ltype[2]])
+            extras = [s for s in rtype[2] if not __unquoteNominal__(s) in known]
+            if extras:
+                symbols = list(ltype[2]) + extras
+                newattrmap[lname] = (lo, ('nominal', '{' + ','.join(
+                    [s if s.startswith("'") else quoteStringIfNeeded(s)
+                        for s in symbols]) + '}', symbols))
+    rkeep = []
+    for ro in range(0, len(rremp)):
+        if ro in rkeys:
+            continue
+        rname, rtype = rremp[ro]
+        name = rname
+        if name in newattrmap:
+            name = rname + suffix
+            count = 2
+            while name in newattrmap or name in rightattrmap:
+                name = rname + suffix + str(count)
+                count += 1
+        newattrmap[name] = (len(newattrmap), rtype)
+        rkeep.append(ro)
+    return (newattrmap, rkeep)
+
+def __rowJoinKeys__(dataset, offsets, kinds):
+    # Return the hashable join key of each row of 2D list dataset from its
+    # values at offsets, a date as its datetime, None when any is unknown.
+    if len(offsets) == 1 and kinds[0] != 'date':
+        return [None if (v is None or v != v) else v     # v != v for nan
+            for v in map(operator.itemgetter(offsets[0]), dataset)]
+    pairs = list(zip(offsets, [kind == 'date' for kind in kinds]))
+    def keyOf(inst):
+        key = []
+        for offset, isDate in pairs:
+            v = inst[offset]
+            if v is None or v != v:
+                return None
+            key.append(v[1] if isDate else v)
+        return tuple(key)
+    return list(map(keyOf, dataset))
+
+def __rowPartGetter__(offsets):
+    # Return a function from a 2D list row to a new list of its values
+    # at offsets.
+    if not offsets:
+        return lambda inst : []
+    getter = operator.itemgetter(*offsets)
+    if len(offsets) == 1:
+        return lambda inst : [getter(inst)]
+    return lambda inst : list(getter(inst))
+
+def __rightOnlyRow__(width, lkeys, rkeys, rpart):
+    # Return a function from a right 2D list row to its outer join row,
+    # unknown in the left attributes except the keys taken from it.
+    keypairs = list(zip(lkeys, rkeys))
+    def rightOnly(rinst):
+        row = [None] * width
+        for lo, ro in keypairs:
+            row[lo] = rinst[ro]
+        return row + rpart(rinst)
+    return rightOnly
+
+def __hashJoinRows__(left, right, lkeys, rkeys, kinds, how, rkeep, width):
+    # Hash join of 2D lists: index the right rows by key in a dict, then
+    # probe it with each left row in order. When the right keys are
+    # unique, the dict maps each key to its row's right values and the
+    # probe is a single map() of dict.get.
+    rpart = __rowPartGetter__(rkeep)
+    rparts = list(map(rpart, right))
+    rowkeys = __rowJoinKeys__(right, rkeys, kinds)
+    leftkeys = __rowJoinKeys__(left, lkeys, kinds)
+    nonepart = [None] * len(rkeep)
+    isCollecting = gc.isenabled()
+    gc.disable()    # avoid rescanning the new rows; see __copyRows__
+    try:
+        unique = dict(zip(rowkeys, rparts))
+        unique.pop(None, None)
+        if len(unique) == len(rowkeys) - rowkeys.count(None):
+            probe = list(map(unique.get, leftkeys))
+            if how == 'inner':
+                result = [inst + part for inst, part in zip(left, probe)
+                    if part is not None]
+            else:
+                result = [inst + (nonepart if part is None else part)
+                    for inst, part in zip(left, probe)]
+            if how == 'outer':
+                lkeyset = set(leftkeys)
+                rightOnly = __rightOnlyRow__(width, lkeys, rkeys, rpart)
+                result.extend([rightOnly(rinst) for rinst, key
+                    in zip(right, rowkeys) if key is None
+                        or not key in lkeyset])
+            return result
+        unique = None
+        index = {}
+        for rix, key in enumerate(rowkeys):
+            if key is not None:
+                index.setdefault(key, []).append(rix)
+        rmatched = bytearray(len(rparts)) if how == 'outer' else None
+        result = []
+        for inst, key in zip(left, leftkeys):
+            matches = index.get(key) if key is not None else None
+            if matches:
+                for rix in matches:
+                    result.append(inst + rparts[rix])
+                    if rmatched is not None:
+                        rmatched[rix] = 1
+            elif how != 'inner':
+                result.append(inst + nonepart)
+        if rmatched is not None:
+            rightOnly = __rightOnlyRow__(width, lkeys, rkeys, rpart)
+            for rix in range(0, len(rparts)):
+                if not rmatched[rix]:
+                    result.append(rightOnly(right[rix]))
+        return result
+    finally:
+        if isCollecting:
+            gc.enable()
+
+def __mergeJoinRows__(left, right, lkeys, rkeys, kinds, how, rkeep, width,
+        where):
+    # Generate the rows of a sort-merge join of iterables of 2D list rows
+    # left and right, each sorted on its keys as by sortARFF, comparing
+    # consecutive groups of equal keys. Only one right key group is held
+    # in memory. Raises ValueError when an input is out of order.
+    lkeyOf = __rowSortKey__(lkeys, kinds, False, None)
+    rkeyOf = __rowSortKey__(rkeys, kinds, False, None)
+    rpart = __rowPartGetter__(rkeep)
+    rightOnly = __rightOnlyRow__(width, lkeys, rkeys, rpart)
+    nonepart = [None] * len(rkeep)
+    lgroups = itertools.groupby(left, key=lkeyOf)
+    rgroups = itertools.groupby(right, key=rkeyOf)
+    lkey, lgroup = next(lgroups, (None, None))
+    rkey, rgroup = next(rgroups, (None, None))
+    while lgroup is not None or rgroup is not None:
+        if rgroup is None or (lgroup is not None and lkey < rkey):
+            isLeft, isRight = True, False
+        elif lgroup is None or rkey < lkey:
+            isLeft, isRight = False, True
+        else:
+            isLeft = isRight = True
+        if isLeft and isRight and not [1 for rank, v in lkey if rank]:
+            rrows = [rpart(rinst) for rinst in rgroup]
+            for inst in lgroup:
+                for rrow in rrows:
+                    yield inst + rrow
+        else:
+            # A group without a match, or with an unknown key attribute.
+            if isLeft and how != 'inner':
+                for inst in lgroup:
+                    yield inst + nonepart
+            if isRight and how == 'outer':
+                for rinst in rgroup:
+                    yield rightOnly(rinst)
+        if isLeft:
+            lastkey = lkey
+            lkey, lgroup = next(lgroups, (None, None))
+            if lgroup is not None and lkey < lastkey:
+                raise ValueError("Left input out of key order in " + where)
+        if isRight:
+            lastkey = rkey
+            rkey, rgroup = next(rgroups, (None, None))
+            if rgroup is not None and rkey < lastkey:
+                raise ValueError("Right input out of key order in " + where)
+
+def __takeOrUnknown__(column, indices):
+    # Return the ARFFColumn of column's rows at int array indices, where
+    # index -1 selects an unknown value.
+    missing = indices < 0
+    intmask = None
+    if len(column):
+        safe = numpy.where(missing, 0, indices)
+        values = column.values[safe]
+        mask = column.mask[safe] | missing
+        if column.intmask is not None:
+            intmask = column.intmask[safe] & ~missing
+    else:
+        values = numpy.zeros(len(indices), dtype=column.values.dtype)
+        mask = numpy.ones(len(indices), dtype=bool)
+    if column.kind == 'nominal' or column.kind == 'string':
+        values[mask] = -1
+    elif values.dtype.kind in 'fM':
+        values[missing] = numpy.nan if values.dtype.kind == 'f' \
+            else numpy.datetime64('NaT')
+    else:
+        values[missing] = 0
+    return ARFFColumn(column.kind, values, mask, column.categories,
+        column.dateformat, intmask)
+
+def __columnarJoinPairs__(lcolumns, rcolumns, how, method):
+    # Return (lidx, ridx), the int arrays of the left and right row of
+    # each ColumnarDataset key join result row, -1 for none. The key
+    # columns of both sides are numbered together in key order with
+    # numpy.unique, then each left row finds its run of equal right codes
+    # with numpy.searchsorted on the right codes sorted stably.
+    L = len(lcolumns[0])
+    R = len(rcolumns[0])
+    codes = numpy.zeros(L + R, dtype=numpy.int64)
+    unknown = numpy.zeros(L + R, dtype=bool)
+    for kix in range(0, len(lcolumns)):
+        both = __concatColumns__([lcolumns[kix], rcolumns[kix]])
+        unknown |= both.mask
+        distinct, inverse = numpy.unique(numpy.where(both.mask, 0,
+            both.sortKey()), return_inverse=True)
+        if kix == 0:
+            codes = inverse.astype(numpy.int64).reshape(-1)
+        else:
+            codes = numpy.unique(codes * len(distinct) + inverse.reshape(-1),
+                return_inverse=True)[1].reshape(-1)
+    codes[unknown] = -1
+    lcode = codes[:L]
+    rcode = codes[L:]
+    rorder = numpy.argsort(rcode, kind='stable')
+    rsorted = rcode[rorder]
+    start = numpy.searchsorted(rsorted, lcode, 'left')
+    counts = numpy.where(lcode >= 0,
+        numpy.searchsorted(rsorted, lcode, 'right') - start, 0)
+    if how != 'inner':
+        slots = numpy.maximum(counts, 1)    # one row for an unmatched left
+    else:
+        slots = counts
+    total = int(slots.sum())
+    lidx = numpy.repeat(numpy.arange(L, dtype=numpy.int64), slots)
+    within = numpy.arange(total, dtype=numpy.int64) - numpy.repeat(
+        numpy.cumsum(slots) - slots, slots)
+    ridx = numpy.repeat(start, slots) + within
+    ridx = rorder[numpy.minimum(ridx, max(R - 1, 0))] if R \
+        else numpy.zeros(total, dtype=numpy.int64)
+    ridx[numpy.repeat(counts == 0, slots)] = -1
+    if how == 'outer':
+        rmatched = numpy.zeros(R, dtype=bool)
+        rmatched[ridx[ridx >= 0]] = True
+        ronly = numpy.flatnonzero(~rmatched)
+        lidx = numpy.concatenate([lidx, numpy.zeros(len(ronly),
+            dtype=numpy.int64) - 1])
+        ridx = numpy.concatenate([ridx, ronly])
+    if method == 'merge':
+        paircodes = numpy.where(lidx >= 0,
+            lcode[numpy.maximum(lidx, 0)] if L else -1,
+            rcode[numpy.maximum(ridx, 0)] if R else -1)
+        order = numpy.argsort(numpy.where(paircodes < 0,
+            numpy.iinfo(numpy.int64).max, paircodes), kind='stable')
+        lidx = lidx[order]
+        ridx = ridx[order]
+    return (lidx, ridx)
+
+def __columnarKeyJoin__(left, right, newattrmap, lkeys, rkeys, how, rkeep,
+        method):
+    # keyJoinARFF of two ColumnarDatasets, sharing no columns with them.
+    lidx, ridx = __columnarJoinPairs__([left.columns[o] for o in lkeys],
+        [right.columns[o] for o in rkeys], how, method)
+    offsetTOnameType = remapAttributes(newattrmap)
+    keypairs = dict(zip(lkeys, rkeys))
+    columns = []
+    for offset in range(0, len(left.columns)):
+        if how == 'outer' and offset in keypairs:
+            both = __concatColumns__([left.columns[offset],
+                right.columns[keypairs[offset]]])
+            kind = __columnKind__(offsetTOnameType[offset][1])
+            if kind != both.kind:
+                both = __encodedColumn__(kind, both.values,
+                    list(both.categories))
+            columns.append(both.take(numpy.where(lidx >= 0, lidx,
+                len(left) + ridx)))
+        else:
+            columns.append(__takeOrUnknown__(left.columns[offset], lidx))
+    for offset in rkeep:
+        columns.append(__takeOrUnknown__(right.columns[offset], ridx))
+    return ColumnarDataset(columns, len(lidx), left.isUsingNan)
+
+def keyJoinARFF(leftattrmap, leftdataset, rightattrmap, rightdataset,
+        leftKeys, rightKeys=None, how='inner', method='hash',
+        suffix='_right', presorted=False):
+    '''
+    Return (newattrmap, newdataset), the join of the left relation
+    leftattrmap, leftdataset with the right relation rightattrmap,
+    rightdataset on equal values of their key attributes, where each
+    is an attrmap and dataset as returned by readARFF. Unlike joinARFF,
+    which concatenates columns by row position, this matches rows by
+    key. leftKeys and rightKeys are equal-length sequences of names or
+    offsets of the key attributes, rightKeys defaulting to leftKeys.
+    Paired keys must both be numeric, both nominal or string, or both
+    dates, which match on their datetimes. A row whose key has an
+    unknown value matches no row. how is 'inner' for only matched pairs
+    of rows, 'left' to also keep each unmatched left row with unknown
+    right attributes, or 'outer' to keep unmatched right rows too, with
+    their key values in the key attributes and unknown left attributes.
+    newattrmap holds the left attributes at their offsets followed by
+    the right relation's non-key attributes in offset order; a right
+    attribute name already taken gets suffix appended, then suffix and
+    2, 3 and so on until unique. An outer join's nominal key declares
+    the right key's extra symbols, or becomes a string attribute when
+    the right key is a string.
+    method 'hash' indexes the right rows in a hash table and returns the
+    joined rows in left row order, each left row's matches in right row
+    order, and then any unmatched right rows in their order. method
+    'merge' sorts both relations on their keys with sortARFF (unless
+    presorted is True, when each must already be in sortARFF's key
+    order) and merges them, returning the rows in key order; see
+    keyJoinARFFfiles to merge join files too large for memory.
+    A ColumnarDataset leftdataset returns a ColumnarDataset, joined
+    with numpy on codes for the key values in place of a hash table,
+    in the order given for method. The input relations are not mutated.
+    '''
+    where = 'keyJoinARFF'
+    if not method in __JOIN_METHODS__:
+        raise ValueError("INVALID method ARGUMENT: " + str(method) + " in "
+            + where + ", must be one of " + str(__JOIN_METHODS__))
+    lkeys, rkeys = __joinKeyOffsets__(leftattrmap, rightattrmap, leftKeys,
+        rightKeys, how, where)
+    newattrmap, rkeep = __joinedAttributes__(leftattrmap, rightattrmap,
+        lkeys, rkeys, how, suffix)
+    if isinstance(leftdataset, ColumnarDataset):
+        if not isinstance(rightdataset, ColumnarDataset):
+            rightdataset = toColumnarARFF(rightattrmap, rightdataset)
+        return (newattrmap, __columnarKeyJoin__(leftdataset, rightdataset,
+            newattrmap, lkeys, rkeys, how, rkeep, method))
+    if isinstance(rightdataset, ColumnarDataset):
+        rightdataset = rightdataset.tolist()
+    lremp = remapAttributes(leftattrmap)
+    kinds = [__columnKind__(lremp[offset][1]) for offset in lkeys]
+    if method == 'hash':
+        return (newattrmap, __hashJoinRows__(leftdataset, rightdataset,
+            lkeys, rkeys, kinds, how, rkeep, len(leftattrmap)))
+    if not presorted:
+        leftdataset = sortARFF(leftattrmap, leftdataset, lkeys)
+        rightdataset = sortARFF(rightattrmap, rightdataset, rkeys)
+    return (newattrmap, list(__mergeJoinRows__(leftdataset, rightdataset,
+        lkeys, rkeys, kinds, how, rkeep, len(leftattrmap), where)))
+
+def __changedColumns__(dataset, newattrmap, newrows, offsets):
+    # Return a ColumnarDataset sharing the columns of ColumnarDataset
+    # dataset except those at offsets, which are rebuilt from the 2D list
+    # newrows with their types in newattrmap.
+    offsetTOnameType = remapAttributes(newattrmap)
+    return dataset.withColumns(dict([(offset, __columnFromValues__(
+        offsetTOnameType[offset][1], [inst[offset] for inst in newrows]))
+            for offset in set(offsets)]))
+
+__EXPRESSION_FUNCTIONS__ = {
+    'abs'       :   numpy.abs,
+    'sqrt'      :   numpy.sqrt,
+    'exp'       :   numpy.exp,
+    'log'       :   numpy.log,
+    'log10'     :   numpy.log10,
+    'log2'      :   numpy.log2,
+    'sin'       :   numpy.sin,
+    'cos'       :   numpy.cos,
+    'tan'       :   numpy.tan,
+    'floor'     :   numpy.floor,
+    'ceil'      :   numpy.ceil,
+    'round'     :   numpy.round,
+    'min'       :   numpy.minimum,
+    'max'       :   numpy.maximum,
+    'pow'       :   lambda x, y : numpy.power(numpy.asarray(x, dtype=float), y),
+}
+
+# The __EXPRESSION_FUNCTIONS__ whose result is a Python int for an int.
+__EXPRESSION_INT_FUNCTIONS__ = set(['abs', 'floor', 'ceil', 'round'])
+
+# The __EXPRESSION_OPERATORS__ whose result is a Python int for ints.
+__EXPRESSION_INT_OPERATORS__ = set([ast.Add, ast.Sub, ast.Mult, ast.FloorDiv,
+    ast.Mod, ast.Pow, ast.USub, ast.UAdd])
+
+__EXPRESSION_OPERATORS__ = {
+    ast.Add     :   operator.add,
+    ast.Sub     :   operator.sub,
+    ast.Mult    :   operator.mul,
+    ast.Div     :   numpy.true_divide,
+    ast.FloorDiv:   numpy.floor_divide,
+    ast.Mod     :   numpy.mod,
+    ast.Pow     :   lambda x, y : numpy.power(numpy.asarray(x, dtype=float), y),
+    ast.USub    :   operator.neg,
+    ast.UAdd    :   operator.pos,
+    ast.Not     :   numpy.logical_not,
+    ast.Lt      :   operator.lt,
+    ast.LtE     :   operator.le,
+    ast.Gt      :   operator.gt,
+    ast.GtE     :   operator.ge,
+    ast.Eq      :   operator.eq,
+    ast.NotEq   :   operator.ne,
+}
+
+class ColumnExpression(object):
+    '''
+    ColumnExpression compiles a derived attribute expression once for
+    deriveARFF to evaluate over whole columns with numpy, in place of
+    calling a FUNC per instance. source is a Python expression over
+    attribute names, numbers and quoted strings using + - * / // % **,
+    comparisons (which may chain), and, or, not, X if CONDITION else Y,
+    and the functions abs, sqrt, exp, log, log10, log2, sin, cos, tan,
+    floor, ceil, round, min and max of 2 values, and pow. col('name')
+    refers to an attribute whose name is not a Python identifier, and
+    isunknown(x) is 1 where x is unknown, else 0. Nominal and string
+    attributes are their strings. An unknown operand makes a result
+    unknown, except in the branch an if does not take, or where a known
+    operand decides an and or an or, as do division by zero and results
+    that are not finite numbers, such as log(0). A result is a Python
+    int where a per-instance FUNC computing it would give one, such as
+    an int plus an int, even within a numeric column that mixes ints and
+    floats. names is the set of attribute names the expression reads.
+    '''
+    def __init__(self, source):
+        self.source = source
+        self.names = set()
+        try:
+            tree = ast.parse(source.strip(), mode='eval')
+        except SyntaxError as errmsg:
+            raise ValueError("Invalid deriveARFF expression: " + repr(source)
+                + ": " + str(errmsg))
+        self.evaluator = self.__compile__(tree.body)
+    def __repr__(self):
+        return 'ColumnExpression(' + repr(self.source) + ')'
+    def __invalid__(self, node):
+        raise ValueError("Unsupported construct in deriveARFF expression "
+            + repr(self.source) + ": " + ast.dump(node))
+    def __compile__(self, node):
+        # Return a function of env, a map from attribute name -> (values,
+        # unknown, ints) numpy arrays, returning the (values, unknown,
+        # ints) of node, ints being True where a value is a Python int.
+        # unknown and ints may be scalars, as for a known constant.
+        if isinstance(node, ast.Constant) and isinstance(node.value,
+                (int, float, str)) and not isinstance(node.value, bool):
+            value = node.value
+            isint = isinstance(value, int)
+            return lambda env : (value, False, isint)
+        elif isinstance(node, ast.Name):
+            return self.__nameEvaluator__(node.id)
+        elif isinstance(node, ast.BinOp) \
+                and type(node.op) in __EXPRESSION_OPERATORS__:
+            func = __EXPRESSION_OPERATORS__[type(node.op)]
+            left = self.__compile__(node.left)
+            right = self.__compile__(node.right)
+            isDividing = isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod))
+            isIntOp = type(node.op) in __EXPRESSION_INT_OPERATORS__
+            isPow = isinstance(node.op, ast.Pow)
+            def __binop__(env):
+                lvals, lunknown, lints = left(env)
+                rvals, runknown, rints = right(env)
+                unknown = lunknown | runknown
+                if isDividing:
+                    unknown = unknown | (numpy.asarray(rvals) == 0)
+                ints = isIntOp and (lints & rints)
+                if isPow and isIntOp:
+                    ints = ints & (numpy.asarray(rvals) >= 0)
+                return (func(lvals, rvals), unknown, ints)
+            return __binop__
+        elif isinstance(node, ast.UnaryOp) \
+                and type(node.op) in __EXPRESSION_OPERATORS__:
+            func = __EXPRESSION_OPERATORS__[type(node.op)]
+            operand = self.__compile__(node.operand)
+            isIntOp = type(node.op) in __EXPRESSION_INT_OPERATORS__
+            def __unaryop__(env):
+                vals, unknown, ints = operand(env)
+                return (func(vals), unknown, isIntOp and ints)
+            return __unaryop__
+        elif isinstance(node, ast.Compare):
+            funcs = []
+            for op in node.ops:
+                if not type(op) in __EXPRESSION_OPERATORS__:
+                    self.__invalid__(op)
+                funcs.append(__EXPRESSION_OPERATORS__[type(op)])
+            operands = [self.__compile__(n)
+                for n in [node.left] + node.comparators]
+            def __compare__(env):
+                evaluated = [operand(env) for operand in operands]
+                result = True
+                unknown = False
+                for ix in range(0, len(funcs)):
+                    result = result & funcs[ix](evaluated[ix][0],
+                        evaluated[ix+1][0])
+                    unknown = unknown | evaluated[ix][1] | evaluated[ix+1][1]
+                return (result, unknown, True)
+            return __compare__
+        elif isinstance(node, ast.BoolOp):
+            isAnd = isinstance(node.op, ast.And)
+            operands = [self.__compile__(n) for n in node.values]
+            def __boolop__(env):
+                # A known False operand decides an and, a known True an or.
+                vals = isAnd
+                unknown = False
+                decided = False
+                for operand in operands:
+                    ovals, ounknown, oints = operand(env)
+                    ovals = numpy.asarray(ovals, dtype=bool)
+                    if isAnd:
+                        vals = vals & ovals
+                        decided = decided | (~ovals & ~ounknown)
+                    else:
+                        vals = vals | ovals
+                        decided = decided | (ovals & ~ounknown)
+                    unknown = unknown | ounknown
+                return (numpy.where(decided, not isAnd, vals),
+                    unknown & ~decided, True)
+            return __boolop__
+        elif isinstance(node, ast.IfExp):
+            test = self.__compile__(node.test)
+            body = self.__compile__(node.body)
+            orelse = self.__compile__(node.orelse)
+            def __ifexp__(env):
+                tvals, tunknown, tints = test(env)
+                bvals, bunknown, bints = body(env)
+                evals, eunknown, eints = orelse(env)
+                tvals = numpy.asarray(tvals, dtype=bool)
+                return (numpy.where(tvals, bvals, evals),
+                    tunknown | numpy.where(tvals, bunknown, eunknown),
+                        numpy.where(tvals, bints, eints))
+            return __ifexp__
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+                and not node.keywords:
+            fname = node.func.id
+            if fname == 'col' and len(node.args) == 1 \
+                    and isinstance(node.args[0], ast.Constant) \
+                    and isinstance(node.args[0].value, str):
+                return self.__nameEvaluator__(node.args[0].value)
+            elif fname == 'isunknown' and len(node.args) == 1:
+                operand = self.__compile__(node.args[0])
+                def __isunknown__(env):
+                    vals, unknown, ints = operand(env)
+                    return (numpy.asarray(unknown, dtype=numpy.int64) 
+                        | numpy.zeros(numpy.shape(vals), dtype=numpy.int64),
+                        False, True)
+                return __isunknown__
+            elif not fname in __EXPRESSION_FUNCTIONS__:
+                raise ValueError("Unknown function in deriveARFF expression "
+                    + repr(self.source) + ": " + fname)
+            func = __EXPRESSION_FUNCTIONS__[fname]
+            operands = [self.__compile__(n) for n in node.args]
+            def __call__(env):
+                evaluated = [operand(env) for operand in operands]
+                unknown = False
+                for vals, ounknown, oints in evaluated:
+                    unknown = unknown | ounknown
+                args = [vals for vals, ounknown, oints in evaluated]
+                vals = func(*args)
+                if numpy.asarray(vals).dtype.kind == 'f':
+                    unknown = unknown | ~numpy.isfinite(vals)
+                if fname in ('min', 'max') and len(args) == 2:
+                    # Python's min and max return the first extreme operand.
+                    isFirst = (numpy.asarray(args[0]) <= args[1])             \
+                        if fname == 'min' else (numpy.asarray(args[0])
+                            >= args[1])
+                    ints = numpy.where(isFirst, evaluated[0][2],
+                        evaluated[1][2])
+                else:
+                    ints = fname in __EXPRESSION_INT_FUNCTIONS__              \
+                        and len(args) == 1 and evaluated[0][2]
+                return (vals, unknown, ints)
+            return __call__
+        self.__invalid__(node)
+    def __nameEvaluator__(self, name):
+        self.names.add(name)
+        return lambda env : env[name]
+    def evaluate(self, env, nrows):
+        '''
+        Return (values, unknown, ints), numpy arrays of length nrows, for
+        env, a map from each attribute name in names -> its (values,
+        unknown, ints) numpy arrays, unknown being True where the attribute
+        is unknown and ints where its value is a Python int. Float results
+        that are not finite are unknown.
+        '''
+        with numpy.errstate(all='ignore'):
+            values, unknown, ints = self.evaluator(env)
+        values = numpy.asarray(values)
+        if values.dtype.kind == 'f':
+            unknown = unknown | ~numpy.isfinite(values)
+        values = numpy.broadcast_to(values, (nrows,))
+        unknown = numpy.broadcast_to(numpy.asarray(unknown, dtype=bool),
+            (nrows,))
+        ints = numpy.broadcast_to(numpy.asarray(ints, dtype=bool), (nrows,))
+        return (values, unknown, ints)
+
+def __expressionOperand__(column):
+    # Return the (values, unknown, ints) numpy arrays of ARFFColumn column
+    # that ColumnExpression evaluates, nominal and string values as
+    # strings, ints being True where a numeric value is a Python int.
+    if column.kind in ('nominal', 'string'):
+        lookup = numpy.array(list(column.categories) + [''], dtype=object)
+        return (lookup[column.values], column.mask, False)
+    elif column.kind == 'numeric':
+        return (column.values, column.mask, __knownInts__(column))
+    return (column.values, column.mask, False)
+
+def __expressionColumn__(TYPE, values, unknown, ints):
+    # Return the ARFFColumn of a ColumnExpression's (values, unknown, ints)
+    # as a derived TYPE 'numeric' or 'string' attribute, with deriveARFF's
+    # conversions of its FUNC results; a float where ints is True is an int.
+    if TYPE == 'numeric' and values.dtype.kind in 'biuf':
+        if values.dtype.kind in 'bu':
+            values = values.astype(numpy.int64)
+        intmask = None
+        if values.dtype.kind == 'f':
+            intmask = ints & ~unknown
+            values = numpy.where(unknown, numpy.nan, values)
+        else:
+            values = numpy.where(unknown, 0, values)
+        return ARFFColumn('numeric', values, numpy.array(unknown),
+            intmask=intmask)
+    converted = [None if u else (int(v) if (isint and isinstance(v, float))
+        else v) for v, u, isint in zip(values.tolist(), unknown.tolist(),
+            ints.tolist())]
+    converted = [v if v is None else (str(v) if TYPE == 'string'
+        else (v if isinstance(v, (int, float)) else float(v)))
+            for v in converted]
+    return __columnFromValues__(TYPE, converted)
+
+def __deriveColumns__(attrmap, dataset, nameTypeFunctionTriplets):
+    # deriveARFF with ColumnExpressions among its FUNCs: run the triplets
+    # in order, each one a column at a time, where a FUNC sees every
+    # earlier triplet's results. A 2D list is copied as in deriveARFF,
+    # and only the attributes an expression reads become ARFFColumns.
+    newattrmap = copy.deepcopy(attrmap)
+    ocolumnsCount = len(newattrmap.keys())
+    offsets = []
+    for NAME, TYPE, FUNC in nameTypeFunctionTriplets:
+        if TYPE != 'string' and TYPE != 'numeric':
+            raise ValueError("INVALID ATTRIBUTE TYPE: " + TYPE
+                + " in call to deriveARFF, must be 'string' or 'numeric'")
+        if NAME in newattrmap.keys():
+            if newattrmap[NAME][1] != TYPE:
+                newattrmap[NAME] = (newattrmap[NAME][0], TYPE)
+        else:
+            newattrmap[NAME] = (len(newattrmap.keys()), TYPE)
+        offsets.append(newattrmap[NAME][0])
+    nrows = len(dataset)
+    isColumnar = isinstance(dataset, ColumnarDataset)
+    columns = {}    # offset -> ARFFColumn, built on demand for a 2D list
+    unknownColumn = ARFFColumn('numeric', numpy.zeros(nrows,
+        dtype=numpy.int64), numpy.ones(nrows, dtype=bool))
+    for offset in range(ocolumnsCount, len(newattrmap)):
+        columns[offset] = unknownColumn
+    if isColumnar:
+        columns.update(enumerate(dataset.columns))
+        rows = None     # 2D list form, built when a callable FUNC needs it
+    else:
+        remp = remapAttributes(attrmap)
+        rows = __copyRows__(dataset)
+        for inst in rows:
+            inst.extend([None] * (len(newattrmap) - ocolumnsCount))
+    for tix in range(0, len(nameTypeFunctionTriplets)):
+        NAME, TYPE, FUNC = nameTypeFunctionTriplets[tix]
+        OFFSET = offsets[tix]
+        if isinstance(FUNC, str):
+            FUNC = ColumnExpression(FUNC)
+        if isinstance(FUNC, ColumnExpression):
+            env = {}
+            for name in FUNC.names:
+                if not name in newattrmap:
+                    raise ValueError("Unknown attribute " + repr(name)
+                        + " in deriveARFF expression " + repr(FUNC.source))
+                offset = newattrmap[name][0]
+                if not offset in columns:
+                    columns[offset] = __rowsColumn__(remp[offset][1], rows,
+                        offset)
+                env[name] = __expressionOperand__(columns[offset])
+            column = __expressionColumn__(TYPE, *FUNC.evaluate(env, nrows))
+            columns[OFFSET] = column
+            if isColumnar:
+                rows = None
+            else:
+                for inst, v in zip(rows, column.tolist()):
+                    inst[OFFSET] = v
+            continue
+        if rows is None:
+            rows = ColumnarDataset([columns[offset]
+                for offset in range(0, len(newattrmap))], nrows).tolist()
+        results = []
+        for inst in rows:
+            result = FUNC(tuple(inst))
+            if TYPE == 'string':
+                result = str(result)
+            elif not(isinstance(result, int) or isinstance(result, float)):
+                result = float(result)  # Force the type test.
+            inst[OFFSET] = result
+            results.append(result)
+        if isColumnar:
+            columns[OFFSET] = __columnFromValues__(TYPE, results)
+        else:
+            columns.pop(OFFSET, None)
+    if isColumnar:
+        return (newattrmap, ColumnarDataset([columns[offset]
+            for offset in range(0, len(newattrmap))], nrows,
+                dataset.isUsingNan))
+    return (newattrmap, rows)
+
 def deriveARFF(attrmap, dataset, nameTypeFunctionTriplets):
     '''
     Return new ARFF data that is an edit of a copy of attrmap, dataset,
@@ -768,9 +3058,27 @@ def deriveARFF(attrmap, dataset, nameTypeFunctionTriplets):
     new derived attribute FUNCs can refer to other new attribute values
     in columns to their left. FUNCs apply left-to-right in a given instance
     before going on to the next instance.
+    A ColumnarDataset dataset returns a ColumnarDataset that shares every
+    column not NAMEd in nameTypeFunctionTriplets.
+
+    UPDATE October 2026: FUNC may instead be an expression string or a
+    ColumnExpression compiled from one, such as 'x1 / x2 if x2 > 0 else 0',
+    evaluated with numpy over whole columns; see ColumnExpression. When
+    any FUNC is one, triplets run in order a column at a time, and each
+    FUNC, including a callable one, sees the results of every triplet
+    to its left, mutated attributes included.
     '''
+    if any([isinstance(FUNC, (str, ColumnExpression))
+            for NAME, TYPE, FUNC in nameTypeFunctionTriplets]):
+        return __deriveColumns__(attrmap, dataset, nameTypeFunctionTriplets)
+    if isinstance(dataset, ColumnarDataset):
+        newattrmap, newdataset = deriveARFF(attrmap, dataset.tolist(),
+            nameTypeFunctionTriplets)
+        return (newattrmap, __changedColumns__(dataset, newattrmap,
+            newdataset, [newattrmap[NAME][0]
+                for NAME, TYPE, FUNC in nameTypeFunctionTriplets]))
     newattrmap = copy.deepcopy(attrmap)
-    newdataset = copy.deepcopy(dataset)
+    newdataset = __copyRows__(dataset)
     # NewNameTypePairs = []
     nameTypeFunctionOffsetQuads = []
     ocolumnsCount = len(newattrmap.keys())
@@ -810,7 +3118,7 @@ def deriveARFF(attrmap, dataset, nameTypeFunctionTriplets):
     return (newattrmap, newdataset)
 
 def discretizeARFF(attrmap, dataset, attrname, bins,
-        attrtype, useEqualFrequency):
+        attrtype, useEqualFrequency, quantileEdges=False):
     '''
     Return new ARFF data that is an edit of a copy of attrmap, dataset,
     where attrmap is the map from attrname -> (offset, type) returned by
@@ -823,8 +3131,27 @@ def discretizeARFF(attrmap, dataset, attrname, bins,
     True to try to make each bin the same size. The derived attribute is a
     string or nominal per attrtype.
     The returned (attrmap, dataset) is a mutated copy of the original.
+    A ColumnarDataset dataset returns a ColumnarDataset that shares every
+    column except attrname's, which holds the bin labels as codes.
+    quantileEdges True with useEqualFrequency True takes the bin edges
+    at ranks len * i / bins of the sorted values, merging bins whose
+    edges tie, instead of widening each bin to include its ties.
+    Unknown values stay unknown.
     '''
+    __checkDiscretizeTypes__(attrmap, attrname, attrtype)
     attrix = attrmap[attrname][0]
+    if isinstance(dataset, ColumnarDataset):
+        column = dataset.columns[attrix]
+        values = column.values[~column.mask]
+    else:
+        values = [v for v in map(operator.itemgetter(attrix), dataset)
+            if v is not None and v == v]
+    bounds = __discretizeBounds__(values, bins, useEqualFrequency,
+        quantileEdges)
+    return __discretizeRows__(attrmap, dataset, attrname, attrtype, bounds)
+
+def __checkDiscretizeTypes__(attrmap, attrname, attrtype):
+    # Raise ValueError unless discretizeARFF can convert attrname to attrtype.
     oattrtype = attrmap[attrname][1]
     if oattrtype != 'numeric':
         raise ValueError("INVALID PREVIOUS ATTRIBUTE TYPE: " + str(oattrtype)
@@ -832,33 +3159,60 @@ def discretizeARFF(attrmap, dataset, attrname, bins,
     if attrtype != 'string' and attrtype != 'nominal':
         raise ValueError("INVALID PROPOSED ATTRIBUTE TYPE: " + str(attrtype)
             + " for attribute " + attrname + " in discretizeARFF")
-    nattrmap = copy.deepcopy(attrmap)
-    values = sorted([dataset[ix][attrix] for ix in range(0, len(dataset))])
-    bounds = []
-    if useEqualFrequency:
-        binsize = round(len(values) / bins)
-        bstart = 0
-        bend = min(bstart + binsize, len(values)-1)
-        while bstart < len(values)-1:
-            while bend < (len(values)-1) and values[bend+1] == values[bend]:
-                bend += 1
-            bounds.append((values[bstart], values[bend]))
-            bstart = bend 
-            bend = min(bstart + binsize, len(values)-1)
-        # Sometimes this code gives ampty bins, delete them:
-        fixbounds = []
-        for bix in range(0, len(bounds)-1):
-            lower, upper = bounds[bix]
-            if not (lower == upper and bounds[bix+1][0] == upper):
-                fixbounds.append(bounds[bix])
-        finallower, finalupper = bounds[-1]
-        if not (finallower == finalupper and finallower == upper):
-            fixbounds.append(bounds[-1]) # append the top
-        bounds = fixbounds
-    else:
-        binlen = (values[-1] - values[0]) / bins
-        binfrom = values[0]
-        while binfrom <= values[-1]:
+
+def __sortedNumbers__(values):
+    # Return (skeys, svalue) for a list or numpy array of numbers, where
+    # skeys is a sorted numpy array of them and svalue(pos) returns the
+    # Python number at sorted position pos. A list of only ints or only
+    # floats sorts as one numpy array; a mix sorts by a stable argsort of
+    # float keys, which orders tied ints and floats as sorted() does.
+    if not isinstance(values, numpy.ndarray):
+        kinds = set(map(type, values))
+        try:
+            if kinds == set([int]):
+                values = numpy.array(values, dtype=numpy.int64)
+            elif kinds == set([float]):
+                values = numpy.array(values, dtype=numpy.float64)
+        except OverflowError:
+            pass
+    if isinstance(values, numpy.ndarray):
+        skeys = numpy.sort(values)
+        if skeys.dtype.kind != 'f':
+            return (skeys, lambda pos : skeys[pos].item())
+        # 0.0 and -0.0 tie but print differently, so a zero comes from
+        # the zeros in their original order, as a stable sort leaves them.
+        zerostart = int(numpy.searchsorted(skeys, 0.0, 'left'))
+        zeros = []
+        def svalue(pos):
+            number = skeys[pos].item()
+            if number == 0.0:
+                if not zeros:
+                    zeros.append(values[values == 0.0])
+                number = zeros[0][pos - zerostart].item()
+            return number
+        return (skeys, svalue)
+    keys = numpy.array(values, dtype=numpy.float64)
+    order = numpy.argsort(keys, kind='stable')
+    return (keys[order], lambda pos : values[order[pos]])
+
+def __discretizeBounds__(values, bins, useEqualFrequency,
+        quantileEdges=False):
+    # Return discretizeARFF's list of (lower, upper) bin bounds for the
+    # known values in any order, a list or a numpy array. Bounds hold
+    # values' own Python numbers, so int bounds print as ints.
+    if len(values) == 0:
+        raise ValueError("discretizeARFF requires known values to bin")
+    count = len(values)
+    skeys, svalue = __sortedNumbers__(values)
+    if not useEqualFrequency:
+        low = svalue(0)
+        high = svalue(count-1)
+        binlen = (high - low) / bins
+        if not binlen > 0:
+            return [(low, high)]    # one value, one bin
+        bounds = []
+        binfrom = low
+        while binfrom <= high:
             binto = binfrom + binlen
             bounds.append((binfrom, binto))
             binfrom += binlen
@@ -866,31 +3220,171 @@ def discretizeARFF(attrmap, dataset, attrname, bins,
             bounds[bins-1] = (bounds[bins-1][0], bounds[-1][1])
             # Just use topmost bound
             bounds = bounds[0:bins]
+        return bounds
+    elif quantileEdges:
+        ranks = numpy.unique(numpy.minimum(numpy.round(numpy.arange(0,
+            bins + 1) * (count / bins)).astype(numpy.int64), count - 1))
+        ekeys = skeys[ranks]
+        ranks = ranks[numpy.concatenate(([True], ekeys[1:] != ekeys[:-1]))]
+        edges = [svalue(pos) for pos in ranks.tolist()]
+        if len(edges) == 1:
+            return [(edges[0], edges[0])]
+        return [(edges[ix], edges[ix+1]) for ix in range(0, len(edges)-1)]
+    # Each bin's end widens past its ties with one binary search.
+    binsize = max(1, round(count / bins))
+    bounds = []
+    bstart = 0
+    bend = min(bstart + binsize, count-1)
+    while bstart < count-1:
+        bend = int(numpy.searchsorted(skeys, skeys[bend], 'right')) - 1
+        bounds.append((svalue(bstart), svalue(bend)))
+        bstart = bend 
+        bend = min(bstart + binsize, count-1)
+    if not bounds:
+        return [(svalue(0), svalue(0))]
+    # Sometimes this code gives ampty bins, delete them:
+    fixbounds = []
+    upper = None
+    for bix in range(0, len(bounds)-1):
+        lower, upper = bounds[bix]
+        if not (lower == upper and bounds[bix+1][0] == upper):
+            fixbounds.append(bounds[bix])
+    finallower, finalupper = bounds[-1]
+    if not (finallower == finalupper and finallower == upper):
+        fixbounds.append(bounds[-1]) # append the top
+    return fixbounds
+
+def __discretizeRows__(attrmap, dataset, attrname, attrtype, bounds):
+    # Apply discretizeARFF's bin bounds to a copy of (attrmap, dataset).
+    # Bins are contiguous, so a value's bin is the first whose upper bound
+    # exceeds it, found for all rows at once by numpy.searchsorted. A
+    # value below the lowest bound goes in the lowest bin, one at or above
+    # the highest in the highest, as happens when bounds were fitted to
+    # other data. Rows share one label string per bin. A ColumnarDataset
+    # dataset returns a ColumnarDataset with a new column of bin codes.
+    attrix = attrmap[attrname][0]
+    nattrmap = copy.deepcopy(attrmap)
     sbounds = [str(bpair) for bpair in bounds]
-    ndataset = copy.deepcopy(dataset)
-    for inst in ndataset:
-        v = inst[attrix]
-        if v != None:
-            vo = None
-            for i in range(0, len(bounds)):
-                if v >= bounds[i][0] and v < bounds[i][1]:
-                    vo = sbounds[i]
-                    break
-            if vo == None:
-                vo = sbounds[-1]
-            inst[attrix] = vo
     if attrtype == 'string':
         nattrmap[attrname] = (attrix, 'string')
     else:
         # nominal
-        atype = "{'" + sbounds[0] + "'"
-        for nix in range(1, len(sbounds)):
-            atype = atype + ",'" + sbounds[nix] + "'"
-        atype = atype + '}'
+        atype = "{" + ','.join(["'" + sb + "'" for sb in sbounds]) + '}'
         nattrmap[attrname] = (attrix, ('nominal', atype, sbounds))
+    if isinstance(dataset, ColumnarDataset):
+        column = dataset.columns[attrix]
+        keys = column.values.astype(numpy.float64)
+        unknown = column.mask
+    else:
+        ndataset = __copyRows__(dataset)
+        keys = numpy.array(list(map(operator.itemgetter(attrix), ndataset)),
+            dtype=numpy.float64)
+        unknown = numpy.isnan(keys)
+    uppers = numpy.array([bpair[1] for bpair in bounds], dtype=numpy.float64)
+    codes = numpy.minimum(numpy.searchsorted(uppers, keys, 'right'),
+        len(bounds) - 1).astype(numpy.int32)
+    codes[keys < float(bounds[0][0])] = 0
+    codes[unknown] = -1
+    if isinstance(dataset, ColumnarDataset):
+        if attrtype == 'string':
+            newcolumn = __encodedColumn__('string', codes, list(sbounds))
+        else:
+            newcolumn = ARFFColumn('nominal', codes, codes < 0,
+                tuple(sbounds))
+        return (nattrmap, dataset.withColumns({attrix: newcolumn}))
+    lookup = numpy.array(sbounds + [None], dtype=object)
+    for inst, label in zip(ndataset, lookup[codes].tolist()):
+        inst[attrix] = label
     return (nattrmap, ndataset)
 
-def sortARFF(attrmap, dataset, attributeKeys, sreverse=False):
+def __unknownsLast__(sreverse, unknowns):
+    # True when unknown (None) values go after known values in the output.
+    # unknowns None sorts them as if greater than every known value.
+    if unknowns is None:
+        return not sreverse
+    elif unknowns in ('first', 'last'):
+        return unknowns == 'last'
+    raise ValueError("INVALID unknowns ARGUMENT: " + str(unknowns)
+        + " in sortARFF, must be None, 'first' or 'last'")
+
+def __sortOrder__(columns, sreverse, unknowns):
+    # Return the stable sort permutation over the key ARFFColumns in
+    # columns, most significant first. numpy.lexsort takes its most
+    # significant key last; each column's unknown mask is more significant
+    # than its values. Negating the values instead of reversing the
+    # permutation keeps ties in their original order, as does sort().
+    isLast = __unknownsLast__(sreverse, unknowns)
+    sortkeys = []
+    for column in reversed(columns):
+        key = column.sortKey()
+        sortkeys.append(-key if sreverse else key)
+        sortkeys.append(column.mask if isLast else ~column.mask)
+    return numpy.lexsort(sortkeys)
+
+def __columnarSortOrder__(dataset, akeys, sreverse, unknowns=None):
+    # Return the stable sort permutation of a ColumnarDataset on the
+    # attribute offsets in akeys, most significant first.
+    if not akeys:
+        return numpy.arange(len(dataset))
+    return __sortOrder__([dataset.columns[offset] for offset in akeys],
+        sreverse, unknowns)
+
+def __rowSortKey__(akeys, kinds, sreverse, unknowns):
+    # Return a key function for sort() or heapq.merge() on 2D list rows
+    # that orders them as __sortOrder__ does: each attribute-value
+    # becomes a (rank, value) pair whose rank places unknowns, and a
+    # date compares by its datetime instead of its string.
+    isLast = __unknownsLast__(sreverse, unknowns)
+    unknownRank = 1 if isLast != sreverse else -1
+    pairs = list(zip(akeys, [kind == 'date' for kind in kinds]))
+    def keyextract(inst):
+        keys = []
+        for offset, isDate in pairs:
+            v = inst[offset]
+            if v is None or v != v:     # v != v for numpy.nan
+                keys.append((unknownRank, 0))
+            else:
+                keys.append((0, v[1] if isDate else v))
+        return keys
+    return keyextract
+
+def __sortKeyColumns__(attrmap, dataset, akeys):
+    # Return one ARFFColumn per attribute offset in akeys holding that
+    # attribute's values from 2D list dataset, typed per attrmap, or None
+    # when some value does not fit its declared type.
+    offsetTOnameType = remapAttributes(attrmap)
+    columns = []
+    for offset in akeys:
+        if isinstance(dataset, ProjectedDataset):
+            values = dataset.column(offset)
+        else:
+            values = list(map(operator.itemgetter(offset), dataset))
+        try:
+            columns.append(__columnFromValues__(
+                offsetTOnameType[offset][1], values))
+        except (TypeError, ValueError, IndexError, AttributeError,
+                OverflowError):
+            return None
+    return columns
+
+def __attributeOffsets__(attrmap, attributeKeys, where):
+    # Map attributeKeys of attribute names or offsets to attribute offsets,
+    # naming function where in the ValueError for an invalid key.
+    akeys = list(attributeKeys)
+    for kix in range(0, len(attributeKeys)):
+        k = attributeKeys[kix]
+        if isinstance(k, str):
+            if not k in attrmap.keys():
+                raise ValueError("INVALID ATTRIBUTE Name: " + k
+                    + " in " + where)
+            akeys[kix] = attrmap[k][0]
+        elif (not isinstance(k, int)) or k < 0 or k >= len(attrmap.keys()):
+            raise ValueError("INVALID INTEGER ATTRIBUTE Index: " + str(k)
+                + " in " + where)
+        # else it is already a valid int
+    return akeys
+
+def sortARFF(attrmap, dataset, attributeKeys, sreverse=False, unknowns=None):
     '''
     Sort a copy of the dataset list of instances without mutating
     the original, returning only the sorted result list,
@@ -902,29 +3396,460 @@ def sortARFF(attrmap, dataset, attributeKeys, sreverse=False):
     significant last, and sreverse as in Python's sort()'s reverse argument.
     attributeKeys can contain either numeric indicies or string names
     of attribute indicies. Returns a sorted copy of dataset
+    A ColumnarDataset dataset is sorted stably with numpy.lexsort and
+    returned as a ColumnarDataset, with unknown (None) values sorting
+    after known values (before them when sreverse is True).
+    A 2D list dataset is sorted the same way: each key attribute's values
+    are converted once into a typed numpy key (numbers, string and nominal
+    ranks, datetimes, so dates sort chronologically), and the stable
+    numpy.lexsort permutation selects copies of the rows. Unknown (None
+    or numpy.nan) values may be mixed with known ones. Parameter unknowns
+    'first' or 'last' puts unknown values before or after all known
+    values regardless of sreverse. See sortARFFfile for files too large
+    to sort in memory.
     '''
-    akeys = list(attributeKeys)
-    for kix in range(0, len(attributeKeys)):
-        k = attributeKeys[kix]
-        if isinstance(k, str):
-            if not k in attrmap.keys():
-                raise ValueError("INVALID ATTRIBUTE Name: " + k
-                    + " in sortARFF")
-            akeys[kix] = attrmap[k][0]
-        elif (not isinstance(k, int)) or k < 0 or k >= len(attrmap.keys()):
-            raise ValueError("INVALID INTEGER ATTRIBUTE Index: " + str(k)
-                + " in sortARFF")
-        # else it is already a valid int
-    ndata = copy.deepcopy(dataset)
-    def keyextract(inst):
-        keys = []
-        for i in akeys:
-            keys.append(inst[i])
-        return keys
-    ndata.sort(key=keyextract, reverse=sreverse)
+    akeys = __attributeOffsets__(attrmap, attributeKeys, 'sortARFF')
+    __unknownsLast__(sreverse, unknowns)    # reject a bad unknowns early
+    if isinstance(dataset, ColumnarDataset):
+        return dataset.take(__columnarSortOrder__(dataset, akeys, sreverse,
+            unknowns))
+    if not akeys:
+        return __copyRows__(dataset)
+    columns = __sortKeyColumns__(attrmap, dataset, akeys)
+    if columns is None:
+        # Values not of their attribute's type; sort them as Python does.
+        offsetTOnameType = remapAttributes(attrmap)
+        ndata = __copyRows__(dataset)
+        ndata.sort(key=__rowSortKey__(akeys, [__columnKind__(
+            offsetTOnameType[offset][1]) for offset in akeys], sreverse,
+                unknowns), reverse=sreverse)
+        return ndata
+    order = __sortOrder__(columns, sreverse, unknowns)
+    isCollecting = gc.isenabled()
+    gc.disable()    # avoid rescanning the new rows; see readCSV
+    try:
+        return list(map(operator.itemgetter(slice(None)),
+            map(dataset.__getitem__, order.tolist())))
+    finally:
+        if isCollecting:
+            gc.enable()
+
+def sortARFFfile(infname, outfname, relationstring, attributeKeys,
+        sreverse=False, unknowns=None, batchSize=100000, tmpdir=None,
+        clobber=False):
+    '''
+    External merge sort of ARFF file infname, which may be too large
+    to hold in memory, into ARFF file outfname with @relation
+    relationstring, where attributeKeys, sreverse and unknowns are as
+    for sortARFF. sortARFFfile sorts batches of at most batchSize
+    instances read by iterARFF with sortARFF, writes each sorted batch
+    to a temporary run file in directory tmpdir (default is the system's
+    temporary directory), then merges the runs with heapq.merge into
+    outfname with writeARFFbatches, so at most batchSize instances plus
+    one per run are in memory. The result is stable, as from sortARFF.
+    Either file name may end with '.gz'. clobber is as for writeARFF.
+    Returns the number of instances written.
+    '''
+    if batchSize < 1:
+        raise ValueError("sortARFFfile requires batchSize >= 1: "
+            + str(batchSize))
+    if (not clobber) and os.path.exists(outfname):
+        raise ValueError("ERROR, sortARFFfile output file "
+            + outfname + " exists, use clobber=True to overwrite.")
+    attrmap, batches = iterARFF(infname, batchSize)
+    akeys = __attributeOffsets__(attrmap, attributeKeys, 'sortARFFfile')
+    offsetTOnameType = remapAttributes(attrmap)
+    rowkey = __rowSortKey__(akeys, [__columnKind__(
+        offsetTOnameType[offset][1]) for offset in akeys], sreverse, unknowns)
+    rundir = tempfile.mkdtemp(prefix='sortARFF', dir=tmpdir)
+    try:
+        runs = []
+        try:
+            for batch in batches:
+                runname = os.path.join(rundir, str(len(runs)) + '.arff')
+                writeARFF(runname, 'run', attrmap,
+                    sortARFF(attrmap, batch, akeys, sreverse, unknowns),
+                        clobber=True)
+                runs.append(runname)
+        finally:
+            batches.close()
+        runbatches = [iterARFF(runname, max(1, batchSize // (len(runs) + 1)))
+            for runname in runs]
+        try:
+            merged = heapq.merge(*[itertools.chain.from_iterable(rb[1])
+                for rb in runbatches], key=rowkey, reverse=sreverse)
+            def __mergedBatches__():
+                while True:
+                    batch = list(itertools.islice(merged, batchSize))
+                    if not batch:
+                        break
+                    yield batch
+            return writeARFFbatches(outfname, relationstring, attrmap,
+                __mergedBatches__(), clobber=True)
+        finally:
+            for rb in runbatches:
+                rb[1].close()
+    finally:
+        shutil.rmtree(rundir, ignore_errors=True)
+
+def keyJoinARFFfiles(leftfname, rightfname, outfname, relationstring,
+        leftKeys, rightKeys=None, how='inner', suffix='_right',
+        presorted=False, batchSize=100000, tmpdir=None, clobber=False):
+    '''
+    Sort-merge join of ARFF files leftfname and rightfname, which may be
+    too large to hold in memory, into ARFF file outfname with @relation
+    relationstring, where leftKeys, rightKeys, how and suffix are as for
+    keyJoinARFF with method 'merge'. Unless presorted is True, when each
+    file must already be in sortARFF's order on its keys, each input is
+    first sorted into directory tmpdir (default is the system's temporary
+    directory) with sortARFFfile. The sorted files are then read with
+    iterARFF in batches of batchSize instances and merged, holding one
+    key's worth of right instances at a time, and the result is written
+    in key order with writeARFFbatches. Any file name may end with '.gz'.
+    clobber is as for writeARFF. Returns the number of instances written.
+    '''
+    where = 'keyJoinARFFfiles'
+    if batchSize < 1:
+        raise ValueError(where + " requires batchSize >= 1: "
+            + str(batchSize))
+    if (not clobber) and os.path.exists(outfname):
+        raise ValueError("ERROR, " + where + " output file "
+            + outfname + " exists, use clobber=True to overwrite.")
+    leftattrmap, lbatches = iterARFF(leftfname, batchSize)
+    lbatches.close()
+    rightattrmap, rbatches = iterARFF(rightfname, batchSize)
+    rbatches.close()
+    lkeys, rkeys = __joinKeyOffsets__(leftattrmap, rightattrmap, leftKeys,
+        rightKeys, how, where)
+    newattrmap, rkeep = __joinedAttributes__(leftattrmap, rightattrmap,
+        lkeys, rkeys, how, suffix)
+    lremp = remapAttributes(leftattrmap)
+    kinds = [__columnKind__(lremp[offset][1]) for offset in lkeys]
+    rundir = tempfile.mkdtemp(prefix='keyJoinARFF', dir=tmpdir)
+    try:
+        if not presorted:
+            lsorted = os.path.join(rundir, 'left.arff')
+            sortARFFfile(leftfname, lsorted, 'left', lkeys,
+                batchSize=batchSize, tmpdir=rundir)
+            rsorted = os.path.join(rundir, 'right.arff')
+            sortARFFfile(rightfname, rsorted, 'right', rkeys,
+                batchSize=batchSize, tmpdir=rundir)
+            leftfname, rightfname = lsorted, rsorted
+        lbatches = iterARFF(leftfname, batchSize)[1]
+        rbatches = iterARFF(rightfname, batchSize)[1]
+        try:
+            joined = __mergeJoinRows__(itertools.chain.from_iterable(
+                lbatches), itertools.chain.from_iterable(rbatches), lkeys,
+                    rkeys, kinds, how, rkeep, len(leftattrmap), where)
+            def __joinedBatches__():
+                while True:
+                    batch = list(itertools.islice(joined, batchSize))
+                    if not batch:
+                        break
+                    yield batch
+            return writeARFFbatches(outfname, relationstring, newattrmap,
+                __joinedBatches__(), clobber=clobber)
+        finally:
+            lbatches.close()
+            rbatches.close()
+    finally:
+        shutil.rmtree(rundir, ignore_errors=True)
+
+__IMPUTE_REPLACEMENTS__ = ('mean', 'median', 'mode', 'min', 'max', 'random',
+    'ffill', 'bfill')
+
+def __rowsColumn__(atype, dataset, offset):
+    # Return an ARFFColumn of attribute offset's values in 2D list dataset,
+    # typed per atype, or holding sortable Python values as a 'string'
+    # column when they do not fit atype, such as ints beyond float64.
+    if isinstance(dataset, ProjectedDataset):
+        values = dataset.column(offset)
+    else:
+        values = list(map(operator.itemgetter(offset), dataset))
+    try:
+        return __columnFromValues__(atype, values)
+    except (TypeError, ValueError, IndexError, AttributeError,
+            OverflowError):
+        return __columnFromValues__('string', values)
+
+def __groupCodes__(columns, nrows):
+    # Return (codes, ngroups), numbering each of nrows rows by its distinct
+    # combination of values in the ARFFColumns columns, in ascending order
+    # of the combinations, with unknown as a value of its own. No columns
+    # puts every row in group 0.
+    if not columns:
+        return (numpy.zeros(nrows, dtype=numpy.int64), 1 if nrows else 0)
+    keys = []
+    for column in reversed(columns):
+        keys.append(numpy.where(column.mask, 0, column.sortKey()))
+        keys.append(column.mask)
+    order = numpy.lexsort(keys)
+    change = numpy.zeros(nrows, dtype=bool)
+    for key in keys:
+        skey = key[order]
+        change[1:] |= skey[1:] != skey[:-1]
+    codes = numpy.empty(nrows, dtype=numpy.int64)
+    codes[order] = numpy.cumsum(change)
+    return (codes, int(change.sum()) + 1 if nrows else 0)
+
+def __imputeMeans__(column, codes, ngroups):
+    # Return (means, hasKnown): the float mean of each group's known values
+    # in numeric column, and whether the group has any. A 'string' column
+    # of Python numbers from __rowsColumn__ takes statistics.mean of them.
+    known = ~column.mask
+    counts = numpy.bincount(codes[known], minlength=ngroups)
+    if column.kind != 'numeric':
+        groups = [[] for g in range(0, ngroups)]
+        for g, code in zip(codes[known].tolist(),
+                column.values[known].tolist()):
+            groups[g].append(column.categories[code])
+        means = numpy.zeros(ngroups, dtype=object)
+        for g in numpy.flatnonzero(counts).tolist():
+            means[g] = stats.mean(groups[g])
+        return (means, counts > 0)
+    sums = numpy.bincount(codes[known], weights=column.values[known],
+        minlength=ngroups)
+    return (sums / numpy.maximum(counts, 1), counts > 0)
+
+def __imputeSourceRows__(column, codes, ngroups, replacement, isNumeric):
+    # For replacement 'median', 'mode', 'min', 'max' or 'random', return
+    # (lorows, hirows), the offsets of the rows holding the known values
+    # each group's substitute comes from, -1 for a group with none, found
+    # with one lexsort of the known values on (group, value). 'median'
+    # takes the two central values of a numeric attribute (the same one for
+    # an odd count), else the one at len // 2 as stringNumMedian does;
+    # 'mode' takes the center of the ascending most frequent values as
+    # multimode does; 'random' takes the smallest and the largest.
+    known = numpy.flatnonzero(~column.mask)
+    keys = column.sortKey()[known]
+    groups = codes[known]
+    perm = numpy.lexsort((keys, groups))
+    srows = known[perm]
+    skeys = keys[perm]
+    sgroups = groups[perm]
+    counts = numpy.bincount(sgroups, minlength=ngroups)
+    starts = numpy.cumsum(counts) - counts
+    has = counts > 0
+    lorows = numpy.full(ngroups, -1, dtype=numpy.int64)
+    hirows = numpy.full(ngroups, -1, dtype=numpy.int64)
+    if replacement in ('min', 'random'):
+        lorows[has] = srows[starts[has]]
+        hirows[has] = lorows[has]
+    if replacement in ('max', 'random'):
+        hirows[has] = srows[starts[has] + counts[has] - 1]
+        if replacement == 'max':
+            lorows[has] = hirows[has]
+    elif replacement == 'median':
+        hirows[has] = srows[starts[has] + counts[has] // 2]
+        if isNumeric:
+            lorows[has] = srows[starts[has] + (counts[has] - 1) // 2]
+        else:
+            lorows[has] = hirows[has]
+    elif replacement == 'mode':
+        runstart = numpy.ones(len(srows), dtype=bool)
+        runstart[1:] = (skeys[1:] != skeys[:-1]) | (sgroups[1:]
+            != sgroups[:-1])
+        runstart = numpy.flatnonzero(runstart)
+        runcount = numpy.diff(numpy.append(runstart, len(srows)))
+        rungroup = sgroups[runstart]
+        maxcount = numpy.zeros(ngroups, dtype=numpy.int64)
+        numpy.maximum.at(maxcount, rungroup, runcount)
+        tie = runcount == maxcount[rungroup]
+        tierows = srows[runstart[tie]]
+        ties = numpy.bincount(rungroup[tie], minlength=ngroups)
+        tiestarts = numpy.cumsum(ties) - ties
+        hirows[has] = tierows[tiestarts[has] + ties[has] // 2]
+        lorows[has] = hirows[has]
+    return (lorows, hirows)
+
+def __fillSourceRows__(column, codes, replacement):
+    # For replacement 'ffill' or 'bfill', return (fillrows, srcrows): the
+    # rows of column holding unknowns preceded ('ffill') or followed
+    # ('bfill') within their group by a known value, and that nearest
+    # known value's row, using a running maximum of row positions.
+    nrows = len(column)
+    order = numpy.argsort(codes, kind='stable')
+    if replacement == 'bfill':
+        order = order[::-1]
+    known = ~column.mask[order]
+    start = numpy.ones(nrows, dtype=bool)
+    start[1:] = codes[order][1:] != codes[order][:-1]
+    nearest = numpy.maximum.accumulate(numpy.where(known | start,
+        numpy.arange(nrows), 0)) if nrows else numpy.zeros(0, dtype=numpy.int64)
+    fill = (~known) & known[nearest]
+    return (order[fill], order[nearest[fill]])
+
+def __imputePlans__(attrmap, dataset, akeys, gkeys, replacement):
+    # Return (codes, plans) for imputeARFF, where codes numbers each row's
+    # group of gkeys values, and plans holds (offset, column, rows, sources)
+    # per attribute in akeys having unknowns: rows are the unknown rows to
+    # fill, sources is (fillrows, srcrows) for 'ffill' and 'bfill', else
+    # (means, hasKnown) for 'mean' or (lorows, hirows) per group.
+    remp = remapAttributes(attrmap)
+    if isinstance(dataset, ColumnarDataset):
+        getcolumn = lambda offset : dataset.columns[offset]
+    else:
+        getcolumn = lambda offset : __rowsColumn__(remp[offset][1], dataset,
+            offset)
+    codes, ngroups = __groupCodes__([getcolumn(offset) for offset in gkeys],
+        len(dataset))
+    plans = []
+    for offset in akeys:
+        column = getcolumn(offset)
+        if not column.mask.any():
+            continue
+        if replacement in ('ffill', 'bfill'):
+            fillrows, srcrows = __fillSourceRows__(column, codes, replacement)
+            plans.append((offset, column, fillrows, (fillrows, srcrows)))
+            continue
+        if column.mask.all():
+            raise ValueError("INVALID ALL-UNKOWN ATTRIBUTE: "
+                + remp[offset][0] + " in imputeARFF")
+        isNumeric = __columnKind__(remp[offset][1]) == 'numeric'
+        if replacement == 'mean':
+            if not isNumeric:
+                raise ValueError("INVALID replacement ARGUMENT: " + replacement
+                    + " for non-numeric attribute " + remp[offset][0]
+                    + " in imputeARFF")
+            sources = __imputeMeans__(column, codes, ngroups)
+            hasKnown = sources[1]
+        else:
+            if replacement == 'random' and not isNumeric:
+                raise ValueError("INVALID replacement ARGUMENT: " + replacement
+                    + " for non-numeric attribute " + remp[offset][0]
+                    + " in imputeARFF")
+            sources = __imputeSourceRows__(column, codes, ngroups,
+                replacement, isNumeric)
+            hasKnown = sources[1] >= 0
+        rows = numpy.flatnonzero(column.mask & hasKnown[codes])
+        plans.append((offset, column, rows, sources))
+    return (codes, plans)
+
+def __randomDraws__(plans, seed):
+    # Return one list of uniform draws per plan of 'random' imputation,
+    # drawn in the row-major order of the cells they fill as the original
+    # per-instance loop did, each between its group's bounds (lo, hi)
+    # as Python numbers.
+    randomgen = random.Random()
+    randomgen.seed(seed)
+    cells = []
+    for pix in range(0, len(plans)):
+        rows, bounds = plans[pix]
+        cells.append(numpy.column_stack((rows, numpy.full(len(rows), pix))))
+    if not cells:
+        return []
+    cells = numpy.concatenate(cells)
+    cells = cells[numpy.lexsort((cells[:, 1], cells[:, 0]))]
+    draws = [[] for plan in plans]
+    position = [0 for plan in plans]
+    for row, pix in cells.tolist():
+        low, high = plans[pix][1][position[pix]]
+        position[pix] += 1
+        draws[pix].append(randomgen.uniform(low, high))
+    return draws
+
+def __imputeRows__(dataset, codes, plans, replacement, seed):
+    # Fill the unknowns of a row copy of 2D list dataset per the plans of
+    # __imputePlans__, assigning attribute-values of dataset's own rows
+    # (or their means), so substitutes keep their original Python types.
+    ndata = __copyRows__(dataset)
+    randomplans = []
+    for offset, column, rows, sources in plans:
+        rowlist = rows.tolist()
+        if replacement in ('ffill', 'bfill'):
+            values = [ndata[src][offset] for src in sources[1].tolist()]
+        elif replacement == 'mean':
+            isint = column.kind == 'numeric' \
+                and column.values.dtype.kind == 'i'
+            subs = [int(m) if (isint and m.is_integer()) else m
+                for m in sources[0].tolist()]
+            values = [subs[g] for g in codes[rows].tolist()]
+        else:
+            lorows, hirows = sources
+            subs = [None if hi < 0 else (ndata[lo][offset], ndata[hi][offset])
+                for lo, hi in zip(lorows.tolist(), hirows.tolist())]
+            if replacement == 'random':
+                randomplans.append((offset, rows, [subs[g]
+                    for g in codes[rows].tolist()]))
+                continue
+            elif replacement == 'median':
+                subs = [sub if (sub is None or sub[0] == sub[1])
+                    else (sub[0], (sub[0] + sub[1]) / 2.0) for sub in subs]
+            values = [subs[g][1] for g in codes[rows].tolist()]
+        for row, value in zip(rowlist, values):
+            ndata[row][offset] = value
+    if randomplans:
+        draws = __randomDraws__([(rows, bounds)
+            for offset, rows, bounds in randomplans], seed)
+        for pix in range(0, len(randomplans)):
+            offset, rows, bounds = randomplans[pix]
+            for row, value in zip(rows.tolist(), draws[pix]):
+                ndata[row][offset] = value
     return ndata
 
-def imputeARFF(attrmap, dataset, attributeKeys, replacement, seed=None):
+def __imputeColumnar__(dataset, codes, plans, replacement, seed):
+    # Impute a ColumnarDataset per the plans of __imputePlans__, returning
+    # a ColumnarDataset that shares every column without unknowns filled.
+    # A numeric substitute is an int where __imputeRows__ would assign one.
+    newcolumns = {}
+    randomplans = []
+    for offset, column, rows, sources in plans:
+        vals = column.values
+        isNumeric = column.kind == 'numeric'
+        knownInts = __knownInts__(column) if isNumeric else None
+        if replacement in ('ffill', 'bfill'):
+            subs = vals[sources[1]]
+            if isNumeric:
+                subints = knownInts[sources[1]]
+        elif replacement == 'mean':
+            subs = sources[0][codes[rows]]
+            subints = (subs == numpy.floor(subs)) if vals.dtype.kind == 'i' \
+                else numpy.zeros(len(subs), dtype=bool)
+        else:
+            lorows, hirows = sources
+            if replacement == 'random':
+                randomplans.append((offset, rows, [(vals[lo].item(),
+                    vals[hi].item()) for lo, hi in zip(lorows[codes[rows]],
+                        hirows[codes[rows]])]))
+                continue
+            subs = vals[hirows[codes[rows]]]
+            if isNumeric:
+                subints = knownInts[hirows[codes[rows]]]
+            if replacement == 'median' and isNumeric:
+                lows = vals[lorows[codes[rows]]]
+                subints = subints & (lows == subs)
+                subs = numpy.where(lows == subs, subs, (lows + subs) / 2.0)
+        if isNumeric and vals.dtype.kind == 'i' and not subints.all():
+            vals = vals.astype(numpy.float64)
+        else:
+            vals = vals.copy()
+        vals[rows] = subs
+        mask = column.mask.copy()
+        mask[rows] = False
+        intmask = None
+        if isNumeric:
+            intmask = knownInts
+            intmask[rows] = subints
+        newcolumns[offset] = ARFFColumn(column.kind, vals, mask,
+            column.categories, column.dateformat, intmask)
+    if randomplans:
+        draws = __randomDraws__([(rows, bounds)
+            for offset, rows, bounds in randomplans], seed)
+        for pix in range(0, len(randomplans)):
+            offset, rows, bounds = randomplans[pix]
+            column = dataset.columns[offset]
+            vals = column.values.astype(numpy.float64)
+            vals[rows] = numpy.array(draws[pix], dtype=numpy.float64)
+            mask = column.mask.copy()
+            mask[rows] = False
+            intmask = __knownInts__(column)
+            intmask[rows] = False
+            newcolumns[offset] = ARFFColumn('numeric', vals, mask,
+                intmask=intmask)
+    return dataset.withColumns(newcolumns)
+
+def imputeARFF(attrmap, dataset, attributeKeys, replacement, seed=None,
+        groupBy=None):
     '''
     Replace unknown (None) attribute-values in a copy of the dataset list
     of instances without mutating the original, returning only the imputed
@@ -961,76 +3886,52 @@ def imputeARFF(attrmap, dataset, attributeKeys, replacement, seed=None):
     imputeARFF's return value is a mutated copy of the incoming dataset;
     incoming dataset is not mutated.
     The return value of imputeARFF is the potentially mutated copy of dataset.
+    A ColumnarDataset dataset is imputed column-wise with numpy and
+    returned as a ColumnarDataset; a replacement function is still
+    applied to a 2D list copy of it.
+    Named replacements compute every attribute's substitutes with numpy
+    over the known values in one sort per attribute, for 2D lists as for
+    ColumnarDatasets, and numpy.nan counts as unknown. Replacement 'ffill'
+    copies the nearest preceding known value in dataset's row order into
+    each unknown, 'bfill' the nearest following one, leaving unknowns
+    with no such value unknown; sortARFF a time series first.
+    Parameter groupBy, a sequence of attribute names or offsets, imputes
+    each group of instances sharing the same groupBy values (unknown being
+    a value of its own) from that group's known values alone, for example
+    a per-class mode or, after deriveARFF of a month attribute, a
+    per-month mean; a group with no known value for an attribute keeps
+    its unknowns, and 'ffill' and 'bfill' do not cross group boundaries.
     '''
     # See also https://scikit-learn.org/stable/modules/classes.html#module-sklearn.impute
     if attributeKeys == None:
         akeys = list(range(0, len(attrmap.keys())))
     else:
-        akeys = list(attributeKeys)
-        for kix in range(0, len(attributeKeys)):
-            k = attributeKeys[kix]
-            if isinstance(k, str):
-                if not k in attrmap.keys():
-                    raise ValueError("INVALID ATTRIBUTE Name: " + k
-                        + " in imputeARFF")
-                akeys[kix] = attrmap[k][0]
-            elif (not isinstance(k, int)) or k < 0 or k >= len(attrmap.keys()):
-                raise ValueError("INVALID INTEGER ATTRIBUTE Index: " + str(k)
-                    + " in imputeARFF")
-            # else it is already a valid int
-    ndata = copy.deepcopy(dataset)
-    if isinstance(replacement, types.FunctionType) or           \
-            isinstance(replacement, types.LambdaType):
+        akeys = __attributeOffsets__(attrmap, attributeKeys, 'imputeARFF')
+    isFunction = isinstance(replacement, types.FunctionType) or           \
+        isinstance(replacement, types.LambdaType)
+    if isFunction and groupBy:
+        raise ValueError("imputeARFF groupBy requires a named replacement")
+    elif isFunction and isinstance(dataset, ColumnarDataset):
+        # The caller's function mutates 2D list instances in place.
+        ndata = imputeARFF(attrmap, dataset.tolist(), akeys, replacement)
+        return toColumnarARFF(attrmap, ndata, dataset.isUsingNan)
+    elif isFunction:
+        ndata = __copyRows__(dataset)
         for instix in range(0, len(ndata)):
             for attrix in range(0, len(akeys)):
                if ndata[instix][akeys[attrix]] == None:
                    replacement(instix, akeys[attrix], ndata)
-    elif not replacement in {'mean', 'median', 'mode', 'min', 'max', 'random'}:
+        return ndata
+    elif not replacement in __IMPUTE_REPLACEMENTS__:
         raise ValueError("INVALID replacement ARGUMENT: " + str(replacement)
             + " in imputeARFF")
-    else:
-        columns = [[] for i in range(0, len(akeys))]
-        for inst in ndata:
-            for attrix in range(0, len(akeys)):
-                if inst[akeys[attrix]] != None:
-                    columns[attrix].append(inst[akeys[attrix]])
-        for cix in range(0, len(columns)):
-            if len(columns[cix]) == 0:
-                remp = remapAttributes(attrmap)
-                dud = remp[columns[cix]][0]
-                raise ValueError("INVALID ALL-UNKOWN ATTRIBUTE: "
-                    + dud + " in imputeARFF")
-        subvals = [None for i in range(0, len(columns))]
-        randomgen = None
-        if replacement == 'random':
-            randomgen = random.Random()
-            randomgen.seed(seed)
-        for attrix in range(0, len(columns)):
-            if replacement == 'mean':
-                subvals[attrix] = mean(columns[attrix])
-            elif replacement == 'median':
-                subvals[attrix] = stringNumMedian(columns[attrix])
-            elif replacement == 'mode':
-                modeset = multimode(columns[attrix])
-                subvals[attrix] = modeset[int(len(modeset)/2)]
-            elif replacement == 'min':
-                subvals[attrix] = min(columns[attrix])
-            elif replacement == 'max':
-                subvals[attrix] = max(columns[attrix])
-            elif replacement == 'random':
-                # Two-tuple for random range.
-                subvals[attrix] = (min(columns[attrix]), max(columns[attrix]))
-        for inst in ndata:
-            for rix in range(0, len(akeys)):
-                attrix = akeys[rix]
-                if inst[attrix] == None:
-                    sub = subvals[rix]
-                    if isinstance(sub, tuple):
-                        # print("DEBUG randrange", akeys[rix], sub[0], sub[1])
-                        # sys.stdout.flush()
-                        sub = randomgen.uniform(sub[0], sub[1])
-                    inst[attrix] = sub
-    return ndata
+    gkeys = __attributeOffsets__(attrmap, groupBy, 'imputeARFF')           \
+        if groupBy else []
+    codes, plans = __imputePlans__(attrmap, dataset, akeys, gkeys,
+        replacement)
+    if isinstance(dataset, ColumnarDataset):
+        return __imputeColumnar__(dataset, codes, plans, replacement, seed)
+    return __imputeRows__(dataset, codes, plans, replacement, seed)
 
 def ARFFtoCSV(attrmap, dataset):
     '''
@@ -1046,9 +3947,12 @@ def ARFFtoCSV(attrmap, dataset):
     of string names for attributes (columns) in their correct attribute
     positions corresponding to attribute-value positions in the newdataset,
     suitable for a CSV header row.
+    A ColumnarDataset dataset returns a ColumnarDataset that shares every
+    column that is not nominal or date.
     '''
     newattrmap = copy.deepcopy(attrmap)
-    newdataset = copy.deepcopy(dataset)
+    isColumnar = isinstance(dataset, ColumnarDataset)
+    newdataset = dataset if isColumnar else __copyRows__(dataset)
     newheader = []
     offsetTOnameType = remapAttributes(attrmap)
     convertIndices = []
@@ -1063,8 +3967,22 @@ def ARFFtoCSV(attrmap, dataset):
             else:
                 raise ValueError("INVALID NON-ATOMIC TYPE TAG: '"
                     + str(basetype) + "' in call to ARFFtoCSV")
-    for inst in newdataset:
+    if isColumnar:
+        newcolumns = {}
         for fldix in convertIndices:
+            column = dataset.columns[fldix]
+            if column.kind == 'nominal':
+                newcolumns[fldix] = __encodedColumn__('string', column.values,
+                    list(column.categories))
+            else:
+                newcolumns[fldix] = __columnFromValues__('string',
+                    [None if v is None else v[0] for v in column.tolist()])
+        return (newattrmap, dataset.withColumns(newcolumns), newheader)
+    # Nominal values already are their strings; a date's is its [0].
+    dateIndices = [fldix for fldix in convertIndices
+        if offsetTOnameType[fldix][1][0] == 'date']
+    for inst in newdataset:
+        for fldix in dateIndices:
             inst[fldix] = inst[fldix][0] if (inst[fldix] != None) else None
             # Use the string representation
     return (newattrmap, newdataset, newheader)
@@ -1128,6 +4046,793 @@ def stringNumMedian(valueList, mkey=None, mreverse=False):
             # + str(v1) + ', returning lower element\n')
         return vl[int(len(vl) / 2)] # non-numeric, return the lower
 
+def __knownFloats__(values):
+    # Return the known numbers in values (an ARFFColumn, a numpy array, or
+    # a sequence of numbers and None) as a float64 numpy array.
+    if isinstance(values, ARFFColumn):
+        return values.values[~values.mask].astype(numpy.float64)
+    if not isinstance(values, numpy.ndarray):
+        values = numpy.fromiter((numpy.nan if v is None else v
+            for v in values), dtype=numpy.float64)
+    else:
+        values = values.astype(numpy.float64, copy=False)
+    return values[~numpy.isnan(values)]
+
+class StreamingMoments(object):
+    '''
+    StreamingMoments accumulates the count, min, max, mean and the central
+    moment sums m2, m3 and m4 of a stream of numbers in constant memory.
+    update takes a batch at a time, computing its moments with numpy and
+    combining them with the running ones by the pairwise formulas of Chan
+    et al. and Pebay, Welford's one-value update generalized to batches.
+    merge combines the StreamingMoments of two disjoint chunks of a
+    stream, for example chunks summarized in parallel processes.
+    Unknown (None or numpy.nan) values are skipped.
+    '''
+    def __init__(self):
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+    def update(self, values):
+        '''
+        Add a batch of values, an ARFFColumn, numpy array or sequence.
+        '''
+        x = __knownFloats__(values)
+        if len(x) == 0:
+            return
+        batch = StreamingMoments()
+        batch.count = len(x)
+        batch.min = x.min().item()
+        batch.max = x.max().item()
+        batch.mean = x.mean().item()
+        d = x - batch.mean
+        d2 = d * d
+        batch.m2 = d2.sum().item()
+        batch.m3 = (d2 * d).sum().item()
+        batch.m4 = (d2 * d2).sum().item()
+        self.merge(batch)
+    def merge(self, other):
+        '''
+        Add the moments of the disjoint stream summarized by other.
+        '''
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return
+        na = float(self.count)
+        nb = float(other.count)
+        n = na + nb
+        delta = other.mean - self.mean
+        m2 = self.m2 + other.m2 + delta * delta * na * nb / n
+        m3 = (self.m3 + other.m3 + delta ** 3 * na * nb * (na - nb) / (n * n)
+            + 3.0 * delta * (na * other.m2 - nb * self.m2) / n)
+        m4 = (self.m4 + other.m4 + delta ** 4 * na * nb
+            * (na * na - na * nb + nb * nb) / (n ** 3)
+            + 6.0 * delta * delta * (na * na * other.m2 + nb * nb * self.m2)
+                / (n * n)
+            + 4.0 * delta * (na * other.m3 - nb * self.m3) / n)
+        self.mean = self.mean + delta * nb / n
+        self.m2, self.m3, self.m4 = (m2, m3, m4)
+        self.count = self.count + other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+    def pvariance(self):
+        '''Population variance as in statistics.pvariance.'''
+        return self.m2 / self.count if self.count else None
+    def variance(self):
+        '''Sample variance as in statistics.variance.'''
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+    def pstdev(self):
+        '''Population standard deviation as in statistics.pstdev.'''
+        return math.sqrt(self.pvariance()) if self.count else None
+    def stdev(self):
+        '''Sample standard deviation as in statistics.stdev.'''
+        return math.sqrt(self.variance()) if self.count > 1 else None
+    def skewness(self):
+        '''Population skewness, None for a constant or empty stream.'''
+        if self.count == 0 or self.m2 == 0.0:
+            return None
+        return math.sqrt(self.count) * self.m3 / (self.m2 ** 1.5)
+    def kurtosis(self):
+        '''Population excess kurtosis, None for a constant or empty stream.'''
+        if self.count == 0 or self.m2 == 0.0:
+            return None
+        return self.count * self.m4 / (self.m2 * self.m2) - 3.0
+
+class QuantileSketch(object):
+    '''
+    QuantileSketch is a mergeable KLL quantile sketch (Karnin, Lang and
+    Liberty) of a stream of numbers. It holds compactor levels of
+    numpy arrays whose items at level h each stand for 2**h values,
+    keeping about 3 * k items in all however long the stream. A full
+    level is sorted and every other item, from a random start, is
+    promoted to the next level. quantile's rank error is about 1.7 / k
+    of the count with high probability, and quantiles are exact (as in
+    numpy.quantile) until the sketch first compacts, after about k values.
+    merge combines sketches of disjoint chunks built with the same k.
+    seed seeds the coin flips for repeatable sketches.
+    Unknown (None or numpy.nan) values are skipped.
+    '''
+    def __init__(self, k=200, seed=None):
+        if k < 8:
+            raise ValueError("QuantileSketch requires k >= 8: " + str(k))
+        self.k = k
+        self.count = 0
+        self.levels = [numpy.zeros(0, dtype=numpy.float64)]
+        self.randomgen = random.Random(seed)
+    def __capacity__(self, level):
+        # Level capacity shrinks by 2/3 per level below the top one.
+        depth = len(self.levels) - 1 - level
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+    def __compress__(self):
+        # Compact levels over capacity until none is.
+        isCompacting = True
+        while isCompacting:
+            isCompacting = False
+            for level in range(0, len(self.levels)):
+                items = self.levels[level]
+                if len(items) <= self.__capacity__(level):
+                    continue
+                isCompacting = True
+                items = numpy.sort(items)
+                if len(items) & 1:
+                    self.levels[level] = items[-1:]
+                    items = items[:-1]
+                else:
+                    self.levels[level] = items[0:0]
+                promoted = items[self.randomgen.randrange(0, 2)::2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(promoted)
+                else:
+                    self.levels[level+1] = numpy.concatenate(
+                        (self.levels[level+1], promoted))
+    def update(self, values):
+        '''
+        Add a batch of values, an ARFFColumn, numpy array or sequence.
+        '''
+        x = __knownFloats__(values)
+        if len(x) == 0:
+            return
+        self.count += len(x)
+        self.levels[0] = numpy.concatenate((self.levels[0], x))
+        self.__compress__()
+    def merge(self, other):
+        '''
+        Add the values of the disjoint stream summarized by other.
+        '''
+        if other.k != self.k:
+            raise ValueError("QuantileSketch merge requires the same k: "
+                + str(self.k) + " != " + str(other.k))
+        for level in range(0, len(other.levels)):
+            if level == len(self.levels):
+                self.levels.append(other.levels[level].copy())
+            else:
+                self.levels[level] = numpy.concatenate((self.levels[level],
+                    other.levels[level]))
+        self.count += other.count
+        self.__compress__()
+    def quantiles(self, qs):
+        '''
+        Return the list of estimated quantiles for fractions qs in [0, 1].
+        '''
+        if self.count == 0:
+            return [None for q in qs]
+        if len(self.levels) == 1:
+            return numpy.quantile(self.levels[0],
+                numpy.asarray(qs, dtype=numpy.float64)).tolist()
+        items = numpy.concatenate(self.levels)
+        weights = numpy.concatenate([numpy.full(len(self.levels[level]),
+            1 << level, dtype=numpy.int64)
+                for level in range(0, len(self.levels))])
+        order = numpy.argsort(items, kind='stable')
+        items = items[order]
+        cumweights = numpy.cumsum(weights[order])
+        targets = numpy.asarray(qs, dtype=numpy.float64) * cumweights[-1]
+        ixs = numpy.minimum(numpy.searchsorted(cumweights, targets),
+            len(items) - 1)
+        return items[ixs].tolist()
+    def quantile(self, q):
+        '''Return the estimated quantile for fraction q in [0, 1].'''
+        return self.quantiles([q])[0]
+    def median(self):
+        '''Return the estimated median.'''
+        return self.quantile(0.5)
+
+class HeavyHitters(object):
+    '''
+    HeavyHitters counts the most frequent values of a stream for mode
+    with a mergeable Misra-Gries summary of at most capacity counters.
+    When a batch leaves more than capacity counters, the (capacity+1)th
+    largest count is subtracted from all of them and non-positive ones
+    are dropped, so each count is low by at most error, which is at
+    most count / (capacity + 1), and every value occurring more often
+    than that is kept. exact True keeps a counter per distinct value,
+    for the exact modes of multimode at the cost of that memory.
+    Unknown (None or numpy.nan) values are skipped.
+    '''
+    def __init__(self, capacity=1000, exact=False):
+        if capacity < 1:
+            raise ValueError("HeavyHitters requires capacity >= 1: "
+                + str(capacity))
+        self.capacity = capacity
+        self.exact = exact
+        self.count = 0
+        self.error = 0
+        self.counters = {}
+    def __prune__(self):
+        # Misra-Gries reduction back to capacity counters.
+        if self.exact or len(self.counters) <= self.capacity:
+            return
+        cut = sorted(self.counters.values(), reverse=True)[self.capacity]
+        self.counters = dict([(v, c - cut) for v, c in self.counters.items()
+            if c > cut])
+        self.error += cut
+    def __addCounts__(self, pairs):
+        # Add (value, count) pairs, then prune.
+        counters = self.counters
+        for v, c in pairs:
+            counters[v] = counters.get(v, 0) + c
+            self.count += c
+        self.__prune__()
+    def update(self, values):
+        '''
+        Add a batch of values, an ARFFColumn, numpy array or sequence.
+        '''
+        if isinstance(values, ARFFColumn) and values.kind in ('nominal',
+                'string'):
+            counts = numpy.bincount(values.values[~values.mask],
+                minlength=len(values.categories))
+            nz = numpy.flatnonzero(counts)
+            self.__addCounts__(zip([values.categories[ix]
+                for ix in nz.tolist()], counts[nz].tolist()))
+            return
+        elif isinstance(values, ARFFColumn) and values.kind == 'numeric':
+            values = values.values[~values.mask]
+        if isinstance(values, numpy.ndarray) and values.dtype.kind in 'iuf':
+            if values.dtype.kind == 'f':
+                values = values[~numpy.isnan(values)]
+            uniq, counts = numpy.unique(values, return_counts=True)
+            self.__addCounts__(zip(uniq.tolist(), counts.tolist()))
+            return
+        if isinstance(values, ARFFColumn):
+            values = values.tolist()
+        self.__addCounts__(collections.Counter([v for v in values
+            if v is not None and v == v]).items())
+    def merge(self, other):
+        '''
+        Add the values of the disjoint stream summarized by other.
+        '''
+        self.__addCounts__(other.counters.items())
+        self.count += other.count - sum(other.counters.values())
+        self.error += other.error
+        self.exact = self.exact and other.exact
+    def mostCommon(self, n=None):
+        '''
+        Return up to n (value, estimated count) pairs, most frequent first.
+        '''
+        return collections.Counter(self.counters).most_common(n)
+    def modes(self):
+        '''
+        Return the tuple of values with the highest count in sorted order,
+        as multimode in this module does.
+        '''
+        if not self.counters:
+            return ()
+        top = max(self.counters.values())
+        return tuple(sorted([v for v, c in self.counters.items()
+            if c == top]))
+    def mode(self):
+        '''
+        Return the median of modes(), as imputeARFF's 'mode' does, or None
+        when no value is frequent enough to keep a counter.
+        '''
+        modeset = self.modes()
+        return modeset[int(len(modeset)/2)] if modeset else None
+
+class ColumnStats(object):
+    '''
+    ColumnStats summarizes one attribute's values in constant memory
+    with a StreamingMoments and a QuantileSketch for a numeric attribute
+    (both None otherwise) and a HeavyHitters for its modes, plus the
+    count of unknown values. Batches of a column too large to hold in
+    memory are added with update, and ColumnStats of disjoint chunks,
+    for example from parallel processes, combine with merge; see
+    streamStatsARFF. exactMode True counts modes exactly. k, capacity
+    and seed are as for QuantileSketch and HeavyHitters.
+    '''
+    def __init__(self, isNumeric=True, k=200, capacity=1000, exactMode=False,
+            seed=None):
+        self.unknown = 0
+        self.moments = StreamingMoments() if isNumeric else None
+        self.quantiles = QuantileSketch(k, seed) if isNumeric else None
+        self.hitters = HeavyHitters(capacity, exactMode)
+    def update(self, values):
+        '''
+        Add a batch of values, an ARFFColumn, numpy array or sequence.
+        '''
+        before = self.hitters.count
+        if self.moments is not None:
+            if not isinstance(values, (ARFFColumn, numpy.ndarray)):
+                values = numpy.fromiter((numpy.nan if v is None else v
+                    for v in values), dtype=numpy.float64)
+            self.moments.update(values)
+            self.quantiles.update(values)
+        self.hitters.update(values)
+        self.unknown += len(values) - (self.hitters.count - before)
+    def merge(self, other):
+        '''
+        Add the values of the disjoint chunk summarized by other.
+        '''
+        self.unknown += other.unknown
+        if self.moments is not None:
+            self.moments.merge(other.moments)
+            self.quantiles.merge(other.quantiles)
+        self.hitters.merge(other.hitters)
+    def summary(self):
+        '''
+        Return a dict of 'count', 'unknown', 'mode' and, for a numeric
+        attribute, 'min', 'max', 'mean', 'median', 'pstdev', 'stdev',
+        'skewness' and 'kurtosis'.
+        '''
+        result = {'count' : self.hitters.count, 'unknown' : self.unknown,
+            'mode' : self.hitters.mode()}
+        if self.moments is not None:
+            moments = self.moments
+            result.update({'min' : moments.min, 'max' : moments.max,
+                'mean' : moments.mean if moments.count else None,
+                'median' : self.quantiles.median(),
+                'pstdev' : moments.pstdev(), 'stdev' : moments.stdev(),
+                'skewness' : moments.skewness(),
+                'kurtosis' : moments.kurtosis()})
+        return result
+
+__STATS_RANGE__ = 1 << 20       # bytes of ARFF data per streamStatsARFF task
+
+def __statsARFFrange__(task):
+    # Pool worker: summarize the attributes at offsets akeys in one byte
+    # range of an ARFF file, returning a list of ColumnStats.
+    fname, amap, start, end, akeys, params = task
+    dataset = __readColumnar__(__rangeText__(fname, start, end), amap)
+    return __updateStats__(amap, akeys, params, None, dataset)
+
+def __updateStats__(amap, akeys, params, columnStats, dataset):
+    # Add the columns at akeys of ColumnarDataset dataset to the list of
+    # ColumnStats columnStats, first creating them from params when it is
+    # None.
+    if columnStats is None:
+        remp = remapAttributes(amap)
+        k, capacity, exactMode, seed = params
+        columnStats = [ColumnStats(
+            __columnKind__(remp[offset][1]) == 'numeric', k, capacity,
+                exactMode, seed) for offset in akeys]
+    for ix in range(0, len(akeys)):
+        columnStats[ix].update(dataset.columns[akeys[ix]])
+    return columnStats
+
+def streamStatsARFF(fname, attributeKeys=None, workers=1, exactMode=False,
+        k=200, capacity=1000, seed=None):
+    '''
+    Summarize the attributes of ARFF file fname, which may be too large
+    to hold in memory, returning a map from attrname -> ColumnStats,
+    where attributeKeys is a sequence of attribute names or offsets to
+    summarize, None meaning all of them. The @data section is parsed in
+    byte ranges of about 1 MB each, summarized into per-range ColumnStats
+    that are merged in file order, so memory use stays bounded however
+    large fname is; workers > 1 summarizes ranges in that many processes,
+    None meaning os.cpu_count(). A '.gz' fname is streamed serially by
+    iterARFF. exactMode, k, capacity and seed are as for ColumnStats;
+    call summary() on a ColumnStats for its statistics.
+    '''
+    params = (k, capacity, exactMode, seed)
+    if fname.endswith('.gz'):
+        amap, batches = iterARFF(fname, 100000, columnar=True)
+        akeys = __attributeOffsets__(amap, attributeKeys
+            if attributeKeys is not None else range(0, len(amap)),
+                'streamStatsARFF')
+        columnStats = None
+        for batch in batches:
+            columnStats = __updateStats__(amap, akeys, params, columnStats,
+                batch)
+    else:
+        with open(fname, 'r') as af:
+            amap = __getAttrIndices__(af)
+            start = af.tell()
+        akeys = __attributeOffsets__(amap, attributeKeys
+            if attributeKeys is not None else range(0, len(amap)),
+                'streamStatsARFF')
+        end = os.path.getsize(fname)
+        cuts = __recordBoundaries__(fname, start, end,
+            max(1, (end - start) // __STATS_RANGE__))
+        tasks = [(fname, amap, cuts[ix], cuts[ix+1], akeys, params)
+            for ix in range(0, len(cuts)-1)]
+        columnStats = None
+        if tasks:
+            chunks = __parallelMap__(__statsARFFrange__, tasks,
+                __poolWorkers__(workers, len(tasks)))
+            columnStats = chunks[0]
+            for chunk in chunks[1:]:
+                for ix in range(0, len(akeys)):
+                    columnStats[ix].merge(chunk[ix])
+    if columnStats is None:
+        columnStats = __updateStats__(amap, akeys, params, None,
+            toColumnarARFF(amap, []))
+    remp = remapAttributes(amap)
+    return dict([(remp[akeys[ix]][0], columnStats[ix])
+        for ix in range(0, len(akeys))])
+
+__GROUPBY_AGGREGATES__ = ('count', 'sum', 'mean', 'min', 'max', 'pstdev',
+    'median', 'multimode')
+
+# Offsets into a group's per-attribute partial aggregate list.
+__GP_COUNT__, __GP_SUM__, __GP_MEAN__, __GP_M2__, __GP_MIN__, __GP_MAX__, \
+    __GP_MEDIAN__, __GP_MODES__ = range(0, 8)
+
+class GroupAggregator(object):
+    '''
+    GroupAggregator computes groupbyARFF's aggregates over a relation
+    given in batches, holding only one partial aggregate per group. attrmap
+    is the relation's attrmap as returned by readARFF or iterARFF,
+    groupKeys is a sequence of names or offsets of the attributes to group
+    on, and aggregates is an ordered list of (NAME, FUNC, ATTR) triplets,
+    where NAME names the result attribute, FUNC is one of 'count', 'sum',
+    'mean', 'min', 'max', 'pstdev', 'median' or 'multimode', and ATTR is
+    the name or offset of the attribute aggregated, or None with 'count'
+    to count the group's instances. 'count' of an ATTR counts its known
+    values. 'sum', 'mean', 'pstdev' and 'median' take a numeric ATTR, and
+    'min', 'max' and 'multimode' any ATTR, with nominal and string values
+    ordered as strings and dates by their datetimes. Unknown values are
+    skipped; an aggregate of a group without known values is unknown.
+    'multimode' is the string of the modes of multimode joined by ','.
+    update adds a batch (a 2D list or ColumnarDataset); its rows are
+    numbered by group with numpy, and each attribute's values sorted
+    within groups once, from which every aggregate's partial for the
+    batch is found. Partials fold into a hash table from each group's key
+    values to its partial aggregates. merge adds the partials of another
+    GroupAggregator built with the same arguments over a disjoint part of
+    the relation, for example in another process. result returns the
+    (attrmap, dataset) relation of groupbyARFF. exactMode True (the
+    default) keeps every known value of an attribute with a 'median' and
+    counts every distinct value of one with a 'multimode'; exactMode False
+    bounds memory per group with a QuantileSketch and a HeavyHitters
+    instead, with k, capacity and seed as for those classes.
+    '''
+    def __init__(self, attrmap, groupKeys, aggregates, exactMode=True, k=200,
+            capacity=1000, seed=None):
+        where = 'groupbyARFF'
+        self.attrmap = attrmap
+        self.gkeys = __attributeOffsets__(attrmap, groupKeys, where)
+        self.exactMode = exactMode
+        self.k = k
+        self.capacity = capacity
+        self.seed = seed
+        remp = remapAttributes(attrmap)
+        self.newattrmap = {}
+        for offset in self.gkeys:
+            name, atype = remp[offset]
+            if name in self.newattrmap:
+                raise ValueError("DUPLICATE GROUP ATTRIBUTE: " + name
+                    + " in " + where)
+            self.newattrmap[name] = (len(self.newattrmap), atype)
+        self.aggregates = []    # (FUNC, offset or None, index in attributes)
+        self.attributes = []    # aggregated offsets, each with its needs
+        self.needs = []         # sets of FUNCs per entry of attributes
+        for NAME, FUNC, ATTR in aggregates:
+            if not FUNC in __GROUPBY_AGGREGATES__:
+                raise ValueError("INVALID AGGREGATE: " + str(FUNC) + " in "
+                    + where + ", must be one of " + str(__GROUPBY_AGGREGATES__))
+            if NAME in self.newattrmap:
+                raise ValueError("DUPLICATE ATTRIBUTE NAME: " + str(NAME)
+                    + " in " + where)
+            if ATTR is None:
+                if FUNC != 'count':
+                    raise ValueError("AGGREGATE " + FUNC
+                        + " requires an attribute in " + where)
+                self.aggregates.append((FUNC, None, None))
+                self.newattrmap[NAME] = (len(self.newattrmap), 'numeric')
+                continue
+            offset = __attributeOffsets__(attrmap, [ATTR], where)[0]
+            kind = __columnKind__(remp[offset][1])
+            if FUNC in ('sum', 'mean', 'pstdev', 'median') \
+                    and kind != 'numeric':
+                raise ValueError("AGGREGATE " + FUNC + " requires a numeric"
+                    + " attribute, not " + remp[offset][0] + " in " + where)
+            if not offset in self.attributes:
+                self.attributes.append(offset)
+                self.needs.append(set())
+            aix = self.attributes.index(offset)
+            self.needs[aix].add(FUNC)
+            self.aggregates.append((FUNC, offset, aix))
+            if FUNC in ('min', 'max'):
+                atype = remp[offset][1]
+            elif FUNC == 'multimode':
+                atype = 'string'
+            else:
+                atype = 'numeric'
+            self.newattrmap[NAME] = (len(self.newattrmap), atype)
+        self.kinds = [__columnKind__(remp[offset][1])
+            for offset in self.attributes]
+        self.groups = {}        # key tuple -> [rows, partial per attribute]
+    def __newPartial__(self, aix):
+        partial = [0, 0, 0.0, 0.0, None, None, None, None]
+        if 'median' in self.needs[aix]:
+            partial[__GP_MEDIAN__] = [] if self.exactMode \
+                else QuantileSketch(self.k, self.seed)
+        if 'multimode' in self.needs[aix]:
+            partial[__GP_MODES__] = HeavyHitters(self.capacity,
+                self.exactMode)
+        return partial
+    def __group__(self, key):
+        state = self.groups.get(key)
+        if state is None:
+            state = [0] + [self.__newPartial__(aix)
+                for aix in range(0, len(self.attributes))]
+            self.groups[key] = state
+        return state
+    def update(self, dataset):
+        '''
+        Add a batch of instances, a 2D list or ColumnarDataset.
+        '''
+        nrows = len(dataset)
+        if nrows == 0:
+            return
+        if not isinstance(dataset, ColumnarDataset):
+            remp = remapAttributes(self.attrmap)
+            columns = dict([(offset, __rowsColumn__(remp[offset][1], dataset,
+                offset)) for offset in set(self.gkeys + self.attributes)])
+        else:
+            columns = dataset.columns
+        codes, ngroups = __groupCodes__([columns[offset]
+            for offset in self.gkeys], nrows)
+        order = numpy.argsort(codes, kind='stable')
+        bounds = numpy.searchsorted(codes[order], numpy.arange(0,
+            ngroups + 1))
+        keys = [tuple(key) for key in zip(*[columns[offset].take(
+            order[bounds[:-1]]).tolist() for offset in self.gkeys])] \
+                if self.gkeys else [()]
+        states = [self.__group__(key) for key in keys]
+        sizes = numpy.diff(bounds).tolist()
+        for state, size in zip(states, sizes):
+            state[0] += size
+        for aix in range(0, len(self.attributes)):
+            self.__updateAttribute__(aix, columns[self.attributes[aix]],
+                codes, bounds, states)
+    def __updateAttribute__(self, aix, column, codes, bounds, states):
+        # Sort the rows on (group, unknown, value) so each group's known
+        # values are sorted at the start of its run of rows, then find
+        # every partial of the batch from that one order.
+        needs = self.needs[aix]
+        ngroups = len(states)
+        sortkey = numpy.where(column.mask, 0, column.sortKey())
+        order = numpy.lexsort((sortkey, column.mask, codes))
+        starts = bounds[:-1]
+        counts = numpy.bincount(codes[~column.mask], minlength=ngroups)
+        hasKnown = counts > 0
+        svalues = column.values[order]
+        counts_l = counts.tolist()
+        if needs & set(['sum', 'mean', 'pstdev']):
+            known = ~column.mask[order]
+            sums = numpy.add.reduceat(numpy.where(known, svalues, 0), starts)
+            means = sums / numpy.maximum(counts, 1)
+            deviations = numpy.where(known, svalues - numpy.repeat(means,
+                numpy.diff(bounds)), 0.0)
+            m2s = numpy.add.reduceat(deviations * deviations, starts)
+            for state, n, s, colMean, m2 in zip(states, counts_l,
+                    sums.tolist(), means.tolist(), m2s.tolist()):
+                if n:
+                    partial = state[aix+1]
+                    na = partial[__GP_COUNT__]
+                    total = na + n
+                    delta = colMean - partial[__GP_MEAN__]
+                    partial[__GP_SUM__] += s
+                    partial[__GP_MEAN__] += delta * n / total
+                    partial[__GP_M2__] += m2 + delta * delta * na * n / total
+        if needs & set(['min', 'max']):
+            known = numpy.flatnonzero(hasKnown)
+            rows = numpy.concatenate((order[starts[known]],
+                order[starts[known] + counts[known] - 1]))
+            values = column.take(rows).tolist()
+            isDate = column.kind == 'date'
+            for ix, gix in enumerate(known.tolist()):
+                partial = states[gix][aix+1]
+                for pix, v in ((__GP_MIN__, values[ix]),
+                        (__GP_MAX__, values[ix + len(known)])):
+                    old = partial[pix]
+                    if old is None or ((v[1] < old[1]) if isDate
+                            else (v < old)) == (pix == __GP_MIN__) \
+                                and v != old:
+                        partial[pix] = v
+        if 'median' in needs:
+            for gix in numpy.flatnonzero(hasKnown).tolist():
+                chunk = svalues[bounds[gix]:bounds[gix] + counts_l[gix]]
+                medianState = states[gix][aix+1][__GP_MEDIAN__]
+                if self.exactMode:
+                    medianState.append(chunk)
+                else:
+                    medianState.update(chunk)
+        if 'multimode' in needs:
+            # Run lengths of equal values among each group's sorted knowns.
+            # Each run is keyed by its first typed value from take(), so an
+            # int of a float64 column (see ARFFColumn intmask) stays an int.
+            known = ~column.mask[order]
+            positions = numpy.flatnonzero(known)
+            groups = codes[order][positions]
+            skeys = sortkey[order][positions]
+            change = numpy.ones(len(positions), dtype=bool)
+            change[1:] = (groups[1:] != groups[:-1]) | (skeys[1:] != skeys[:-1])
+            runstarts = numpy.flatnonzero(change)
+            runlengths = numpy.diff(numpy.append(runstarts,
+                len(positions))).tolist()
+            values = column.take(order[positions[runstarts]]).tolist()
+            rungroups = groups[runstarts]
+            cuts = numpy.searchsorted(rungroups, numpy.arange(0,
+                ngroups + 1)).tolist()
+            for gix in numpy.flatnonzero(hasKnown).tolist():
+                states[gix][aix+1][__GP_MODES__].__addCounts__(zip(
+                    values[cuts[gix]:cuts[gix+1]],
+                        runlengths[cuts[gix]:cuts[gix+1]]))
+        for state, n in zip(states, counts_l):
+            state[aix+1][__GP_COUNT__] += n
+    def merge(self, other):
+        '''
+        Add the partial aggregates of other, a GroupAggregator built with
+        the same arguments over a disjoint part of the relation.
+        '''
+        for key, ostate in other.groups.items():
+            state = self.__group__(key)
+            state[0] += ostate[0]
+            for aix in range(0, len(self.attributes)):
+                partial = state[aix+1]
+                opartial = ostate[aix+1]
+                na = partial[__GP_COUNT__]
+                nb = opartial[__GP_COUNT__]
+                if nb == 0:
+                    continue
+                total = na + nb
+                delta = opartial[__GP_MEAN__] - partial[__GP_MEAN__]
+                partial[__GP_SUM__] += opartial[__GP_SUM__]
+                partial[__GP_MEAN__] += delta * nb / total
+                partial[__GP_M2__] += opartial[__GP_M2__] \
+                    + delta * delta * na * nb / total
+                partial[__GP_COUNT__] = total
+                isDate = self.kinds[aix] == 'date'
+                for pix in (__GP_MIN__, __GP_MAX__):
+                    v = opartial[pix]
+                    old = partial[pix]
+                    if v is not None and (old is None or ((v[1] < old[1])
+                            if isDate else (v < old)) == (pix == __GP_MIN__)
+                                and v != old):
+                        partial[pix] = v
+                if partial[__GP_MEDIAN__] is not None:
+                    if self.exactMode:
+                        partial[__GP_MEDIAN__].extend(
+                            opartial[__GP_MEDIAN__])
+                    else:
+                        partial[__GP_MEDIAN__].merge(opartial[__GP_MEDIAN__])
+                if partial[__GP_MODES__] is not None:
+                    partial[__GP_MODES__].merge(opartial[__GP_MODES__])
+    def __aggregate__(self, FUNC, partial, rows):
+        # Return the value of aggregate FUNC for a group's partial.
+        n = partial[__GP_COUNT__] if partial is not None else rows
+        if FUNC == 'count':
+            return n
+        elif n == 0:
+            return None
+        elif FUNC == 'sum':
+            return partial[__GP_SUM__]
+        elif FUNC == 'mean':
+            return partial[__GP_MEAN__]
+        elif FUNC == 'pstdev':
+            return math.sqrt(max(partial[__GP_M2__], 0.0) / n)
+        elif FUNC == 'min':
+            return partial[__GP_MIN__]
+        elif FUNC == 'max':
+            return partial[__GP_MAX__]
+        elif FUNC == 'median':
+            if not self.exactMode:
+                return partial[__GP_MEDIAN__].median()
+            values = numpy.sort(numpy.concatenate(partial[__GP_MEDIAN__]))
+            middle = len(values) // 2
+            if len(values) & 1 or values[middle-1] == values[middle]:
+                return values[middle].item()
+            return (values[middle-1].item() + values[middle].item()) / 2.0
+        modes = partial[__GP_MODES__].modes()
+        return ','.join([v[0] if isinstance(v, tuple) else str(v)
+            for v in modes]) if modes else None
+    def result(self):
+        '''
+        Return (newattrmap, newdataset), the 2D list relation of one
+        instance per group in ascending order of the group attributes, as
+        for groupbyARFF.
+        '''
+        newdataset = []
+        for key, state in self.groups.items():
+            row = list(key)
+            for FUNC, offset, aix in self.aggregates:
+                row.append(self.__aggregate__(FUNC, None if aix is None
+                    else state[aix+1], state[0]))
+            newdataset.append(row)
+        remp = remapAttributes(self.attrmap)
+        newdataset.sort(key=__rowSortKey__(list(range(0, len(self.gkeys))),
+            [__columnKind__(remp[offset][1]) for offset in self.gkeys],
+                False, None))
+        return (copy.deepcopy(self.newattrmap), newdataset)
+
+def groupbyARFF(attrmap, dataset, groupKeys, aggregates, exactMode=True,
+        k=200, capacity=1000, seed=None):
+    '''
+    Return (newattrmap, newdataset), a relation of one instance per
+    distinct combination of the values of the groupKeys attributes in
+    attrmap, dataset, as returned by readARFF, with an unknown value
+    grouped as a value of its own. groupKeys is a sequence of attribute
+    names or offsets, and aggregates an ordered list of (NAME, FUNC, ATTR)
+    triplets giving the attributes computed per group, as documented for
+    GroupAggregator, for example [('n', 'count', None), ('avgTemp', 'mean',
+    'TempF'), ('maxTemp', 'max', 'TempF')]. newattrmap holds the groupKeys
+    attributes with their types followed by the aggregates; 'count', 'sum',
+    'mean', 'pstdev' and 'median' are numeric, 'min' and 'max' keep ATTR's
+    type, and 'multimode' is a string. Instances are in ascending order of
+    the group attributes as sortARFF orders them, unknowns last. Empty
+    groupKeys aggregates the whole dataset as one group. A ColumnarDataset
+    dataset returns a ColumnarDataset. exactMode, k, capacity and seed are
+    as for GroupAggregator. See groupbyARFFfile for files too large for
+    memory, and GroupAggregator for aggregating batches.
+    '''
+    aggregator = GroupAggregator(attrmap, groupKeys, aggregates, exactMode,
+        k, capacity, seed)
+    aggregator.update(dataset)
+    newattrmap, newdataset = aggregator.result()
+    if isinstance(dataset, ColumnarDataset):
+        return (newattrmap, toColumnarARFF(newattrmap, newdataset,
+            dataset.isUsingNan))
+    return (newattrmap, newdataset)
+
+def __groupbyARFFrange__(task):
+    fname, amap, start, end, params = task
+    aggregator = GroupAggregator(amap, *params)
+    aggregator.update(__readColumnar__(__rangeText__(fname, start, end),
+        amap))
+    return aggregator
+
+def groupbyARFFfile(fname, groupKeys, aggregates, workers=1, exactMode=True,
+        k=200, capacity=1000, seed=None):
+    '''
+    groupbyARFF of ARFF file fname, which may be too large to hold in
+    memory, returning (newattrmap, newdataset) as groupbyARFF does for a
+    2D list. As in streamStatsARFF, the @data section is parsed in byte
+    ranges of about 1 MB each, aggregated into per-range GroupAggregators
+    that are merged in file order, so memory holds one partial aggregate
+    per group (plus every known value of a 'median' or distinct value of
+    a 'multimode' attribute when exactMode is True); workers > 1
+    aggregates ranges in that many processes, None meaning os.cpu_count().
+    A '.gz' fname is streamed serially by iterARFF.
+    '''
+    params = (groupKeys, aggregates, exactMode, k, capacity, seed)
+    if fname.endswith('.gz'):
+        amap, batches = iterARFF(fname, 100000, columnar=True)
+        aggregator = GroupAggregator(amap, *params)
+        for batch in batches:
+            aggregator.update(batch)
+        return aggregator.result()
+    with open(fname, 'r') as af:
+        amap = __getAttrIndices__(af)
+        start = af.tell()
+    aggregator = GroupAggregator(amap, *params)     # validate arguments
+    end = os.path.getsize(fname)
+    cuts = __recordBoundaries__(fname, start, end,
+        max(1, (end - start) // __STATS_RANGE__))
+    tasks = [(fname, amap, cuts[ix], cuts[ix+1], params)
+        for ix in range(0, len(cuts)-1)]
+    if tasks:
+        for chunk in __parallelMap__(__groupbyARFFrange__, tasks,
+                __poolWorkers__(workers, len(tasks))):
+            aggregator.merge(chunk)
+    return aggregator.result()
+
 def kappa(confusionMatrix): # 2D list of lists, each sublist is a row
     '''
     Compute the Kappa statistic of a confusion matrix.
@@ -1137,43 +4842,26 @@ def kappa(confusionMatrix): # 2D list of lists, each sublist is a row
     https://scikit-learn.org/stable/modules/generated/sklearn.metrics.confusion_matrix.html
     Return value is a 5-tuple:
         (kappa %correct numberCorrect %incorrect numberIncorrect)
+    confusionMatrix may also be a square numpy array, and the row and
+    column sums are computed with numpy; see ConfusionMatrix for building
+    one from actual and predicted class labels.
     '''
-    sumRows = [0.0 for i in range(0,len(confusionMatrix))]
-    sumColumns = [0.0 for i in range(0,len(confusionMatrix))]
-    sumOfWeights = 0.0
-    numberCorrect = 0                   # added March 2020
-    numberIncorrect = 0                 # added March 2020
-    for i in range(0, len(confusionMatrix)):
-        for j in range(0, len(confusionMatrix)):
-            sumRows[i] += confusionMatrix[i][j]
-            sumColumns[j] += confusionMatrix[i][j];
-            sumOfWeights += confusionMatrix[i][j];
-            if (i == j):
-                numberCorrect += confusionMatrix[i][j]
-            else:
-                numberIncorrect += confusionMatrix[i][j]
-    correct = 0.0
-    chanceAgreement = 0.0
-    # DEBUGchanceAgreement = 0.0 # Added by Parson for figuring this out.
-    for i in range(0, len(confusionMatrix)):
-        # sumRows[i] gives sum that should have been classified as class i
-        # sumColumns[i] sum that were classified as i (maybe some wrong)
-        # This squares the correct diagonal classification terms.
-        # Other terms are sums of incorrectly swapped classes, e.g.,
-        # (in class a but classified as b * in class b but classified as a)
-        chanceAgreement += (sumRows[i] * sumColumns[i])
-        correct += confusionMatrix[i][i] # predicted == correct on diagonal
-        # if sumRows[i] > DEBUGchanceAgreement:
-            # DEBUGchanceAgreement = sumRows[i]
+    matrix = numpy.asarray(confusionMatrix)
+    sumRows = matrix.sum(axis=1, dtype=numpy.float64)
+    sumColumns = matrix.sum(axis=0, dtype=numpy.float64)
+    sumOfWeights = float(sumRows.sum())
+    numberCorrect = numpy.trace(matrix).item()          # added March 2020
+    numberIncorrect = (matrix.sum() - numpy.trace(matrix)).item()
+    if sumOfWeights == 0:
+        raise ZeroDivisionError("float division by zero")
+    # sumRows[i] gives sum that should have been classified as class i
+    # sumColumns[i] sum that were classified as i (maybe some wrong)
+    # This squares the correct diagonal classification terms.
+    # Other terms are sums of incorrectly swapped classes, e.g.,
+    # (in class a but classified as b * in class b but classified as a)
+    chanceAgreement = float(numpy.dot(sumRows, sumColumns))
     chanceAgreement /= (sumOfWeights * sumOfWeights)
-    correct /= sumOfWeights
-    # DEBUGchanceAgreement /= sumOfWeights
-    # for row in confusionMatrix:
-        # for datum in row:
-            # sys.stdout.write(str(datum) + ",\t")
-        # sys.stdout.write('\n')
-    # print("chanceAgreement:",chanceAgreement,"ZeroR",DEBUGchanceAgreement)
-    # print("correct: ", correct)
+    correct = numberCorrect / sumOfWeights  # predicted == correct on diagonal
     kappaResult = 0.0
     if (chanceAgreement < 1):
         # This is the actual formula:
@@ -1186,6 +4874,165 @@ def kappa(confusionMatrix): # 2D list of lists, each sublist is a row
     return(kappaResult, numberCorrect/sumOfWeights, numberCorrect,
         numberIncorrect/sumOfWeights, numberIncorrect)
 
+class ConfusionMatrix(object):
+    '''
+    ConfusionMatrix counts (actual, predicted) pairs of class labels in a
+    numpy int64 matrix whose row is the actual class and whose column is
+    the predicted class, as for kappa. labels is the ordered list of
+    class labels, such as a nominal attribute's symbols; None learns them
+    from the data, appending each batch's new labels in sorted order.
+    update adds a batch of actual and predicted labels, sequences, numpy
+    arrays or ARFFColumns of equal length, for example columns of the
+    ColumnarDataset batches of iterARFF. Each batch's labels are integer
+    encoded, from an ARFFColumn's category codes, with numpy.unique for
+    numbers, or by hashing other values, and its pairs are counted with
+    one numpy.bincount. A pair with an unknown (None or numpy.nan) label is
+    counted in skipped instead. merge adds the counts of another
+    ConfusionMatrix, for example one built in another process, aligning
+    their labels. A label not in fixed labels raises ValueError.
+    '''
+    def __init__(self, labels=None):
+        self.isFixed = False
+        self.labels = []
+        self.index = {}
+        self.matrix = numpy.zeros((0, 0), dtype=numpy.int64)
+        self.skipped = 0
+        if labels is not None:
+            self.__addLabels__(list(labels))
+            self.isFixed = True
+    def __repr__(self):
+        return 'ConfusionMatrix(' + repr(self.labels) + ')'
+    def __addLabels__(self, labels):
+        for label in labels:
+            if not label in self.index:
+                if self.isFixed:
+                    raise ValueError("ConfusionMatrix label " + repr(label)
+                        + " is not one of " + repr(self.labels))
+                self.index[label] = len(self.labels)
+                self.labels.append(label)
+        grow = len(self.labels) - len(self.matrix)
+        if grow > 0:
+            self.matrix = numpy.pad(self.matrix, ((0, grow), (0, grow)))
+    def __codes__(self, values):
+        # Return the int64 codes into labels of values, -1 for unknowns.
+        if isinstance(values, ARFFColumn):
+            if values.kind in ('nominal', 'string'):
+                lookup = numpy.append(self.__codes__(list(values.categories)),
+                    -1)
+                return lookup[values.values]
+            values = values.tolist()
+        if isinstance(values, numpy.ndarray) and values.dtype.kind in 'biuf':
+            known = ~numpy.isnan(values) if values.dtype.kind == 'f' \
+                else numpy.ones(len(values), dtype=bool)
+            codes = numpy.zeros(len(values), dtype=numpy.int64) - 1
+            distinct, inverse = numpy.unique(values[known],
+                return_inverse=True)
+            distinct = distinct.tolist()
+            self.__addLabels__(distinct)
+            lookup = numpy.array([self.index[label] for label in distinct],
+                dtype=numpy.int64)
+            codes[known] = lookup[inverse.reshape(-1)]
+            return codes
+        # Strings and other Python values hash faster than numpy sorts them.
+        if isinstance(values, numpy.ndarray):
+            values = values.tolist()
+        lookup = dict(self.index)
+        lookup[None] = -1
+        try:
+            return numpy.fromiter(map(lookup.__getitem__, values),
+                dtype=numpy.int64, count=len(values))
+        except KeyError:
+            pass        # new labels or numpy.nan, found from the distinct values
+        distinct = set(values)
+        unknowns = [v for v in distinct if v is None or v != v]
+        for v in unknowns:
+            distinct.discard(v)
+        self.__addLabels__(sorted(distinct))
+        lookup = dict(self.index)
+        for v in unknowns:
+            lookup[v] = -1
+        return numpy.fromiter(map(lookup.__getitem__, values),
+            dtype=numpy.int64, count=len(values))
+    def update(self, actual, predicted):
+        '''
+        Add the (actual, predicted) pairs of labels of a batch.
+        '''
+        if len(actual) != len(predicted):
+            raise ValueError("UNEQUAL NUMBER OF actual " + str(len(actual))
+                + " AND predicted " + str(len(predicted))
+                + " LABELS in ConfusionMatrix update")
+        acodes = self.__codes__(actual)
+        pcodes = self.__codes__(predicted)
+        valid = (acodes >= 0) & (pcodes >= 0)
+        self.skipped += len(valid) - int(valid.sum())
+        n = len(self.labels)
+        self.matrix += numpy.bincount(acodes[valid] * n + pcodes[valid],
+            minlength=n*n).reshape(n, n)
+    def merge(self, other):
+        '''
+        Add the counts of other, a ConfusionMatrix of disjoint pairs.
+        '''
+        self.__addLabels__(other.labels)
+        ixs = numpy.array([self.index[label] for label in other.labels],
+            dtype=numpy.int64)
+        self.matrix[numpy.ix_(ixs, ixs)] += other.matrix
+        self.skipped += other.skipped
+    def tolist(self):
+        '''Return the matrix as the 2D list that kappa takes.'''
+        return self.matrix.tolist()
+    def count(self):
+        '''Return the number of pairs counted.'''
+        return int(self.matrix.sum())
+    def kappa(self):
+        '''Return kappa's 5-tuple for this matrix.'''
+        return kappa(self.matrix)
+    def accuracy(self):
+        '''
+        Return the fraction of pairs whose predicted label is the actual
+        label, or None when no pairs are counted.
+        '''
+        total = self.count()
+        return numpy.trace(self.matrix).item() / total if total else None
+    def __perClass__(self, totals):
+        diagonal = numpy.diagonal(self.matrix)
+        return dict(zip(self.labels, [None if total == 0 else hit / total
+            for hit, total in zip(diagonal.tolist(), totals.tolist())]))
+    def precision(self):
+        '''
+        Return a map from each label to the fraction of pairs predicted
+        as that label that are actually that label, None for a label
+        never predicted.
+        '''
+        return self.__perClass__(self.matrix.sum(axis=0))
+    def recall(self):
+        '''
+        Return a map from each label to the fraction of pairs actually of
+        that label that are predicted as that label, None for a label
+        that never occurs.
+        '''
+        return self.__perClass__(self.matrix.sum(axis=1))
+
+def confusionMatrixARFF(attrmap, dataset, actualKey, predictedKey):
+    '''
+    Return the ConfusionMatrix of the actual class attribute actualKey
+    against the predicted class attribute predictedKey, each a name or
+    offset in attrmap, over a 2D list or ColumnarDataset dataset. When the
+    actual attribute is nominal its symbols are the labels, in declaration
+    order, else the labels are learned from the data.
+    '''
+    actual, predicted = __attributeOffsets__(attrmap, [actualKey,
+        predictedKey], 'confusionMatrixARFF')
+    atype = remapAttributes(attrmap)[actual][1]
+    matrix = ConfusionMatrix([__unquoteNominal__(symbol)
+        for symbol in atype[2]] if __columnKind__(atype) == 'nominal'
+            else None)
+    if isinstance(dataset, ColumnarDataset):
+        matrix.update(dataset.columns[actual], dataset.columns[predicted])
+    else:
+        matrix.update(list(map(operator.itemgetter(actual), dataset)),
+            list(map(operator.itemgetter(predicted), dataset)))
+    return matrix
+
 __mapStringTypeToPyType__ = {
     "string"        :   str,
     "numeric"       :   float,
@@ -1200,8 +5047,10 @@ __mapPyTypeToStringType = {
 }
 
 def __helpfilter__(inAttributes, inInstances, attributeListToFilter,
-        fromTypeName, toTypeConverterFunction):
+        fromTypeName, toTypeConverterFunction, columnConverterFunction=None):
     # fromTypeName is like "string" "numeric" or "set"
+    # columnConverterFunction replaces toTypeConverterFunction for a
+    # ColumnarDataset, receiving the ARFFColumn in place of values.
     fromTypePy = __mapStringTypeToPyType__[fromTypeName]
     if not attributeListToFilter:
         attributeListToFilter = []  # must be a sequence
@@ -1212,7 +5061,10 @@ def __helpfilter__(inAttributes, inInstances, attributeListToFilter,
     else:
         myattrnames = attributeListToFilter
     outAttributes = copy.deepcopy(inAttributes)
-    outInstances = list(copy.deepcopy(inInstances)) # must be mutable
+    if isinstance(inInstances, ColumnarDataset):
+        outInstances = inInstances  # converters replace columns, not mutate
+    else:
+        outInstances = list(__copyRows__(inInstances))  # must be mutable
     for aname in myattrnames:
         atype = outAttributes[aname]
         if atype[1] != fromTypeName:
@@ -1222,9 +5074,12 @@ def __helpfilter__(inAttributes, inInstances, attributeListToFilter,
             continue
         # It is the correct type, so collect up the range of values.
         aindex = int(atype[0])
-        values = []
-        for inst in outInstances:
-            values.append(inst[aindex])
+        if isinstance(outInstances, ColumnarDataset):
+            outAttributes, outInstances = columnConverterFunction(
+                outAttributes, outInstances, aname, aindex,
+                outInstances.columns[aindex])
+            continue
+        values = list(map(operator.itemgetter(aindex), outInstances))
         # Note iterated mutation of outAttributes & outInstances
         outAttributes, outInstances = toTypeConverterFunction(outAttributes,
             outInstances, aname, aindex, values)
@@ -1240,32 +5095,130 @@ def StringToNominal(inAttributes, inInstances, attributeListToFilter=[]):
     strings converted to nominals. Parameter attributeListToFilter when
     non-None and non-empty is a list or tuple of attribute names to
     convert; otherwise, StringToNominal runs on every string attribute.
+    Each nominal's symbols are declared in sorted order, and in a 2D list
+    every instance of a symbol becomes one shared string object, its
+    dictionary entry, so a high-cardinality column holds one string per
+    symbol instead of one per row. A ColumnarDataset inInstances keeps
+    its string codes, whose categories are already sorted, as nominal
+    codes into the same shared category table.
     '''
     def __strToNomConverter__(outAttributes, outInstances,
             aname, aindex, values):
         # outAttributes is a deepcopy of inAttributes
-        # outInstances is a deepcopy of Instances
+        # outInstances is a row-by-row copy of inInstances
         # aname is the attribute name for type declaration update
         # aindex is its index in each instance
         # values is the per-instance attribute-value list, in original order
-        values = set(values)
-        setstring = "{"
-        liststring = []
-        prefix = ''
-        for v in values:        # nominal & string values in data look same
-            # this loop is for the type decl.
-            setstring += prefix + quoteStringIfNeeded(v)
-            liststring.append(v)
-            prefix = ','
-        setstring += "}"
+        # One C-level hashing pass maps every value to the first equal
+        # one, shared by all of its rows and by liststring.
+        symbols = {}
+        shared = list(map(symbols.setdefault, values, values))
+        symbols.pop(None, None)
+        liststring = sorted(symbols)
+        setstring = "{" + ','.join([quoteStringIfNeeded(v)
+            for v in liststring]) + "}"
+        outAttributes[aname] = (aindex, ('nominal', setstring, liststring))
+        for inst, v in zip(outInstances, shared):
+            inst[aindex] = v
+        return (outAttributes, outInstances)
+    def __strToNomColumnConverter__(outAttributes, outInstances,
+            aname, aindex, column):
+        # The string codes & categories are reused as the nominal's.
+        liststring = list(column.categories)
+        setstring = "{" + ','.join([quoteStringIfNeeded(v)
+            for v in liststring]) + "}"
         outAttributes[aname] = (aindex, ('nominal', setstring, liststring))
+        outInstances = outInstances.withColumns({aindex: ARFFColumn(
+            'nominal', column.values, column.mask, column.categories)})
         return (outAttributes, outInstances)
     outAttributes, outInstances = __helpfilter__(inAttributes, inInstances,
-        attributeListToFilter, "string", __strToNomConverter__)
+        attributeListToFilter, "string", __strToNomConverter__,
+        __strToNomColumnConverter__)
     return (outAttributes, outInstances)
 
+__NORMALIZE_MODES__ = ('minmax', 'zscore', 'robust')
+
+def __filterAttributeNames__(attrmap, attributeListToFilter, fromTypeName):
+    # The attribute names a filter converts, as selected by __helpfilter__:
+    # all of fromTypeName's attributes when attributeListToFilter is empty,
+    # else the named ones, which must be of that type.
+    if not attributeListToFilter:
+        return [aname for aname in attrmap.keys()
+            if attrmap[aname][1] == fromTypeName]
+    elif type(attributeListToFilter) == str:        # name of 1 attribute
+        attributeListToFilter = [attributeListToFilter]
+    for aname in attributeListToFilter:
+        if attrmap[aname][1] != fromTypeName:
+            raise TypeError("Invalid " + fromTypeName
+                + " filter attribute: " + aname + ": " + str(attrmap[aname]))
+    return list(attributeListToFilter)
+
+def __numericMatrix__(dataset, offsets):
+    # Return a float64 numpy array of shape (len(dataset), len(offsets))
+    # holding the numeric attributes at offsets, numpy.nan where unknown,
+    # built in one pass over the rows of a 2D list dataset.
+    if isinstance(dataset, ColumnarDataset):
+        matrix = numpy.empty((len(dataset), len(offsets)), dtype=numpy.float64)
+        for cix in range(0, len(offsets)):
+            column = dataset.columns[offsets[cix]]
+            matrix[:, cix] = column.values
+            matrix[column.mask, cix] = numpy.nan
+        return matrix
+    if not offsets or len(dataset) == 0:
+        return numpy.empty((len(dataset), len(offsets)), dtype=numpy.float64)
+    getter = operator.itemgetter(*offsets)
+    return numpy.array(list(map(getter, dataset)),
+        dtype=numpy.float64).reshape(len(dataset), len(offsets))
+
+def __normalizeFit__(matrix, mode):
+    # Return a list of (center, scale) per column of __numericMatrix__
+    # matrix for Normalize mode, (None, None) for a column with no known
+    # values, computed for all columns at once.
+    known = ~numpy.isnan(matrix)
+    counts = known.sum(axis=0)
+    has = counts > 0
+    centers = numpy.zeros(matrix.shape[1], dtype=numpy.float64)
+    scales = numpy.zeros(matrix.shape[1], dtype=numpy.float64)
+    if mode == 'minmax':
+        centers = numpy.fmin.reduce(matrix, axis=0)
+        scales = numpy.fmax.reduce(matrix, axis=0) - centers
+    elif mode == 'zscore':
+        centers = numpy.where(known, matrix, 0.0).sum(axis=0)          \
+            / numpy.maximum(counts, 1)
+        diffs = numpy.where(known, matrix - centers, 0.0)
+        scales = numpy.sqrt((diffs * diffs).sum(axis=0)
+            / numpy.maximum(counts, 1))
+    elif has.any():
+        q1, centers[has], q3 = numpy.nanpercentile(matrix[:, has],
+            [25.0, 50.0, 75.0], axis=0)
+        scales[has] = q3 - q1
+    return [(float(centers[cix]), float(scales[cix])) if has[cix]
+        else (None, None) for cix in range(0, matrix.shape[1])]
+
+def normalizeParameters(attrmap, dataset, attributeListToFilter=[],
+        mode='minmax'):
+    '''
+    Return the map from attrname -> (center, scale) that Normalize would
+    compute for its mode from the numeric attributes of (attrmap, dataset)
+    selected by attributeListToFilter, for passing as Normalize's
+    parameters to scale other datasets, e.g., a test set, identically.
+    mode 'minmax' gives (min, max - min), 'zscore' gives (mean, pstdev)
+    and 'robust' gives (median, interquartile range), with quartiles as
+    numpy.percentile interpolates them. An attribute with no known values
+    maps to (None, None). Unknown values (None or numpy.nan) are skipped,
+    and all attributes are scanned in one pass.
+    '''
+    if not mode in __NORMALIZE_MODES__:
+        raise ValueError("Invalid Normalize mode: " + str(mode)
+            + ", must be one of " + str(__NORMALIZE_MODES__))
+    anames = __filterAttributeNames__(attrmap, attributeListToFilter,
+        "numeric")
+    matrix = __numericMatrix__(dataset, [attrmap[aname][0]
+        for aname in anames])
+    return dict(zip(anames, __normalizeFit__(matrix, mode)))
+
 def Normalize(inAttributes, inInstances, attributeListToFilter=[],
-        multiplier=1.0):
+        multiplier=1.0, mode='minmax', parameters=None):
     '''
     Normalize accepts an attributes map "inAttributes" as returned
     by readARFF, and an instances sequence of sequences (lists or tuples,
@@ -1277,63 +5230,404 @@ def Normalize(inAttributes, inInstances, attributeListToFilter=[],
     or tuple of attribute names to convert; otherwise, Normalize runs on
     every numeric attribute. multiplier != 0.0 added 10/4/2020, used
     to scale [0.0, 1.0] default range, defaults to 1.0.
+    A ColumnarDataset inInstances is normalized a column at a time and
+    returned as a ColumnarDataset.
+    mode 'zscore' instead converts to (value - mean) / pstdev and mode
+    'robust' to (value - median) / interquartile range, each times
+    multiplier. parameters, when not None, is a map from attrname ->
+    (center, scale) as returned by normalizeParameters, usually for a
+    training set, used in place of computing them from inInstances, in
+    which case an empty attributeListToFilter means parameters' attributes.
+    Every mode rounds results to 6 places and converts values of an
+    attribute whose scale is 0.0 to 0.0. Unknown values stay unknown.
     '''
-    # print("DEBUG Normalize ats:", attributeListToFilter); sys.stdout.flush()
-    # sys.stderr.write("DEBUG Normalize ats: " + str(attributeListToFilter) + '\n'); sys.stderr.flush()
-    def __numericNormalizer__(outAttributes, outInstances,
-            aname, aindex, values):
-        # outAttributes is a deepcopy of inAttributes
-        # outInstances is a deepcopy of Instances
-        # aname is the attribute name for type declaration update
-        # aindex is its index in each instance
-        # values is the per-instance attribute-value list, in original order
-        #print("DEBUG ENTER __numericNormalizer__ aname", aname, type(outInstances))
-#       min = values[0]
-#       max = values[0]
-#       for v in values:
-#           if v < min:
-#               min = v
-#           if v > max:
-#               max = v
-#       min = float(min)
-#       max = float(max)
-#       numrange = max-min
-        # RECODED 7/21/2022 to pass over None values
-        min = None
-        max = None
-        numrange = None
-        vix = 0
-        while vix < len(values):
-            v = values[vix]
-            if v != None and not (isinstance(v,float) and numpy.isnan(v)):
-                if min == None or v < min:
-                    min = v
-                if max == None or v > max:
-                     max = v
-            vix += 1
-        if min != None and max != None:
-            min = float(min)
-            max = float(max)
-            numrange = max-min
-        if min != None and numrange > 0.0:
-            for instix in range(0, len(outInstances)):
-                if outInstances[instix][aindex] != None:
-                    outInstances[instix][aindex] = round(multiplier *
-                        ((outInstances[instix][aindex] - min) / numrange),6)
-        elif min != None:
-            for instix in range(0, len(outInstances)):
-                if outInstances[instix][aindex] != None:
-                    outInstances[instix][aindex] = 0.0
-        return (outAttributes, outInstances)
-
     if math.isclose(multiplier,0.0,rel_tol=0.0001, abs_tol=0.000001):
         raise ValueError(
             "Normalize requires numeric multiplier != 0: " + str(multiplier))
-    outAttributes, outInstances = __helpfilter__(inAttributes, inInstances,
-        attributeListToFilter, "numeric", __numericNormalizer__)
-    # print("DEBUG NORMALIZE RETURNS LEN", len(outInstances))
+    if not mode in __NORMALIZE_MODES__:
+        raise ValueError("Invalid Normalize mode: " + str(mode)
+            + ", must be one of " + str(__NORMALIZE_MODES__))
+    if parameters is not None and not attributeListToFilter:
+        attributeListToFilter = sorted(parameters.keys(),
+            key=lambda aname : inAttributes[aname][0])
+    anames = __filterAttributeNames__(inAttributes, attributeListToFilter,
+        "numeric")
+    outAttributes = copy.deepcopy(inAttributes)
+    if isinstance(inInstances, ColumnarDataset):
+        outInstances = inInstances  # replace columns, not mutate
+    else:
+        outInstances = list(__copyRows__(inInstances))  # must be mutable
+    offsets = [inAttributes[aname][0] for aname in anames]
+    matrix = __numericMatrix__(outInstances, offsets)
+    if parameters is None:
+        fitted = __normalizeFit__(matrix, mode)
+    else:
+        for aname in anames:
+            if not aname in parameters:
+                raise ValueError("Normalize parameters lack attribute: "
+                    + aname)
+        fitted = [parameters[aname] for aname in anames]
+    newcolumns = {}
+    for cix in range(0, len(offsets)):
+        center, scale = fitted[cix]
+        if center is None:
+            continue    # no known values to normalize
+        vals = matrix[:, cix]
+        unknown = numpy.isnan(vals)
+        if scale > 0.0:
+            vals = numpy.round(multiplier * ((vals - center) / scale), 6)
+        else:
+            vals = numpy.where(unknown, numpy.nan, 0.0)
+        if isinstance(outInstances, ColumnarDataset):
+            newcolumns[offsets[cix]] = ARFFColumn('numeric', vals,
+                outInstances.columns[offsets[cix]].mask)
+            continue
+        aindex = offsets[cix]
+        knownrows = numpy.flatnonzero(~unknown)
+        for instix, v in zip(knownrows.tolist(), vals[knownrows].tolist()):
+            outInstances[instix][aindex] = v
+    if newcolumns:
+        outInstances = outInstances.withColumns(newcolumns)
     return (outAttributes, outInstances)
 
+class __FittedTransform__(object):
+    # Base class of the fitted transforms. A subclass implements fit,
+    # transform, and getState & setState to and from a dict of Python
+    # literals, and lists its constructor parameters in __params__.
+    __params__ = ()
+    def fitTransform(self, attrmap, dataset):
+        '''
+        Fit to (attrmap, dataset), then return transform(attrmap, dataset).
+        '''
+        return self.fit(attrmap, dataset).transform(attrmap, dataset)
+    def transformBatches(self, attrmap, batches):
+        '''
+        Return (newattrmap, newbatches) for an iterable of datasets all
+        having the attributes in attrmap, such as the batches of iterARFF,
+        where newbatches is a generator transforming each batch on demand
+        without refitting, for example for writeARFFbatches.
+        '''
+        newattrmap = self.transform(attrmap, [])[0]
+        def __newbatches__():
+            for batch in batches:
+                yield self.transform(attrmap, batch)[1]
+        return (newattrmap, __newbatches__())
+    def isFitted(self):
+        '''Return True once fit (or setState) has learned the state.'''
+        return self.getState()['fitted'] is not None
+    def __checkFitted__(self):
+        if not self.isFitted():
+            raise ValueError(type(self).__name__
+                + " transform requires fit before use")
+    def __repr__(self):
+        return type(self).__name__ + '(' + ', '.join([name + '='
+            + repr(getattr(self, name)) for name in self.__params__]) + ')'
+
+class StringToNominalTransform(__FittedTransform__):
+    '''
+    StringToNominalTransform is StringToNominal split into fitting and
+    applying: fit learns each selected string attribute's vocabulary
+    of values, sorted, and transform converts those attributes of any
+    dataset to nominals declaring exactly that vocabulary, so every
+    batch or daily file gets the same nominal set. partialFit adds a
+    batch's values to the vocabulary, for fitting on batches in turn.
+    A value not in the vocabulary becomes unknown (None) when unseen
+    is 'unknown', else transform raises ValueError for it ('error').
+    attributeListToFilter is as for StringToNominal.
+    '''
+    __params__ = ('attributeListToFilter', 'unseen')
+    def __init__(self, attributeListToFilter=[], unseen='unknown'):
+        if not unseen in ('unknown', 'error'):
+            raise ValueError("Invalid StringToNominalTransform unseen: "
+                + str(unseen) + ", must be 'unknown' or 'error'")
+        self.attributeListToFilter = attributeListToFilter
+        self.unseen = unseen
+        self.vocabularies = None        # attrname -> set of values
+        self.categories = None          # attrname -> sorted values
+    def fit(self, attrmap, dataset):
+        '''Learn the vocabularies of dataset anew, returning self.'''
+        self.vocabularies = None
+        return self.partialFit(attrmap, dataset)
+    def partialFit(self, attrmap, dataset):
+        '''Add dataset's values to the vocabularies, returning self.'''
+        anames = __filterAttributeNames__(attrmap, self.attributeListToFilter,
+            "string")
+        if self.vocabularies is None:
+            self.vocabularies = dict([(aname, set(self.categories[aname]
+                if self.categories and aname in self.categories else ()))
+                    for aname in anames])
+        for aname in anames:
+            aindex = attrmap[aname][0]
+            if isinstance(dataset, ColumnarDataset):
+                column = dataset.columns[aindex]
+                used = numpy.unique(column.values[~column.mask])
+                values = [column.categories[ix] for ix in used.tolist()]
+            else:
+                values = set(map(operator.itemgetter(aindex), dataset))
+                values.discard(None)
+            self.vocabularies.setdefault(aname, set()).update(values)
+        self.categories = dict([(aname, sorted(vocab))
+            for aname, vocab in self.vocabularies.items()])
+        return self
+    def transform(self, attrmap, dataset):
+        '''
+        Return a new (attrmap, dataset) with the fitted attributes
+        converted to nominals, leaving the arguments unmutated.
+        '''
+        self.__checkFitted__()
+        outAttributes = copy.deepcopy(attrmap)
+        if isinstance(dataset, ColumnarDataset):
+            outInstances = dataset
+        else:
+            outInstances = list(__copyRows__(dataset))
+        newcolumns = {}
+        for aname in sorted(self.categories.keys()):
+            if attrmap[aname][1] != 'string':
+                raise TypeError("Invalid string filter attribute: " + aname
+                    + ": " + str(attrmap[aname]))
+            aindex = attrmap[aname][0]
+            liststring = list(self.categories[aname])
+            setstring = "{" + ','.join([quoteStringIfNeeded(v)
+                for v in liststring]) + "}"
+            outAttributes[aname] = (aindex, ('nominal', setstring,
+                liststring))
+            catindex = dict([(liststring[ix], ix)
+                for ix in range(0, len(liststring))])
+            if isinstance(outInstances, ColumnarDataset):
+                column = outInstances.columns[aindex]
+                remap = numpy.array([catindex.get(v, -1)
+                    for v in column.categories] + [-1], dtype=numpy.int32)
+                codes = remap[column.values]
+                self.__checkUnseen__(aname, (codes < 0) & ~column.mask,
+                    column.tolist())
+                newcolumns[aindex] = ARFFColumn('nominal', codes, codes < 0,
+                    tuple(liststring))
+                continue
+            # Each known value becomes its shared category string, as in
+            # StringToNominal, and each unseen one None, in one pass.
+            values = list(map(operator.itemgetter(aindex), outInstances))
+            symbols = dict(zip(liststring, liststring))
+            shared = list(map(symbols.get, values))
+            if shared.count(None) != values.count(None):
+                unseen = numpy.fromiter((v is not None and not v in symbols
+                    for v in values), dtype=bool, count=len(values))
+                self.__checkUnseen__(aname, unseen, values)
+            for inst, v in zip(outInstances, shared):
+                inst[aindex] = v
+        if newcolumns:
+            outInstances = outInstances.withColumns(newcolumns)
+        return (outAttributes, outInstances)
+    def __checkUnseen__(self, aname, unseen, values):
+        # Raise ValueError for the first unseen value when unseen is 'error'.
+        if self.unseen == 'error' and unseen.any():
+            raise ValueError("StringToNominalTransform value not fitted for "
+                + aname + ": " + repr(values[int(numpy.argmax(unseen))]))
+    def getState(self):
+        '''Return the parameters and fitted state as a dict of literals.'''
+        return {'attributeListToFilter' : self.attributeListToFilter,
+            'unseen' : self.unseen, 'fitted' : self.categories}
+    def setState(self, state):
+        '''Restore the parameters and fitted state saved by getState.'''
+        self.attributeListToFilter = state['attributeListToFilter']
+        self.unseen = state['unseen']
+        self.categories = state['fitted']
+        self.vocabularies = None
+        return self
+
+class NormalizeTransform(__FittedTransform__):
+    '''
+    NormalizeTransform is Normalize split into fitting and applying: fit
+    learns each selected numeric attribute's (center, scale) as in
+    normalizeParameters, and transform applies them to any dataset with
+    Normalize's parameters, so a test set or later batch is scaled like
+    the training set. partialFit adds a batch to the fitted statistics,
+    exact for 'minmax' and 'zscore', and a QuantileSketch estimate for
+    'robust'. attributeListToFilter, multiplier and mode are as for
+    Normalize.
+    '''
+    __params__ = ('attributeListToFilter', 'multiplier', 'mode')
+    def __init__(self, attributeListToFilter=[], multiplier=1.0,
+            mode='minmax'):
+        if not mode in __NORMALIZE_MODES__:
+            raise ValueError("Invalid Normalize mode: " + str(mode)
+                + ", must be one of " + str(__NORMALIZE_MODES__))
+        self.attributeListToFilter = attributeListToFilter
+        self.multiplier = multiplier
+        self.mode = mode
+        self.parameters = None          # attrname -> (center, scale)
+        self.summaries = None           # attrname -> partialFit summaries
+    def fit(self, attrmap, dataset):
+        '''Learn the parameters of dataset anew, returning self.'''
+        self.parameters = normalizeParameters(attrmap, dataset,
+            self.attributeListToFilter, self.mode)
+        self.summaries = None
+        return self
+    def partialFit(self, attrmap, dataset):
+        '''Add dataset to the fitted statistics, returning self.'''
+        anames = __filterAttributeNames__(attrmap, self.attributeListToFilter,
+            "numeric")
+        if self.summaries is None:
+            self.summaries = {}
+        matrix = __numericMatrix__(dataset, [attrmap[aname][0]
+            for aname in anames])
+        for cix in range(0, len(anames)):
+            summary = self.summaries.setdefault(anames[cix],
+                QuantileSketch() if self.mode == 'robust'
+                    else StreamingMoments())
+            summary.update(matrix[:, cix])
+        self.parameters = {}
+        for aname, summary in self.summaries.items():
+            if summary.count == 0:
+                self.parameters[aname] = (None, None)
+            elif self.mode == 'minmax':
+                self.parameters[aname] = (summary.min,
+                    summary.max - summary.min)
+            elif self.mode == 'zscore':
+                self.parameters[aname] = (summary.mean, summary.pstdev())
+            else:
+                q1, q2, q3 = summary.quantiles([0.25, 0.5, 0.75])
+                self.parameters[aname] = (q2, q3 - q1)
+        return self
+    def transform(self, attrmap, dataset):
+        '''
+        Return a new (attrmap, dataset) with the fitted attributes
+        normalized, leaving the arguments unmutated.
+        '''
+        self.__checkFitted__()
+        return Normalize(attrmap, dataset, [], self.multiplier, self.mode,
+            self.parameters)
+    def getState(self):
+        '''Return the parameters and fitted state as a dict of literals.'''
+        return {'attributeListToFilter' : self.attributeListToFilter,
+            'multiplier' : self.multiplier, 'mode' : self.mode,
+            'fitted' : self.parameters}
+    def setState(self, state):
+        '''Restore the parameters and fitted state saved by getState.'''
+        self.attributeListToFilter = state['attributeListToFilter']
+        self.multiplier = state['multiplier']
+        self.mode = state['mode']
+        self.parameters = state['fitted']
+        self.summaries = None
+        return self
+
+class DiscretizeTransform(__FittedTransform__):
+    '''
+    DiscretizeTransform is discretizeARFF split into fitting and
+    applying: fit learns the bin bounds of attrname's known values, and
+    transform bins attrname of any dataset by those bounds, so every
+    batch gets the same bins (and nominal set for attrtype 'nominal').
+    A value below the lowest bound goes in the lowest bin, one above
+    the highest in the highest. attrname, bins, attrtype and
+    useEqualFrequency and quantileEdges are as for discretizeARFF.
+    '''
+    __params__ = ('attrname', 'bins', 'attrtype', 'useEqualFrequency',
+        'quantileEdges')
+    def __init__(self, attrname, bins, attrtype, useEqualFrequency,
+            quantileEdges=False):
+        self.attrname = attrname
+        self.bins = bins
+        self.attrtype = attrtype
+        self.useEqualFrequency = useEqualFrequency
+        self.quantileEdges = quantileEdges
+        self.bounds = None              # [(lower, upper), ...]
+    def fit(self, attrmap, dataset):
+        '''Learn the bin bounds of dataset anew, returning self.'''
+        __checkDiscretizeTypes__(attrmap, self.attrname, self.attrtype)
+        attrix = attrmap[self.attrname][0]
+        if isinstance(dataset, ColumnarDataset):
+            column = dataset.columns[attrix]
+            values = column.values[~column.mask]
+        else:
+            values = [v for v in map(operator.itemgetter(attrix), dataset)
+                if v is not None and v == v]
+        self.bounds = __discretizeBounds__(values, self.bins,
+            self.useEqualFrequency, self.quantileEdges)
+        return self
+    def transform(self, attrmap, dataset):
+        '''
+        Return a new (attrmap, dataset) with attrname discretized,
+        leaving the arguments unmutated.
+        '''
+        self.__checkFitted__()
+        __checkDiscretizeTypes__(attrmap, self.attrname, self.attrtype)
+        return __discretizeRows__(attrmap, dataset, self.attrname,
+            self.attrtype, self.bounds)
+    def getState(self):
+        '''Return the parameters and fitted state as a dict of literals.'''
+        return {'attrname' : self.attrname, 'bins' : self.bins,
+            'attrtype' : self.attrtype,
+            'useEqualFrequency' : self.useEqualFrequency,
+            'quantileEdges' : self.quantileEdges,
+            'fitted' : self.bounds}
+    def setState(self, state):
+        '''Restore the parameters and fitted state saved by getState.'''
+        self.attrname = state['attrname']
+        self.bins = state['bins']
+        self.attrtype = state['attrtype']
+        self.useEqualFrequency = state['useEqualFrequency']
+        self.quantileEdges = state.get('quantileEdges', False)
+        self.bounds = state['fitted']
+        return self
+
+__TRANSFORM_CLASSES__ = {
+    'StringToNominalTransform'  :   StringToNominalTransform,
+    'NormalizeTransform'        :   NormalizeTransform,
+    'DiscretizeTransform'       :   DiscretizeTransform,
+}
+
+def saveTransforms(fname, transforms, clobber=False):
+    '''
+    Write the sequence of fitted transforms (StringToNominalTransform,
+    NormalizeTransform and DiscretizeTransform objects) to text file
+    fname as Python literals, for loadTransforms to restore without
+    refitting. clobber is as for writeARFF.
+    '''
+    if os.path.lexists(fname) and not clobber:
+        msg = 'ERROR, Please remove output file: ' + fname + '\n'
+        sys.stderr.write(msg + '\n')
+        raise RuntimeError(msg)
+    state = [(type(t).__name__, t.getState()) for t in transforms]
+    with open(fname, 'w') as outf:
+        outf.write(repr(state) + '\n')
+
+def loadTransforms(fname):
+    '''
+    Return the list of fitted transforms saved by saveTransforms in fname.
+    '''
+    with open(fname, 'r') as inf:
+        state = ast.literal_eval(inf.read())
+    result = []
+    for classname, tstate in state:
+        if not classname in __TRANSFORM_CLASSES__:
+            raise ValueError("Unknown transform class in " + fname + ": "
+                + str(classname))
+        transform = __TRANSFORM_CLASSES__[classname].__new__(
+            __TRANSFORM_CLASSES__[classname])
+        result.append(transform.setState(tstate))
+    return result
+
+def __arrayCorrelationCoefficent__(numericList1, numericList2):
+    # wekaCorrelationCoefficent with numpy array operations.
+    known = numpy.ones(len(numericList1), dtype=bool)
+    arrays = []
+    for numerics in (numericList1, numericList2):
+        if isinstance(numerics, ARFFColumn):
+            known &= ~numerics.mask
+            numerics = numerics.values
+        arrays.append(numpy.asarray(numerics, dtype=numpy.float64))
+    if not known.all():
+        arrays = [a[known] for a in arrays]
+    n = len(arrays[0])
+    diff1 = arrays[0] - arrays[0].mean()
+    diff2 = arrays[1] - arrays[1].mean()
+    avg_sumdiff_products = float(numpy.dot(diff1, diff2)) / (n-1.0)
+    avg_sumdiff_numericList1 = float(numpy.dot(diff1, diff1)) / (n-1.0)
+    avg_sumdiff_numericList2 = float(numpy.dot(diff2, diff2)) / (n-1.0)
+    divisor = math.sqrt(avg_sumdiff_numericList1 * avg_sumdiff_numericList2)
+    if divisor == 0.0:
+        return 0
+    return avg_sumdiff_products / divisor
+
 def wekaCorrelationCoefficent(numericList1, numericList2):
     '''
     PARSON NOTE http://faculty.kutztown.edu/parson/fall2017/WekaChapter5.pptx
@@ -1344,12 +5638,19 @@ def wekaCorrelationCoefficent(numericList1, numericList2):
     Length principle.
     http://faculty.kutztown.edu/parson/fall2017/CSC458EvalNumericPrediction.ppt
     Following from slide 11, essentially same result as scipy.stats.pearsonr
+    Either argument may also be a numpy array, such as a numpy.memmap
+    column, or a 'numeric' ARFFColumn, in which case the coefficient is
+    computed with numpy array operations, over only those rows where both
+    ARFFColumn values are known.
     '''
     def sqr(v):
         return v * v
-    if len(numericList1) != len(numericList1):
+    if len(numericList1) != len(numericList2):
         raise ValueError("Mismatched wekaCorrelationCoefficent arg lengths: "
             + str(len(numericList1)) + "," + str(len(numericList2)))
+    if isinstance(numericList1, (ARFFColumn, numpy.ndarray)) \
+            or isinstance(numericList2, (ARFFColumn, numpy.ndarray)):
+        return __arrayCorrelationCoefficent__(numericList1, numericList2)
     mean_numericList1 = numpy.mean(numericList1)
     mean_numericList2 = numpy.mean(numericList2)
     # print("DEBUG mean_numericList[12]", type(mean_numericList1), type(mean_numericList2))
@@ -1379,6 +5680,148 @@ def wekaCorrelationCoefficent(numericList1, numericList2):
     return CorrelationCoefficent
 
 
+class CorrelationMatrix(object):
+    '''
+    CorrelationMatrix computes wekaCorrelationCoefficent for every pair of
+    the numeric attributes of attrmap selected by attributeListToFilter,
+    as for Normalize (all numeric attributes when it is empty), over the
+    batches of a relation added by update. Each pair's coefficient uses
+    the rows where both values are known (pairwise deletion of None and
+    numpy.nan). Per pair of attributes it holds the count of such rows,
+    each attribute's mean and sum of squared deviations over them, and
+    their sum of products of deviations, as numpy matrices. update adds a
+    batch (a 2D list or ColumnarDataset) with a few matrix products over
+    the batch's values, shifted by their column means for accuracy and
+    zero where unknown, and merge combines these sums of a disjoint batch
+    or CorrelationMatrix with the pairwise formulas of Chan et al., as
+    StreamingMoments does, for example from parallel processes. Results
+    agree with wekaCorrelationCoefficent to rounding, unless unknowns
+    leave a pair's rows with a mean far from the attribute's batch mean
+    relative to their spread, when the shift cancels less precisely.
+    names lists the selected attribute names in matrix order.
+    '''
+    def __init__(self, attrmap, attributeListToFilter=[]):
+        self.names = __filterAttributeNames__(attrmap, attributeListToFilter,
+            'numeric')
+        self.offsets = [attrmap[name][0] for name in self.names]
+        p = len(self.names)
+        self.counts = numpy.zeros((p, p), dtype=numpy.float64)
+        self.means = numpy.zeros((p, p), dtype=numpy.float64)   # of row's
+        self.m2 = numpy.zeros((p, p), dtype=numpy.float64)      # of row's
+        self.comoments = numpy.zeros((p, p), dtype=numpy.float64)
+    def __combine__(self, counts, means, m2, comoments):
+        # Chan et al.'s merge of the pairwise sums of a disjoint batch.
+        total = self.counts + counts
+        weight = numpy.divide(counts, total, out=numpy.zeros_like(total),
+            where=total > 0)
+        delta = means - self.means
+        self.comoments += comoments + delta * delta.T * self.counts * weight
+        self.m2 += m2 + delta * delta * self.counts * weight
+        self.means += delta * weight
+        self.counts = total
+    def update(self, dataset):
+        '''
+        Add a batch of instances, a 2D list or ColumnarDataset.
+        '''
+        matrix = __numericMatrix__(dataset, self.offsets)
+        known = ~numpy.isnan(matrix)
+        present = known.astype(numpy.float64)
+        columnCounts = present.sum(axis=0)
+        shift = numpy.divide(numpy.where(known, matrix, 0.0).sum(axis=0),
+            columnCounts, out=numpy.zeros(len(self.offsets)),
+                where=columnCounts > 0)
+        shifted = numpy.where(known, matrix - shift, 0.0)
+        counts = present.T @ present
+        sums = shifted.T @ present          # [i, j]: of attribute i's values
+        squares = (shifted * shifted).T @ present
+        products = shifted.T @ shifted
+        means = numpy.divide(sums, counts, out=numpy.zeros_like(counts),
+            where=counts > 0)
+        self.__combine__(counts, means + shift[:, numpy.newaxis],
+            squares - sums * means, products - sums * means.T)
+    def merge(self, other):
+        '''
+        Add the sums of other, a CorrelationMatrix of the same attributes
+        over a disjoint part of the relation.
+        '''
+        if other.names != self.names:
+            raise ValueError("CorrelationMatrix merge requires the same "
+                + "attributes: " + str(self.names) + " != " + str(other.names))
+        self.__combine__(other.counts, other.means, other.m2,
+            other.comoments)
+    def coefficients(self):
+        '''
+        Return the 2D list of coefficients indexed [row][column] in names
+        order, 0 when an attribute is constant over the pair's rows as in
+        wekaCorrelationCoefficent, and None (unknown) for a pair with
+        fewer than 2 rows where both are known.
+        '''
+        divisor = numpy.sqrt(self.m2 * self.m2.T)
+        result = numpy.divide(self.comoments, divisor,
+            out=numpy.zeros_like(divisor), where=divisor > 0)
+        result = result.tolist()
+        for i, j in zip(*numpy.nonzero(self.counts < 2)):
+            result[i][j] = None
+        return result
+    def coefficient(self, name1, name2):
+        '''
+        Return the coefficient of the attributes named name1 and name2.
+        '''
+        i = self.names.index(name1)
+        j = self.names.index(name2)
+        if self.counts[i, j] < 2:
+            return None
+        divisor = math.sqrt(self.m2[i, j] * self.m2[j, i])
+        return float(self.comoments[i, j]) / divisor if divisor > 0 else 0
+
+def correlationMatrixARFF(attrmap, dataset, attributeListToFilter=[]):
+    '''
+    Return the CorrelationMatrix of the numeric attributes of attrmap,
+    dataset selected by attributeListToFilter (all of them when it is
+    empty), whose coefficients() are the wekaCorrelationCoefficent of
+    every pair with pairwise deletion of unknown values, computed in
+    one vectorized pass over a 2D list or ColumnarDataset dataset.
+    '''
+    matrix = CorrelationMatrix(attrmap, attributeListToFilter)
+    matrix.update(dataset)
+    return matrix
+
+def __correlationARFFrange__(task):
+    fname, amap, start, end, attributeListToFilter = task
+    matrix = CorrelationMatrix(amap, attributeListToFilter)
+    matrix.update(__readColumnar__(__rangeText__(fname, start, end), amap))
+    return matrix
+
+def correlationMatrixARFFfile(fname, attributeListToFilter=[], workers=1):
+    '''
+    correlationMatrixARFF of ARFF file fname, which may be too large to
+    hold in memory, returning a CorrelationMatrix. As in streamStatsARFF,
+    the @data section is parsed in byte ranges of about 1 MB each, whose
+    CorrelationMatrix sums are merged in file order; workers > 1 parses
+    ranges in that many processes, None meaning os.cpu_count(). A '.gz'
+    fname is streamed serially by iterARFF.
+    '''
+    if fname.endswith('.gz'):
+        amap, batches = iterARFF(fname, 100000, columnar=True)
+        matrix = CorrelationMatrix(amap, attributeListToFilter)
+        for batch in batches:
+            matrix.update(batch)
+        return matrix
+    with open(fname, 'r') as af:
+        amap = __getAttrIndices__(af)
+        start = af.tell()
+    matrix = CorrelationMatrix(amap, attributeListToFilter)
+    end = os.path.getsize(fname)
+    cuts = __recordBoundaries__(fname, start, end,
+        max(1, (end - start) // __STATS_RANGE__))
+    tasks = [(fname, amap, cuts[ix], cuts[ix+1], attributeListToFilter)
+        for ix in range(0, len(cuts)-1)]
+    if tasks:
+        for chunk in __parallelMap__(__correlationARFFrange__, tasks,
+                __poolWorkers__(workers, len(tasks))):
+            matrix.merge(chunk)
+    return matrix
+
 def DEBUGNonesARFF(attrmap, dataset, outfile=sys.stderr):
     '''
     Print to outfile statistics on number of unknown (None)
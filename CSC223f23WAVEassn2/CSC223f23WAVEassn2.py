@@ -28,6 +28,10 @@ file. My output matches the output for the reffile.
 #       WaveType Frequency SampleRate Duration DutyCycle, where
 # Output: CSC223f23WAVEassn2.csv contains the headers + wave samples,
 #       one waveform per column, one sample per row.
+#       Optional command line OUTFILE.wav and OUTFILE.raw receive the same
+#       samples as 16-bit PCM, one channel per waveform, via streamWaves.
+#       CSC223f23WAVEassn2mix.csv (and OUTFILEmix.wav, OUTFILEmix.raw)
+#       contain one column per Mix described in the input file (below).
 #       1. WaveType is one of
 #           'triangle'      Triangle wave starting at lowest point at time 0.
 #               Signal rises linearly from min value to max value at halfway
@@ -66,6 +70,23 @@ file. My output matches the output for the reffile.
 #          than 0% and less than 100%. A regular square wave has a
 #          DutyCycle=0.5. DutyCycle is ignored for all except pulse wave.
 #       https://learn.sparkfun.com/tutorials/pulse-width-modulation/duty-cycle
+#       Optional columns Mix Weight Phase Seed follow DutyCycle. A row with
+#       a non-empty Mix name is not a CSV column; it adds a source to the
+#       WaveMix of that name, and all sources of a mix are summed:
+#       6. Mix names the mix. Its rows must share a SampleRate.
+#       7. Weight (float, default 1.0) scales the source before summing;
+#          the sum is clipped to [-32767, 32767].
+#       8. Phase (float, default 0.0) is the source's starting fraction of
+#          a cycle, so 0.25 shifts it by 90 degrees.
+#       9. Seed (int >= 0, default 0) seeds a 'whitenoise' or 'pinknoise'
+#          source, which WaveType may also be in a Mix row. A noise source
+#          uses Frequency and Duration only to determine its length.
+#       Mix sources run in real time at their own Frequency, so Duration
+#       cycles of a 3000.0 Hz source last as long as Duration/3 cycles of a
+#       1000.0 Hz source; each source lasts ceil(period*Duration/sampleTime)
+#       samples and the mix lasts as long as its longest source. Mixes
+#       of different lengths share one output, so shorter mixes are
+#       padded with silence (0) to the longest.
 #
 #       Implementation considerations:
 #           In [43]: from math import ceil
@@ -89,8 +110,10 @@ file. My output matches the output for the reffile.
 import sys          # Used for argv command line arguments
 import csv
 from statistics import mean, median, pstdev, stdev
-import random       # May inject some random white noise in a later extension.
 import math         # from math import ceil, pi, sin, cos
+import os
+import multiprocessing
+import wave
 import numpy as np  # For its arrays of type
 # https://numpy.org/doc/stable/reference/arrays.html
 # https://numpy.org/doc/stable/reference/arrays.scalars.html#numpy.int16
@@ -99,14 +122,8 @@ import numpy as np  # For its arrays of type
 # generation per SciPy .wav file reading and writing.
 # https://docs.scipy.org/doc/scipy/reference/io.html#module-scipy.io.wavfile
 # However, the computation will range from [-1.0, 1.0] * 32767.0, with
-# rounding to the nearest int and clamping to np.int16 via min() and max().
-
-def __scalePercentToWavRange__(percentAsAFraction):
-    assert (percentAsAFraction >= -1.0 and percentAsAFraction <= 1.0),  \
-        '__scalePercentToWavRange__ percentAsAFraction outside range '  \
-        '[-1.0, 1.0]: ' + str(percentAsAFraction)
-    tmp = round(percentAsAFraction * 32767)
-    return np.int16(min(max(-32767,tmp), 32767))
+# rounding to the nearest int and clamping to np.int16 in
+# __scaleFractionsToWavRange__ below.
 
 def __getstats__(dataname, datalist, statsfilehndl):
     '''
@@ -141,247 +158,187 @@ def __getstats__(dataname, datalist, statsfilehndl):
 #   statsfilehndl.write('    mode = ' + modestr + '\n')
     statsfilehndl.write('    pstdev = ' + pstdevstr + '\n')
 
-# STUDENT NOTE FOR COMPUTING INDICES INTO THE SAMPLE VECTOR.
-# Use "//" integer division or math.floor() or math.ceil() WHERE
-# NEEDED to get int (not float) indices into the vector.
-# Not all waveform types need that.
-def genSamples(wavetype, samples, wavecol, table2D, dutyCycle,
-        statsfileh=None):
-    # Each nested helper function has access to input parameters.
-    # STUDENT 2: 19% Write function genTri() to generate a triangle wave
-    # that starts at the min sample value of -32767
-    # (i.e., __scalePercentToWavRange__(-1.0)), rises to 32767 at the
-    # halfway sample (__scalePercentToWavRange__(1.0)), then descends to
-    # -32767 at the final sample.
-    # Add documentation comments below the function declaration
-    # as I have for genSine() and genRiseSaw(), per the Output documentation
-    # starting below line 18 above for this waveform type.
-    def genTri(samples, table2D, wavecol):
-        #halfway sample calculation
-        halfway = samples // 2
-        
-        #increment calculation should incorperate the halfway sample index
-        increment = (2 * 32767) / halfway
-        
-        #ready to generate the triangle waveform samples here
-        for i in range(samples):
-            if i < halfway:
-                #INCREASE the sample (linearly) fromm the start to halfway.
-                #       /\      both the decending and ascending parts of
-                #      /  \     the wave are straight lines, so that makes
-                #     /    \    it an easy linear relationship.
-                #    /      \
-                #    --------
-
-                value = -32767 + i * increment
-            else: #otherwise, it will be from halfway to the end. DECREASE the sample value (also linear)
-                value = 32767 - (i - halfway) * increment
-            
-            #store the value in the table here
-            table2D[i][wavecol] = value
-            #pass
-    
-    
-    def genSine(samples, table2D, wavecol):
-        '''
-        Sine wave starting at lowest point at time 0.
-        radians([-90,270] degrees for 1 complete cycle
-        https://www.mathopenref.com/triggraphsine.html
-        '''
-        startRadians = - math.pi / 2.0 # 2PI is 360 degrees, this is -90
-        stepRadians = (2.0 * math.pi) / (samples-1) # full 360 cut into pieces
-        curRadians = startRadians
-        for step in range(0, samples):
-            table2D[step][wavecol] = __scalePercentToWavRange__(
-                math.sin(curRadians))
-            curRadians += stepRadians
-    # STUDENT 3: 19% Write function genCosine() to generate a cosine wave
-    # that starts at the max sample value of 32767
-    # (i.e., __scalePercentToWavRange__(-1.0)), falls to -32767 at the
-    # halfway point (__scalePercentToWavRange__(1.0)), then ascends to
-    # 32767 at the final sample. YOU MUST USE THE math.cos() function.
-    # Add documentation comments below the function declaration
-    # as I have for genSine() and genRiseSaw(), per the Output documentation
-    # starting below line 18 above for this waveform type.
-    def genCosine(samples, table2D, wavecol):
-        #radians calculation
-        radians = (2 * math.pi) / (samples - 1)
-        
-        #keep track of the radians here
-        current_radians = 0
-        
-        '''
-        A cosine wave looks like this:
-        32767 |--           ---           ---           --
-              |  \         /   \         /   \         / 
-             0|   |       |     |       |     |       |  
-              |    \     /       \     /       \     /   
-       -32767 |      \_/           \_/           \_/     ...
-        
-        Meaning the start should be at the highest value, gradually get steeper,
-        pass 0, gradually get flatter, reach the bottomm and go back up.
-        '''
-        #generate cos samples for the table
-        for i in range (samples):
-            cos_value = math.cos(current_radians)
-            
-            #store it in the list here
-            table2D[i][wavecol] = __scalePercentToWavRange__(cos_value)
-            
-            #increment radians
-            current_radians += radians
-        #pass
-    # STUDENT 4: 19% Write function genSquare() to generate a square wave
-    # that starts at the min sample value of -32767
-    # (i.e., __scalePercentToWavRange__(-1.0)), rises immediately to 32767 at
-    # the halfway point (__scalePercentToWavRange__(1.0)), then stays at
-    # 32767 through the final sample.
-    # Add documentation comments below the function declaration
-    # as I have for genSine() and genRiseSaw(), per the Output documentation
-    # starting below line 18 above for this waveform type.
-    def genSquare(samples, table2D, wavecol):
-    
-        #for i in range(samples):
-            #print("Inside genSquare - table2D[", i, "] type:", type(table2D[i]))
-    
-        #calculate the halfway sample here
-        halfway = samples // 2
-        
-        '''
-        Lets figure out the shape of the graph we're trying to make here.
-        So if it is a square, we can visuize where each of the lines will fall
-        like this:
-        
-        32767 |--------|       |--------|       |--------|
-              |        |       |        |       |        |
-            0 |--------|       |--------|       |--------|
-              |        |       |        |       |        |
-       -32767 |--------|       |--------|       |--------|...
-        
-        The graphs show a few basic but key information pieces that are critical
-        to understanding how we need to shape the formulas:
-            1. The first half of the wave is at the minimum value (−32767).
-            2. The second half of the wave is at the maximumm value (32767).
-            3. The shape of the graph is repeated over and over
-            4. The graph starts at the mmin value ((-32767). Once it hits its
-               halfway point, it immediately jumps to its mmmax value (32767).
-               This is what gives the graph the 'square' shape. Note that the
-               graph stays at its peak value until the end of the wave's cycle.
-               Repeat.
-        '''
-        
-        #generate square waveformm samples now
-        for i in range(samples):
-            if i < halfway:
-                # from the start to the halfway point, use the bottom point
-                value = -32767
-            else:
-                #now do the other half, halfway to the end, but use the MAX value
-                value = 32767
-            
-            # now store the value in the table here
-            table2D[i][wavecol] = value
-        #pass
-    # STUDENT 5: 19% Write function genPulse() to generate a pulse wave
-    # that starts at the min sample value of -32767
-    # (i.e., __scalePercentToWavRange__(-1.0)), rises immediately to 32767 at
-    # the DutyCycle point before the end (__scalePercentToWavRange__(1.0)),
-    # then stays at 32767 through the final sample.
-    # Add documentation comments below the function declaration
-    # as I have for genSine() and genRiseSaw(), per the Output documentation
-    # starting below line 18 above for this waveform type.
-    
+# Whole-column waveform engine. Every waveform is a function of the
+# fraction of its current cycle, so a column (or any block of a column)
+# is computed in a few NumPy operations instead of one Python-level
+# scaling call per sample. Blocks depend only on their sample indices,
+# so long renders split across processes.
+__WAVE_PEAK__ = 32767
+__BLOCK_SAMPLES__ = 1 << 16     # Samples per block for renderWaves.
+
+def waveSampleCount(frequency, sampleRate, duration=1):
     '''
-    ***IMPORTANT***
-    If 'DutyCycle' (DC) represents the part the waveform's period where:
-        1. signal is on (32767) when TS == 33
-        2. signal turns back off (-32767) when a full cycle completes at TS == 0
-           !!**!!**(1 PERIOD IS 45, NOT 44. IT BEGINS AT 0, which is the 1st TS)**!!**!!
-    We can model this behaviour using a simple fraction:
-    
-                    duration of the high     12
-        DutyCycle = --------------------- = ----
-                    total period duration    45
-    
-    DutyCycle = 0.266666666666...
-    
-    NEVERMIND, DutyCycle IS ALREADY 0.25. DELETE. DELETE
-    
+    Return the number of samples for duration cycles of a wave of
+    frequency hertz at sampleRate samples per second, i.e.,
+    ceil((period*Duration)/sampleTime) per the header comments.
     '''
-    def genPulse(samples, table2D, wavecol):
-        '''
-        Pulse waveform starting at the lowest point (-23767) at 0.
-        The waveform immediately jumps to its max value at the DutyCycle point
-        before the end and remains at that value until the end of the wave's cycle.
-        '''
-        
-        DutyCycle = 0.25
+    period = 1.0 / frequency
+    sampleTime = 1.0 / sampleRate
+    return math.ceil((period * duration) / sampleTime)
 
-        # Calculate the sample number where the wave should rise
-        rise_point = int((1 - DutyCycle) * samples)
-        
-        for i in range(samples):
-            #print("Inside genPulse - table2D type:", type(table2D), "table2D[", i, "] type:"''', type(table2D[i])''')
-            if i < rise_point:
-                # From the start to the rise point, use the bottom value
-                value = -32767
-            else:
-                # From the rise point to the end, use the MAX value
-                value = 32767
-            
-            # Make that table
-            #print(i, table2D[i])
-            table2D[i][wavecol] = value
-        
-        #pass
-    def genRiseSaw(samples, table2D, wavecol):
-        '''
-        Rising sawtooth starting at lowest point at time 0.
-        Signal rises linearly from min value to max value at end.
-        '''
-        # This goes from -1.0 to 1.0, a distance of 2.0, in all
-        # the samples, using (sample-1) because it is that many steps
-        # up from the min to the max.
-        stepsize = 2 / (samples-1)   # distance / steps up from 0
-        current_value = -1.0
-        for step in range(0, samples):
-            intvalue = __scalePercentToWavRange__(current_value)
-            table2D[step][wavecol] = intvalue
-            current_value += stepsize
-    # STUDENT 6: 19% Write function genFallSaw() to generate a falling sawtooth
-    # wave that starts at the max sample value of 32767
-    # (i.e., __scalePercentToWavRange__(1.0)), falls incrementally to -32767
-    # at the final sample.
-    # Add documentation comments below the function declaration
-    # as I have for genSine() and genRiseSaw(), per the Output documentation
-    # starting below line 18 above for this waveform type.
-    def genFallSaw(samples, table2D, wavecol):
-        '''
-        Falling sawtooth starting at highest point (32767) at time 0.
-        Signal falls linearly from max value to min value at end.
-        
-        This goes from 1.0 to -1.0, a distance of -2.0, in all
-        the samples, using (sample-1) because it is that many steps
-        down from the max to the min (!RECHECK THIS LATER)
-        distance / steps down from 0
-        '''
-        
-        stepsize = -2 / (samples-1)
-        current_value = 1.0
-        for step in range(samples):
-            intvalue = __scalePercentToWavRange__(current_value)
-            
-            # table + counter
-            table2D[step][wavecol] = intvalue
-            current_value += stepsize
-
-        #pass
-    generators = {'triangle' : genTri,
-        'sine' : genSine, 'cos': genCosine,
-        'square' : genSquare, 'pulse' : genPulse,
-        'risingsaw' : genRiseSaw, 'fallingsaw' : genFallSaw}
-    f = generators[wavetype]    # Select generator based on its string name.
-    f(samples, table2D, wavecol)                         # Invoke that column data generator.
+def __scaleFractionsToWavRange__(fractions):
+    # Scale fractions in [-1.0, 1.0] by 32767: round half to even like
+    # round(), clamp to [-32767, 32767], and convert to np.int16.
+    scaled = np.rint(np.multiply(fractions, __WAVE_PEAK__))
+    np.clip(scaled, -__WAVE_PEAK__, __WAVE_PEAK__, out=scaled)
+    return scaled.astype(np.int16)
+
+def __cyclePosition__(start, stop, samples, duration):
+    # Return (position, cycle) for each sample in [start, stop), where
+    # position counts cycles since sample 0 and cycle is the index of the
+    # cycle the sample belongs to. The samples-1 steps span all duration
+    # cycles, so the final sample closes the last cycle and an interior
+    # cycle boundary opens the next cycle.
+    position = np.arange(start, stop, dtype=float) * duration / (samples-1)
+    cycle = np.minimum(np.floor(position), duration - 1)
+    return position, cycle
+
+def __cyclePhase__(start, stop, samples, duration):
+    # Fraction [0.0, 1.0] of its cycle for each sample in [start, stop).
+    position, cycle = __cyclePosition__(start, stop, samples, duration)
+    position -= cycle
+    return position
+
+def __sawRamp__(start, stop, samples, duration):
+    # Rising ramp [-1.0, 1.0] per cycle for samples in [start, stop).
+    # It accumulates its step like the original per-sample loop did, so
+    # the reference output's rounding at exact half steps is reproduced;
+    # accumulation restarts from the exact value at every multiple of
+    # __BLOCK_SAMPLES__, which bounds drift and makes any block identical
+    # to the same samples of a whole column. Cycle boundaries come from
+    # the exact sample positions.
+    step = 2.0 * duration / (samples - 1)
+    first = (start // __BLOCK_SAMPLES__) * __BLOCK_SAMPLES__
+    ramp = np.full(stop - first, step)
+    for lo in range(first, stop, __BLOCK_SAMPLES__):
+        segment = ramp[lo-first:lo-first+__BLOCK_SAMPLES__]
+        segment[0] = -1.0 + lo * step
+        np.add.accumulate(segment, out=segment)
+    ramp = ramp[start-first:]
+    position, cycle = __cyclePosition__(start, stop, samples, duration)
+    ramp -= 2.0 * cycle
+    np.clip(ramp, -1.0, 1.0, out=ramp)
+    return ramp
+
+def __shapeTriangle__(phase, dutyCycle):
+    # Triangle from min at 0.0 to max at 0.5 of the cycle back to min.
+    return np.where(phase < 0.5, 4.0 * phase - 1.0, 3.0 - 4.0 * phase)
+
+def __shapeSine__(phase, dutyCycle):
+    # Sine over radians [-90, 270] degrees, starting at its lowest point.
+    return np.sin(2.0 * math.pi * phase - math.pi / 2.0)
+
+def __shapeCosine__(phase, dutyCycle):
+    # Cosine over radians [0, 360] degrees, starting at its highest point.
+    return np.cos(2.0 * math.pi * phase)
+
+def __shapeSquare__(phase, dutyCycle):
+    # Square wave, the same as a pulse with a 0.5 dutyCycle.
+    return __shapePulse__(phase, 0.5)
+
+def __shapePulse__(phase, dutyCycle):
+    # Min level, then max level for the final dutyCycle of each cycle.
+    return np.where(phase < 1.0 - dutyCycle, -1.0, 1.0)
+
+def __shapeRiseSaw__(phase, dutyCycle):
+    # Rising sawtooth from min at the start to max at the end of a cycle.
+    return 2.0 * phase - 1.0
+
+def __shapeFallSaw__(phase, dutyCycle):
+    # Falling sawtooth from max at the start to min at the end of a cycle.
+    return 1.0 - 2.0 * phase
+
+# Each shape maps cycle fractions [0.0, 1.0] to levels [-1.0, 1.0].
+__PHASE_SHAPES__ = {'triangle' : __shapeTriangle__,
+    'sine' : __shapeSine__, 'cos' : __shapeCosine__,
+    'square' : __shapeSquare__, 'pulse' : __shapePulse__,
+    'risingsaw' : __shapeRiseSaw__, 'fallingsaw' : __shapeFallSaw__}
+# renderWave columns of saws use __sawRamp__ times this sign instead.
+__SAW_SIGNS__ = {'risingsaw' : 1.0, 'fallingsaw' : -1.0}
+
+def renderWave(wavetype, samples, dutyCycle, duration=1, start=0,
+        stop=None):
+    '''
+    Return the np.int16 samples [start, stop) of a wave column of
+    samples samples holding duration complete cycles of wavetype, one of
+    the WaveType names in the header comments. stop defaults to samples.
+    dutyCycle is the fraction of each cycle at the top of a 'pulse'.
+    '''
+    if wavetype not in __PHASE_SHAPES__:
+        raise ValueError("Unsupported waveform type: " + str(wavetype))
+    if samples < 2 or duration < 1:
+        raise ValueError("renderWave REQUIRES samples >= 2 AND "
+            + "duration >= 1: " + str(samples) + ', ' + str(duration))
+    if not (0.0 < dutyCycle < 1.0):
+        raise ValueError("renderWave dutyCycle OUTSIDE (0.0, 1.0): "
+            + str(dutyCycle))
+    if stop is None:
+        stop = samples
+    if not (0 <= start <= stop <= samples):
+        raise ValueError("renderWave BAD SAMPLE RANGE [" + str(start)
+            + ', ' + str(stop) + ') FOR ' + str(samples) + ' samples')
+    if start == stop:
+        return np.empty(0, dtype=np.int16)
+    if wavetype in __SAW_SIGNS__:
+        fractions = __sawRamp__(start, stop, samples, duration)
+        fractions *= __SAW_SIGNS__[wavetype]
+    else:
+        fractions = __PHASE_SHAPES__[wavetype](
+            __cyclePhase__(start, stop, samples, duration), dutyCycle)
+    return __scaleFractionsToWavRange__(fractions)
+
+def __renderBlock__(task):
+    # Worker entry for renderWaves: task is (spec, start, stop).
+    (wavetype, samples, dutyCycle, duration), start, stop = task
+    return renderWave(wavetype, samples, dutyCycle, duration, start, stop)
+
+def renderWaves(waves, workers=1, blockSize=__BLOCK_SAMPLES__):
+    '''
+    Render a list of waves, each a (wavetype, samples, dutyCycle, duration)
+    tuple of renderWave parameters, and return a list of their np.int16
+    sample columns. Columns are rendered in blocks of blockSize samples,
+    in a pool of up to workers processes (None for os.cpu_count()) when
+    there are many waves or long durations, else in this process.
+    '''
+    if blockSize < 1:
+        raise ValueError("renderWaves REQUIRES blockSize >= 1: "
+            + str(blockSize))
+    tasks = []
+    for spec in waves:
+        samples = spec[1]
+        for start in range(0, samples, blockSize):
+            tasks.append((spec, start, min(start + blockSize, samples)))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("renderWaves REQUIRES workers >= 1: "
+            + str(workers))
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        blocks = [__renderBlock__(t) for t in tasks]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            blocks = pool.map(__renderBlock__, tasks, chunksize=1)
+    columns = []
+    nextblock = 0
+    for spec in waves:
+        column = np.empty(spec[1], dtype=np.int16)
+        for start in range(0, spec[1], blockSize):
+            block = blocks[nextblock]
+            column[start:start+len(block)] = block
+            nextblock += 1
+        columns.append(column)
+    return columns
+
+def genSamples(wavetype, samples, wavecol, table2D, dutyCycle,
+        statsfileh=None, duration=1):
+    '''
+    Fill column wavecol of table2D with samples samples holding duration
+    complete cycles of wavetype (see renderWave), and write that column's
+    statistics to statsfileh when it is not None.
+    '''
+    table2D[:, wavecol] = renderWave(wavetype, samples, dutyCycle,
+        duration)
     if statsfileh != None:
         column = table2D.take(indices=wavecol, axis=1).astype(float)
         # axis gives dimension, indices gives where in that dimension
@@ -392,38 +349,262 @@ def genSamples(wavetype, samples, wavecol, table2D, dutyCycle,
         # https://numpy.org/doc/stable/reference/generated/numpy.ndarray.astype.html
         # print("DEBUG COLUMN", wavecol, column)
         __getstats__(wavetype, column, statsfileh)
-        
-    #MUST check the waveform type and generate the sample for the specific one
-    if wavetype == 'triangle':
-        genTri(samples, table2D, wavecol)
-    elif wavetype == 'sine':
-        genSine(samples, table2D, wavecol)
-    elif wavetype == 'cos':
-        genCosine(samples, table2D, wavecol)
-    elif wavetype == 'square':
-        genSquare(samples, table2D, wavecol)
-    elif wavetype == 'pulse':
-        genPulse(samples, table2D, wavecol)
-    elif wavetype == 'risingsaw':
-        genRiseSaw(samples, table2D, wavecol)
-    elif wavetype == 'fallingsaw':
-        genFallSaw(samples, table2D, wavecol)
-    #to prevent nothingness and crashes
-    else:
-        raise ValueError(f"Unsupported waveform type: {wavetype}")
 
 
-__usage__ = 'USAGE: python CSC223f23WAVEassn2.py'
+# Additive composition. A WaveMix sums weighted sources into one float
+# buffer per block and clips the sum to [-32767, 32767] only once, so
+# dozens of sources cost one vectorized pass each. Noise is drawn per
+# aligned __BLOCK_SAMPLES__ block from a generator seeded by (seed, block
+# number), so it is repeatable regardless of how a render is split.
+__PINK_ROWS__ = 16      # Voss-McCartney rows; 1 << 16 fills a block.
+
+def __whiteNoise__(rng, count):
+    # Uniform white noise in [-1.0, 1.0).
+    return rng.uniform(-1.0, 1.0, count)
+
+def __pinkNoise__(rng, count):
+    # Voss-McCartney pink noise: row k holds a random level for 1 << k
+    # samples, so the summed rows fall off at about 3 dB per octave.
+    # Dividing by the root of the row count keeps white noise's RMS.
+    total = rng.uniform(-1.0, 1.0, count)
+    for row in range(__PINK_ROWS__):
+        held = rng.uniform(-1.0, 1.0, (count >> row) + 1)
+        total += np.repeat(held, 1 << row)[:count]
+    total /= math.sqrt(__PINK_ROWS__ + 1)
+    return total
+
+__NOISE_GENERATORS__ = {'whitenoise' : __whiteNoise__,
+    'pinknoise' : __pinkNoise__}
+
+def __noiseBlocks__(noisetype, seed, start, stop):
+    # Noise samples [start, stop), drawn a whole aligned block at a time.
+    generate = __NOISE_GENERATORS__[noisetype]
+    first = (start // __BLOCK_SAMPLES__) * __BLOCK_SAMPLES__
+    noise = np.empty(stop - first)
+    for lo in range(first, stop, __BLOCK_SAMPLES__):
+        rng = np.random.default_rng([seed, lo // __BLOCK_SAMPLES__])
+        segment = noise[lo-first:lo-first+__BLOCK_SAMPLES__]
+        segment[:] = generate(rng, __BLOCK_SAMPLES__)[:len(segment)]
+    return noise[start-first:]
+
+class WaveMix(object):
+    '''
+    WaveMix is a named additive mix of weighted periodic waves and seeded
+    noise sources at sampleRate samples per second. Unlike a renderWave
+    column, a source in a mix runs in real time: sample i of a wave is at
+    phase + frequency * i / sampleRate cycles, so sources of different
+    frequencies stay in tune with each other. Each source lasts for its
+    own samples; the mix lasts for the longest. render() returns the sum
+    clipped to the np.int16 wave range; a WaveMix may also be passed to
+    streamWaves as a channel.
+    '''
+    def __init__(self, name, sampleRate):
+        if sampleRate <= 0:
+            raise ValueError("WaveMix sampleRate MUST BE > 0: "
+                + str(sampleRate))
+        self.name = name
+        self.sampleRate = sampleRate
+        self.samples = 0
+        # (wavetype, frequency, samples, weight, phase, dutyCycle)
+        self.waves = []
+        # (noisetype, samples, weight, seed)
+        self.noises = []
+    def addWave(self, wavetype, frequency, samples, weight=1.0, phase=0.0,
+            dutyCycle=0.5):
+        '''
+        Add samples samples of wavetype at frequency hertz, scaled by
+        weight, starting at phase, a fraction of a cycle (0.25 is 90
+        degrees). dutyCycle is the fraction at the top of a 'pulse'.
+        '''
+        if wavetype not in __PHASE_SHAPES__:
+            raise ValueError("Unsupported waveform type: " + str(wavetype))
+        if frequency <= 0.0 or samples < 1:
+            raise ValueError("WaveMix.addWave REQUIRES frequency > 0 AND "
+                + "samples >= 1: " + str(frequency) + ', ' + str(samples))
+        if not (0.0 < dutyCycle < 1.0):
+            raise ValueError("WaveMix.addWave dutyCycle OUTSIDE (0.0, 1.0): "
+                + str(dutyCycle))
+        self.waves.append((wavetype, frequency, samples, weight, phase,
+            dutyCycle))
+        self.samples = max(self.samples, samples)
+    def addNoise(self, noisetype, samples, weight=1.0, seed=0):
+        '''
+        Add samples samples of noisetype, 'whitenoise' or 'pinknoise',
+        scaled by weight. Equal seeds (ints >= 0) give equal noise.
+        '''
+        if noisetype not in __NOISE_GENERATORS__:
+            raise ValueError("Unsupported noise type: " + str(noisetype))
+        if samples < 1 or seed < 0:
+            raise ValueError("WaveMix.addNoise REQUIRES samples >= 1 AND "
+                + "seed >= 0: " + str(samples) + ', ' + str(seed))
+        self.noises.append((noisetype, samples, weight, int(seed)))
+        self.samples = max(self.samples, samples)
+    def mixFractions(self, start, stop):
+        '''
+        Return the unclipped float sum of all sources for samples
+        [start, stop), in units of the wave range [-1.0, 1.0].
+        '''
+        if not (0 <= start <= stop <= self.samples):
+            raise ValueError("WaveMix BAD SAMPLE RANGE [" + str(start)
+                + ', ' + str(stop) + ') FOR ' + str(self.samples)
+                + ' samples')
+        total = np.zeros(stop - start)
+        for wavetype, frequency, samples, weight, phase, dutyCycle in (
+                self.waves):
+            count = min(stop, samples) - start
+            if count <= 0:
+                continue
+            position = np.arange(start, start + count, dtype=float)
+            position *= frequency / self.sampleRate
+            position += phase
+            position -= np.floor(position)
+            level = __PHASE_SHAPES__[wavetype](position, dutyCycle)
+            level *= weight
+            total[:count] += level
+        for noisetype, samples, weight, seed in self.noises:
+            count = min(stop, samples) - start
+            if count <= 0:
+                continue
+            level = __noiseBlocks__(noisetype, seed, start, start + count)
+            level *= weight
+            total[:count] += level
+        return total
+    def render(self, start=0, stop=None):
+        '''
+        Return the np.int16 samples [start, stop) of the mix, clipped
+        to [-32767, 32767]. stop defaults to self.samples.
+        '''
+        if stop is None:
+            stop = self.samples
+        return __scaleFractionsToWavRange__(self.mixFractions(start, stop))
+
+def __channelSamples__(channel):
+    # Sample count of a streamWaves channel.
+    if isinstance(channel, WaveMix):
+        return channel.samples
+    return channel[1]
+
+def __renderChannel__(channel, start, stop):
+    # np.int16 samples [start, stop) of a streamWaves channel.
+    if isinstance(channel, WaveMix):
+        return channel.render(start, stop)
+    wavetype, samples, dutyCycle, duration = channel
+    return renderWave(wavetype, samples, dutyCycle, duration, start, stop)
+
+# Streaming output stage. Frames are rendered __BLOCK_SAMPLES__ at a time
+# as an interleaved (samples, channels) little-endian int16 block, which
+# is both the 16-bit PCM .wav frame layout and the raw binary layout, so
+# memory stays constant however long the render is.
+__STREAM_FORMATS__ = ('.wav', '.raw')
+
+def __renderFrames__(task):
+    # Worker entry for __frameBlocks__: task is (waves, start, stop).
+    # A channel shorter than the frames is silent (0) after its end.
+    waves, start, stop = task
+    frames = np.zeros((stop - start, len(waves)), dtype='<i2')
+    for column, channel in enumerate(waves):
+        end = min(stop, __channelSamples__(channel))
+        if end > start:
+            frames[:end-start, column] = __renderChannel__(channel, start,
+                end)
+    return frames
+
+def __frameBlocks__(waves, samples, blockSize, workers):
+    # Yield (start, frames) blocks in order. A pool renders at most
+    # 2*workers blocks ahead of the writer to keep memory bounded.
+    tasks = ((waves, start, min(start + blockSize, samples))
+        for start in range(0, samples, blockSize))
+    if workers <= 1:
+        for task in tasks:
+            yield task[1], __renderFrames__(task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        while True:
+            window = [t for _, t in zip(range(2 * workers), tasks)]
+            if not window:
+                break
+            for task, frames in zip(window,
+                    pool.map(__renderFrames__, window, chunksize=1)):
+                yield task[1], frames
+
+def streamWaves(waves, sampleRate, wavfname=None, rawfname=None,
+        csvfname=None, heading=None, blockSize=__BLOCK_SAMPLES__, workers=1):
+    '''
+    Render waves, a list of (wavetype, samples, dutyCycle, duration)
+    tuples of renderWave parameters or WaveMix objects, one channel per
+    wave, in blocks of blockSize frames. There are as many frames as
+    samples in the longest wave; shorter channels are padded with 0
+    after their last sample. Each block goes to every output named:
+    wavfname as a 16-bit PCM .wav file at sampleRate, rawfname as
+    headerless interleaved little-endian int16 frames, and csvfname as
+    CSV rows of timestep + one column per wave, under heading (default
+    ['timestep'] + the wavetypes or WaveMix names).
+    Blocks are rendered in a pool of up to workers processes (None for
+    os.cpu_count()) when workers > 1. Peak memory is a few blocks, not
+    the whole table. Return the number of frames written.
+    '''
+    if not waves:
+        raise ValueError("streamWaves REQUIRES at least one wave")
+    samples = max(__channelSamples__(w) for w in waves)
+    if blockSize < 1:
+        raise ValueError("streamWaves REQUIRES blockSize >= 1: "
+            + str(blockSize))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("streamWaves REQUIRES workers >= 1: "
+            + str(workers))
+    workers = min(workers, -(-samples // blockSize))
+    if heading is None:
+        heading = ['timestep'] + [w.name if isinstance(w, WaveMix)
+            else w[0] for w in waves]
+    wavfile = rawfile = csvfile = None
+    try:
+        if wavfname is not None:
+            wavfile = wave.open(wavfname, 'wb')
+            wavfile.setnchannels(len(waves))
+            wavfile.setsampwidth(2)
+            wavfile.setframerate(sampleRate)
+        if rawfname is not None:
+            rawfile = open(rawfname, 'wb')
+        if csvfname is not None:
+            csvfile = open(csvfname, 'w')
+            outcsv = csv.writer(csvfile, delimiter=',', quotechar='"')
+            outcsv.writerow(heading)
+        for start, frames in __frameBlocks__(waves, samples, blockSize,
+                workers):
+            if wavfile is not None:
+                wavfile.writeframesraw(frames.tobytes())
+            if rawfile is not None:
+                rawfile.write(frames.tobytes())
+            if csvfile is not None:
+                rows = np.empty((len(frames), len(waves)+1), dtype=np.int64)
+                rows[:, 0] = np.arange(start, start + len(frames))
+                rows[:, 1:] = frames
+                outcsv.writerows(rows.tolist())
+    finally:
+        for f in (wavfile, rawfile, csvfile):
+            if f is not None:
+                f.close()
+    return samples
+
+__usage__ = ('USAGE: python CSC223f23WAVEassn2.py [ OUTFILE.wav ]'
+    + ' [ OUTFILE.raw ]')
 # Symbol names with __underline__ should be private to their context.
 if __name__ == '__main__':      # Entry code outside of any function.
-    if len(sys.argv) != 1:
-        raise ValueError(__usage__)
+    streamfnames = {}
+    for fname in sys.argv[1:]:
+        extension = os.path.splitext(fname)[1].lower()
+        if extension not in __STREAM_FORMATS__ or extension in streamfnames:
+            raise ValueError(__usage__)
+        streamfnames[extension] = fname
         # https://docs.python.org/3.7/library/exceptions.html
     infile = open('CSC223f23WaveParams.csv', 'r')
     incsv = csv.reader(infile)
     inheader = incsv.__next__()     # Read header line before data
     expected = ['WaveType','Frequency','SampleRate','Duration','DutyCycle']
-    if inheader != expected:
+    mixcolumns = ['Mix','Weight','Phase','Seed']
+    if inheader != expected and inheader != expected + mixcolumns:
         raise ValueError('CSC223f23WaveParams.csv header ERROR, Expected '
             + str(expected) + ', Got ' + str(inheader))
     # For CSC223 just hard coding some things to keep life simpler.
@@ -437,12 +618,14 @@ if __name__ == '__main__':      # Entry code outside of any function.
     Duration = 1
     DutyCycle = 0.25
     outheading = ['timestep']
+    streamwaves = []    # renderWave parameters for streamWaves outputs
+    mixes = {}          # Mix name -> WaveMix, in order of first row
     # Compute following ahead of time so we can prebuild a 2D nparray.
     period = 1.0 / Frequency     # ipython comments are from above
     # In [44]: period = 1.0/1000.0
     sampleTime = 1.0 / SampleRate
     # In [46]: sampleTime = 1.0 / 44100
-    samples = math.ceil(period / sampleTime)
+    samples = waveSampleCount(Frequency, SampleRate, Duration)
     # In [48]: samples = period / sampleTime
     table2D = np.ndarray(shape=(samples, len(WaveType)+1), # 1 for timestep
         dtype=np.int16, order='C') # C is row major, 'F' col major, benchmark!
@@ -455,11 +638,31 @@ if __name__ == '__main__':      # Entry code outside of any function.
 
 
     for inrow in incsv:
-        wavetype, freq, srate, dur, duty = inrow
+        wavetype, freq, srate, dur, duty = inrow[:5]
         freq = float(freq)  # They come in as strings.
         srate = int(srate)
         dur = int(dur)
         duty = float(duty)
+        mixname = inrow[5] if len(inrow) > 5 else ''
+        if mixname:
+            # A Mix row adds a source to that mix, not a CSV column.
+            # Weight, Phase and Seed are optional, '' when left off.
+            weight, phase, seed = (inrow[6:9] + ['', '', ''])[:3]
+            if mixname not in mixes:
+                mixes[mixname] = WaveMix(mixname, srate)
+            mix = mixes[mixname]
+            if srate != mix.sampleRate:
+                raise ValueError('CSC223f23WaveParams.csv Mix SampleRate '
+                    + 'ERROR: ' + str(inrow))
+            mixsamples = waveSampleCount(freq, srate, dur)
+            weight = float(weight) if weight else 1.0
+            if wavetype in __NOISE_GENERATORS__:
+                mix.addNoise(wavetype, mixsamples, weight,
+                    int(seed) if seed else 0)
+            else:
+                mix.addWave(wavetype, freq, mixsamples, weight,
+                    float(phase) if phase else 0.0, duty)
+            continue
         # print("DEBUG inline", wavetype, freq, srate, dur, duty);
         if ((WaveColumn[wavetype] != (wavecol-1))
             or not (freq == Frequency and srate == SampleRate
@@ -472,7 +675,8 @@ if __name__ == '__main__':      # Entry code outside of any function.
         #print("Before calling genPulse - table2D:", table2D)
         
         genSamples(wavetype, samples, wavecol, table2D, duty,
-            statsfileh)
+            statsfileh, dur)
+        streamwaves.append((wavetype, samples, duty, dur))
         wavecol += 1
     
     
@@ -487,4 +691,22 @@ if __name__ == '__main__':      # Entry code outside of any function.
     outcsv.writerows(table2D)
     outfile.close()
     statsfileh.close()
+    if streamfnames:
+        streamWaves(streamwaves, SampleRate,
+            wavfname=streamfnames.get('.wav'),
+            rawfname=streamfnames.get('.raw'))
+    if mixes:
+        # Mixes go to their own CSV and, when named, to .wav and .raw
+        # files with 'mix' appended to the base name.
+        mixrates = set(m.sampleRate for m in mixes.values())
+        if len(mixrates) != 1:
+            raise ValueError('CSC223f23WaveParams.csv Mix SampleRate '
+                + 'ERROR, mixes have rates ' + str(sorted(mixrates)))
+        mixfnames = {}
+        for extension, fname in streamfnames.items():
+            mixfnames[extension] = os.path.splitext(fname)[0] + 'mix' \
+                + extension
+        streamWaves(list(mixes.values()), mixrates.pop(),
+            wavfname=mixfnames.get('.wav'), rawfname=mixfnames.get('.raw'),
+            csvfname='CSC223f23WAVEassn2mix.csv')
 
@@ -60,6 +60,24 @@ def __findSmooth__(Ylist, currentWeight):
         previousEstimate = result[index] 
     return result
 
+def __neededColumns__(nameToCol):
+    # Column numbers named (or numbered) by command line args after the
+    # input file name, including members of a (composite,X,key).
+    # Used with environment variable ARFFLIB_CACHE=1, which reads a
+    # memory-mapped copy of the input and converts only these columns.
+    needed = set()
+    for arg in sys.argv[2:]:
+        for a in arg.strip('()').split(','):
+            a = a.strip()
+            if a in nameToCol:
+                needed.add(nameToCol[a])
+            else:
+                try:
+                    needed.add(int(a))
+                except ValueError:
+                    pass
+    return needed
+
 __PLOTFILE__ = 'plotcsv.png'    # default, override -file:NAME
 def saveFig(plotObject):    # plotObject is like plt or fig
     myDPI = 300
@@ -93,8 +111,14 @@ if __name__ == '__main__':
     arffdict, table, CSVheader, nameToCol, colToName, colToType = 	\
 	    [None, None, None, None, None, None]
     infname = sys.argv[1].strip()
+    isMapped = os.environ.get('ARFFLIB_CACHE', '') == '1'
     if infname.endswith('.arff') or infname.endswith('.arff.gz'):
-        arffdict, table = readARFF(infname)
+        if isMapped:
+            arffdict, table = readARFF(infname, memoryMapped=True)
+            table = table.tolist(__neededColumns__(dict([(nm,
+                arffdict[nm][0]) for nm in arffdict.keys()])))
+        else:
+            arffdict, table = readARFF(infname)
         copy1dict = {}
         # Added error check logic for ARFFhdr2CSVhdr, CSVhdr2ARFFhdr as
         # added to arfflib 4/30/2022
@@ -117,7 +141,9 @@ if __name__ == '__main__':
                 + '\t' + str(copy1dict) + '\n\t' + str(copy2dict))
     else:
         arffdict, table, CSVheader, nameToCol, colToName, colToType = readCSV(
-            infname, isUsingNan=True)
+            infname, isUsingNan=True, memoryMapped=isMapped)
+        if isMapped:
+            table = table.tolist(__neededColumns__(nameToCol))
     if (sys.argv[2].startswith('(') and sys.argv[2].endswith(')')
             and ',' in sys.argv[2]):
         # composite sort key as tuple added 7/12/2022